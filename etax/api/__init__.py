@@ -8,7 +8,7 @@ eTax API Module
 Provides API client for eTax (Electronic Tax Report System) integration.
 """
 
-from etax.api.auth import ETaxAuth, ETaxAuthError, get_auth
+from etax.api.auth import ETaxAuth, ETaxAuthError, clear_auth_cache, get_auth
 from etax.api.client import ETaxClient, get_client
 from etax.api.http_client import ETaxHTTPClient, ETaxHTTPError, get_http_client
 from etax.api.transformer import ETaxTransformer, get_transformer
@@ -20,6 +20,7 @@ __all__ = [
     "ETaxHTTPClient",
     "ETaxHTTPError",
     "ETaxTransformer",
+    "clear_auth_cache",
     "get_auth",
     "get_client",
     "get_http_client",
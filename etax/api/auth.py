@@ -12,14 +12,85 @@ Same auth server as eBalance (auth.itc.gov.mn)
 OAuth2 Configuration:
 - Staging: st.auth.itc.gov.mn/auth/realms/Staging
 - Production: auth.itc.gov.mn/auth/realms/ITC
-- client_id: etax-gui (production), etax-gui-test (staging)
+- client_id: etax-gui (both environments)
 - grant_type: password
 """
 
-from datetime import datetime, timedelta
+import base64
+import functools
+import json
+import random
+import time
+from datetime import datetime
 
 import frappe
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from etax.api.cache import ETaxCache, get_token_key
+from etax.utils import fastjson
+
+
+# Token request retry policy; together with the request timeout these bound
+# how long one refresh can take (see _token_request_budget)
+TOKEN_RETRIES = 3
+TOKEN_CONNECT_TIMEOUT = 5
+MAX_RETRY_SLEEP = 10
+
+# Seconds a worker waits for another worker's token refresh before giving
+# up (kept short: the waiter is usually serving a web request)
+TOKEN_WAIT_TIMEOUT = 5
+
+
+class _JitteredRetry(Retry):
+    """
+    Retry with randomized backoff so workers don't retry in lockstep.
+
+    Both the backoff and a server's Retry-After are capped at
+    MAX_RETRY_SLEEP, so a refresh can't outlive its lock.
+    """
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if not backoff:
+            return backoff
+        return min(backoff * random.uniform(0.5, 1.5), MAX_RETRY_SLEEP)
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_SLEEP)
+
+
+def _token_request_budget(timeout):
+    """
+    Worst-case seconds for one token request including retries.
+
+    Every attempt may use the full connect and read timeouts, and every
+    retry may sleep up to MAX_RETRY_SLEEP.
+    """
+    attempts = TOKEN_RETRIES + 1
+    return attempts * (TOKEN_CONNECT_TIMEOUT + timeout) + TOKEN_RETRIES * MAX_RETRY_SLEEP
+
+
+# Shared session so token refreshes reuse pooled keep-alive TLS connections.
+# Transient gateway errors are retried with backoff (POST is safe to retry
+# here: a failed token request has no side effects).
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=_JitteredRetry(
+        total=TOKEN_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=[429, 502, 503, 504],
+        allowed_methods=frozenset(["POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+))
 
 
 class ETaxAuthError(Exception):
@@ -64,6 +135,22 @@ class ETaxAuth:
     # Fixed OAuth2 parameters
     GRANT_TYPE = "password"
 
+    # Seconds between settings version checks on a shared instance
+    SETTINGS_CHECK_INTERVAL = 30
+
+    # Fraction of token lifetime after which a background refresh is queued
+    REFRESH_AT_FRACTION = 0.8
+
+    # Tokens are treated as expired this many seconds early
+    EXPIRY_BUFFER = 60
+
+    # Once a refresh is due, seconds between re-reads of the shared token
+    # (picks up the token another worker rotated in)
+    REFRESH_RECHECK_INTERVAL = 5
+
+    # Tokens shorter-lived than this are not kept in memory (would expire instantly)
+    MIN_CACHEABLE_EXPIRES_IN = 90
+
     def __init__(self, settings=None):
         """
         Initialize auth handler.
@@ -71,9 +158,22 @@ class ETaxAuth:
         Args:
             settings: eTax Settings doc or None to fetch automatically
         """
-        self.settings = settings or self._get_settings()
+        # Settings passed in by the caller are never reloaded behind their back
+        self._owns_settings = settings is None
+        self.settings = settings if settings is not None else self._get_settings()
+        self._settings_version = self._get_settings_version() if self._owns_settings else None
+        self._settings_checked_at = time.monotonic()
         self._token = None
-        self._token_expiry = None
+        self._token_expiry = None  # epoch seconds
+        self._refresh_at = None  # epoch seconds
+        self._password = None  # decrypted on first refresh, never logged
+        self._auth_header = None  # (token, header dict)
+
+    def __getstate__(self):
+        """Never serialize the decrypted password"""
+        state = self.__dict__.copy()
+        state["_password"] = None
+        return state
 
     def _get_settings(self):
         """Get eTax Settings singleton"""
@@ -85,6 +185,35 @@ class ETaxAuth:
                 title="eTax Configuration Required"
             )
 
+    def _get_settings_version(self):
+        """Get the settings version token bumped on every eTax Settings save"""
+        return ETaxCache.get_settings_version()
+
+    def refresh_settings(self):
+        """
+        Reload settings if eTax Settings changed since they were loaded.
+
+        The version token is only checked every SETTINGS_CHECK_INTERVAL
+        seconds, so a long-lived instance costs one Redis GET per interval
+        instead of a settings fetch per call.
+        """
+        if not self._owns_settings:
+            return
+
+        now = time.monotonic()
+        if now - self._settings_checked_at < self.SETTINGS_CHECK_INTERVAL:
+            return
+        self._settings_checked_at = now
+
+        version = self._get_settings_version()
+        if version != self._settings_version:
+            self.settings = self._get_settings()
+            self._settings_version = version
+            self._token = None
+            self._token_expiry = None
+            self._refresh_at = None
+            self._password = None
+
     @property
     def environment(self):
         """Get current environment"""
@@ -106,6 +235,11 @@ class ETaxAuth:
         """Get OAuth2 client ID for eTax API access"""
         return self.CLIENT_IDS.get(self.environment, self.CLIENT_IDS["Staging"])
 
+    @property
+    def token_cache_key(self):
+        """Redis key for this environment/client/user's token"""
+        return get_token_key(self.environment, self.client_id, self.settings.username)
+
     @property
     def token_endpoint(self):
         """Get OAuth2 token endpoint via gateway"""
@@ -120,10 +254,13 @@ class ETaxAuth:
         """
         Get valid access token, refreshing if necessary.
 
-        Uses multi-level caching:
+        Uses two-level caching:
         1. In-memory cache (fastest)
         2. Redis cache (shared across workers)
-        3. Database storage (persistent)
+
+        The copy stored in eTax Settings is not read back: decrypting it
+        costs more than it saves, and after a Redis flush one extra
+        refresh is preferable to restoring a possibly-stale token.
 
         Args:
             force_refresh: Force token refresh even if cached
@@ -136,71 +273,144 @@ class ETaxAuth:
         """
         # Level 1: In-memory cache
         if not force_refresh and self._is_token_valid():
+            if self._is_refresh_due():
+                # The shared token may already have been rotated (which
+                # invalidates ours) - pick it up before queueing a refresh
+                cached_token = ETaxCache.get_token(self.token_cache_key)
+                if cached_token and cached_token.get("access_token") != self._token:
+                    self._adopt_cached_token(cached_token)
+                self._schedule_refresh_if_due()
             return self._token
 
         # Level 2: Redis cache
         if not force_refresh:
-            from etax.api.cache import ETaxCache
-            cached_token = ETaxCache.get_token()
+            cached_token = ETaxCache.get_token(self.token_cache_key)
             if cached_token:
-                self._token = cached_token.get("access_token")
-                self._token_expiry = datetime.fromtimestamp(cached_token.get("expires_at", 0))
+                self._adopt_cached_token(cached_token)
+                self._schedule_refresh_if_due()
                 return self._token
 
-        # Level 3: Database storage
-        if not force_refresh and self._load_stored_token():
+        # Request new token
+        return self._request_new_token()
+
+    def renew_rejected_token(self):
+        """
+        Get a token after the API rejected the current one (HTTP 401).
+
+        Another worker has usually rotated the shared token already, so a
+        newer token in Redis is adopted first; only if Redis still holds
+        the rejected token (or none) do we log in again, which would
+        otherwise rotate the token under every other worker.
+
+        Returns:
+            str: Valid access token
+        """
+        rejected_token = self._token
+        cached_token = ETaxCache.get_token(self.token_cache_key)
+        if cached_token and cached_token.get("access_token") != rejected_token:
+            self._adopt_cached_token(cached_token)
             return self._token
 
-        # Request new token
         return self._request_new_token()
 
-    def _is_token_valid(self):
-        """Check if cached token is still valid"""
-        if not self._token or not self._token_expiry:
-            return False
-        # Add 60 second buffer
-        return datetime.now() < (self._token_expiry - timedelta(seconds=60))
+    def _adopt_cached_token(self, cached_token):
+        """Use a token read from the shared Redis cache"""
+        self._token = cached_token.get("access_token")
+        self._token_expiry = _get_jwt_exp(self._token) or int(cached_token.get("expires_at", 0))
+        self._refresh_at = _get_refresh_at(cached_token)
+
+    def _is_refresh_due(self):
+        """Whether the token is past its proactive refresh time"""
+        return self._refresh_at is not None and time.time() >= self._refresh_at
+
+    def _schedule_refresh_if_due(self):
+        """
+        Queue a background token refresh once the token is past
+        REFRESH_AT_FRACTION of its lifetime, so foreground calls keep
+        using the current token instead of blocking on the OAuth2 POST.
+
+        The refresh time is then pushed back by REFRESH_RECHECK_INTERVAL
+        rather than cleared, so this worker keeps re-reading Redis until
+        the rotated token shows up (and re-queues if the job was lost).
+        """
+        if not self._is_refresh_due():
+            return
 
-    def _load_stored_token(self):
-        """Load token from settings if still valid"""
         try:
-            # Check if token_expiry exists first
-            stored_expiry = self.settings.token_expiry
-            if not stored_expiry:
-                return False
-
-            expiry_dt = frappe.utils.get_datetime(stored_expiry)
-            if datetime.now() >= (expiry_dt - timedelta(seconds=60)):
-                # Token expired, don't bother loading
-                return False
-
-            # Try to get stored token
-            try:
-                stored_token = self.settings.get_password("access_token")
-            except Exception:
-                # Password field might be empty or not set
-                return False
-
-            if stored_token:
-                self._token = stored_token
-                self._token_expiry = expiry_dt
-                return True
+            # The job id dedupes across workers; enqueue immediately, as
+            # many requests never commit
+            frappe.enqueue(
+                "etax.api.auth.background_refresh",
+                queue="short",
+                job_id="etax_token_refresh",
+                deduplicate=True,
+                enqueue_after_commit=False
+            )
         except Exception:
-            # Fail silently - unable to load cached token is non-fatal, will request new one
+            # Queue unavailable - try again at the next recheck, or
+            # refresh inline on expiry
             pass
-        return False
+        self._refresh_at = time.time() + self.REFRESH_RECHECK_INTERVAL
+
+    def _is_token_valid(self):
+        """Check if cached token is still valid"""
+        if not self._token or not self._token_expiry:
+            return False
+        return int(time.time()) + self.EXPIRY_BUFFER < self._token_expiry
 
     def _request_new_token(self):
+        """
+        Request new token, letting only one worker refresh at a time.
+
+        Workers that lose the race for the Redis lock wait for the leader
+        to publish the new token instead of hitting the OAuth2 server
+        themselves (every successful login invalidates the previous token).
+
+        The lock TTL covers the worst-case token request (timeouts,
+        retries and capped backoff), so the lock can't expire while the
+        leader is still logging in. Waiters only wait TOKEN_WAIT_TIMEOUT
+        seconds, then fail instead of blocking the request behind a
+        stuck token endpoint.
+        """
+        stale_token = self._token
+        budget = _token_request_budget(self._get_timeout())
+        deadline = time.monotonic() + TOKEN_WAIT_TIMEOUT
+
+        while True:
+            lock_owner = ETaxCache.acquire_token_lock(self.token_cache_key, ttl_ms=int(budget * 1000))
+            if lock_owner:
+                try:
+                    return self._fetch_new_token()
+                finally:
+                    ETaxCache.release_token_lock(lock_owner, self.token_cache_key)
+
+            if time.monotonic() >= deadline:
+                raise ETaxAuthError("Timed out waiting for token refresh")
+
+            # Another worker is refreshing - wait and pick up its token
+            time.sleep(random.uniform(0.1, 0.3))
+            cached_token = ETaxCache.get_token(self.token_cache_key)
+            if cached_token and cached_token.get("access_token") != stale_token:
+                self._adopt_cached_token(cached_token)
+                return self._token
+
+    def _get_timeout(self):
+        """Read timeout for token requests (seconds)"""
+        return self.settings.timeout or 30
+
+    def _fetch_new_token(self):
         """
         Request new token from ITC OAuth2 server via api.frappe.mn gateway.
 
-        SECURITY: Password is decrypted only for this request,
-        never logged or stored in plain text.
+        SECURITY: Password is decrypted once per instance and kept only in
+        process memory - never logged, pickled or stored in plain text.
         """
         try:
-            # Get credentials (password is decrypted here)
+            # Get credentials (password is decrypted on first refresh only)
             username = self.settings.username
-            password = self.settings.get_password("password")
+            if self._password is None:
+                self._password = self.settings.get_password("password", raise_exception=False)
+            password = self._password
 
             if not username or not password:
                 raise ETaxAuthError("Username and password are required")
@@ -209,7 +419,7 @@ class ETaxAuth:
                 "Content-Type": "application/x-www-form-urlencoded"
             }
 
-            timeout = self.settings.timeout or 30
+            timeout = self._get_timeout()
 
             data = {
                 "grant_type": self.GRANT_TYPE,
@@ -226,19 +436,19 @@ class ETaxAuth:
                 )
 
             # Request token via gateway
-            response = requests.post(
+            response = _SESSION.post(
                 self.token_endpoint,
                 data=data,
                 headers=headers,
-                timeout=timeout
+                timeout=(TOKEN_CONNECT_TIMEOUT, timeout)
             )
 
             if response.status_code == 200:
-                token_data = response.json()
+                token_data = fastjson.loads(response.content)
                 return self._process_token_response(token_data)
 
             # Parse error response
-            error_data = response.json() if response.content else {}
+            error_data = fastjson.loads(response.content) if response.content else {}
             error_msg = error_data.get("error_description",
                 error_data.get("error", f"HTTP {response.status_code}"))
             raise ETaxAuthError(f"Authentication failed: {error_msg}")
@@ -259,24 +469,55 @@ class ETaxAuth:
         if not access_token:
             raise ETaxAuthError("No access token in response")
 
-        # Calculate expiry
-        expiry_dt = datetime.now() + timedelta(seconds=expires_in)
-
-        # Cache in memory
-        self._token = access_token
-        self._token_expiry = expiry_dt
+        # Calculate expiry (epoch seconds); the JWT exp claim wins if earlier
+        now = int(time.time())
+        expiry = now + expires_in
+        jwt_exp = _get_jwt_exp(access_token)
+        if jwt_exp and jwt_exp < expiry:
+            expiry = jwt_exp
+
+        # Cache in memory, unless the token would be stale on the next call
+        if expires_in >= self.MIN_CACHEABLE_EXPIRES_IN:
+            self._token = access_token
+            self._token_expiry = expiry
+            self._refresh_at = now + expires_in * self.REFRESH_AT_FRACTION
+        else:
+            frappe.log_error(
+                f"eTax token expires_in={expires_in}s is below {self.MIN_CACHEABLE_EXPIRES_IN}s, not caching in memory",
+                "eTax Auth"
+            )
 
         # Cache in Redis (for sharing across workers)
-        from etax.api.cache import ETaxCache
-        ETaxCache.set_token(access_token, expires_in, refresh_token)
+        ETaxCache.set_token(access_token, expires_in, refresh_token, key=self.token_cache_key)
 
-        # Store in settings (persistent)
-        self._store_token(access_token, expiry_dt)
+        # Store in settings (persistent) off the hot path
+        self._enqueue_store_token(access_token, expiry)
 
         return access_token
 
-    def _store_token(self, token, expiry):
-        """Store token in settings (encrypted)"""
+    def _enqueue_store_token(self, token, expiry):
+        """
+        Persist the token to eTax Settings in a background job.
+
+        Memory and Redis already hold the token, so the caller doesn't
+        wait on the UPDATEs and COMMIT (which would also commit the
+        caller's own open transaction).
+        """
+        try:
+            frappe.enqueue(
+                "etax.api.auth.persist_token",
+                queue="short",
+                enqueue_after_commit=False,
+                token=token,
+                expiry=expiry
+            )
+        except Exception:
+            # Queue unavailable - store inline
+            self._store_token(token, datetime.fromtimestamp(expiry))
+
+    @staticmethod
+    def _store_token(token, expiry):
+        """Store token in settings (encrypted, for audit and UI display)"""
         try:
             frappe.db.set_single_value("eTax Settings", "access_token", token)
             frappe.db.set_single_value("eTax Settings", "token_expiry", expiry)
@@ -296,16 +537,21 @@ class ETaxAuth:
             dict: {"Authorization": "Bearer <token>"}
         """
         token = self.get_token(force_refresh)
-        return {"Authorization": f"Bearer {token}"}
+
+        # Reuse the same header dict until the token rotates
+        if self._auth_header is None or self._auth_header[0] != token:
+            self._auth_header = (token, {"Authorization": f"Bearer {token}"})
+        return self._auth_header[1]
 
     def clear_token(self):
-        """Clear cached and stored token"""
+        """Clear cached and stored token (and the cached password)"""
         self._token = None
         self._token_expiry = None
+        self._refresh_at = None
+        self._password = None
 
         # Clear Redis cache
-        from etax.api.cache import ETaxCache
-        ETaxCache.invalidate_token()
+        ETaxCache.invalidate_token(self.token_cache_key)
 
         try:
             frappe.db.set_single_value("eTax Settings", "access_token", "")
@@ -316,6 +562,80 @@ class ETaxAuth:
             pass
 
 
-def get_auth():
-    """Get eTax Auth instance"""
+def _get_jwt_exp(token):
+    """
+    Read the exp claim from a JWT access token without verifying it.
+
+    Lets workers validate a loaded token in-process instead of
+    re-checking Redis or the database on every call.
+
+    Returns:
+        int: Expiry as epoch seconds, or None if the token isn't a JWT
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return int(exp) if exp else None
+    except Exception:
+        return None
+
+
+def _get_refresh_at(token_data):
+    """Get proactive refresh time for a cached token dict"""
+    expires_in = token_data.get("expires_in")
+    if not expires_in:
+        return None
+    return token_data.get("expires_at", 0) - expires_in * (1 - ETaxAuth.REFRESH_AT_FRACTION)
+
+
+def persist_token(token, expiry):
+    """
+    Store a refreshed token in eTax Settings (background job).
+
+    Args:
+        token: Access token
+        expiry: Expiry as epoch seconds
+    """
+    ETaxAuth._store_token(token, datetime.fromtimestamp(expiry))
+
+
+def background_refresh():
+    """
+    Renew the shared token ahead of expiry (background job).
+
+    Skips the refresh if another worker already renewed the token.
+    The refresh itself runs under the token lock.
+    """
+    auth = ETaxAuth()
+    cached_token = ETaxCache.get_token(auth.token_cache_key)
+    if cached_token:
+        refresh_at = _get_refresh_at(cached_token)
+        if refresh_at and time.time() < refresh_at:
+            return
+
+    auth.get_token(force_refresh=True)
+
+
+@functools.lru_cache(maxsize=16)
+def _get_site_auth(site):
+    """Build the shared auth instance for a site (one per worker)"""
     return ETaxAuth()
+
+
+def get_auth():
+    """
+    Get the shared eTax Auth instance for the current site.
+
+    Settings are fetched once per worker and re-read only when the
+    settings version token changes.
+    """
+    auth = _get_site_auth(getattr(frappe.local, "site", None))
+    auth.refresh_settings()
+    return auth
+
+
+def clear_auth_cache():
+    """Clear the shared auth instance and its cached token"""
+    _get_site_auth(getattr(frappe.local, "site", None)).clear_token()
+    _get_site_auth.cache_clear()
@@ -17,8 +17,39 @@ Performance optimizations:
 - Parallel processing where possible
 """
 
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from itertools import islice
+from typing import Any
 
 import frappe
+from frappe.model import default_fields
+from frappe.model.naming import set_new_name
+from frappe.utils import cint, cstr
+
+# Natural key of a synced report, used to match API reports to existing rows
+REPORT_SYNC_KEY = ("report_no", "tax_type_code", "period_year", "period")
+
+# Unique index the upsert's ON DUPLICATE KEY fires on (report_no alone)
+UPSERT_KEY_INDEX = "idx_etax_report_no"
+
+# Names per UPDATE in bulk_update_status (full chunks share one statement text)
+STATUS_UPDATE_CHUNK = 500
+
+# Statement text kept stable so MariaDB can reuse parsed plans
+_EXISTING_REPORTS_SQL = """
+    SELECT name, report_no, tax_type_code, period_year, period
+    FROM `tabeTax Report`
+    WHERE (report_no, tax_type_code, period_year, period) IN %(keys)s
+"""
+
+_CLEANUP_LOGS_SQL = """
+    DELETE FROM `tabeTax Submission Log`
+    WHERE timestamp < DATE_SUB(NOW(), INTERVAL %s DAY)
+    ORDER BY timestamp
+    LIMIT %s
+"""
 
 
 class BatchProcessor:
@@ -30,98 +61,213 @@ class BatchProcessor:
         results = processor.sync_reports(report_list)
     """
 
-    def __init__(self, batch_size: int = 50, commit_interval: int = 100):
+    def __init__(
+        self,
+        batch_size: int = 50,
+        commit_interval: int = 100,
+        use_upsert: bool = False,
+        parallelism: int = 1
+    ):
         """
         Initialize batch processor.
 
         Args:
             batch_size: Number of items per batch
-            commit_interval: Commit transaction after this many operations
+            commit_interval: Unused; sync_reports commits once at the end
+                (kept for backwards compatibility)
+            use_upsert: Insert new reports with INSERT ... ON DUPLICATE KEY
+                UPDATE instead of Document.insert (opt-in: skips validation
+                and DocType hooks; names still come from the autoname series).
+                Needs the unique idx_etax_report_no index created by
+                etax.setup.indexes.setup_indexes; without it reports are
+                inserted normally
+            parallelism: Sync batches on this many threads, each with its own
+                DB connection and transaction (1 = serial, single transaction)
         """
         self.batch_size = batch_size
         self.commit_interval = commit_interval
+        self.use_upsert = use_upsert
+        self.parallelism = parallelism
         self.operations_count = 0
+        self._upsert_available = None
+        self._report_columns = None
 
-    def sync_reports(self, reports: list[dict], transformer=None) -> dict[str, int]:
+    def sync_reports(self, reports: Iterable[Mapping[str, Any]], transformer=None) -> dict[str, int]:
         """
         Sync multiple reports in batch.
 
         Args:
-            reports: List of report data from API
+            reports: Report data from API - any iterable, so paginated
+                fetches can be streamed in without building one big list
             transformer: ETaxTransformer instance
 
         Returns:
             dict: {"created": N, "updated": M, "errors": E}
         """
-        if not reports:
-            return {"created": 0, "updated": 0, "errors": 0}
-
         if transformer is None:
-            from etax.api.transformer import ETaxTransformer
-            transformer = ETaxTransformer()
+            from etax.api.transformer import get_transformer
+            transformer = get_transformer()
+
+        if self.parallelism > 1:
+            totals = self._sync_parallel(reports, transformer)
+            from etax.api.cache import on_report_sync
+            on_report_sync()
+            return totals
+
+        totals = {"created": 0, "updated": 0, "errors": 0}
+
+        # Process in batches, all in one transaction
+        for batch_no, batch in enumerate(_iter_batches(reports, self.batch_size)):
+            # A failed batch rolls back to here without losing earlier batches
+            savepoint = f"etax_sync_batch_{batch_no}"
+            frappe.db.savepoint(savepoint)
+            try:
+                result = self._sync_batch(batch, transformer)
+            except Exception as e:
+                frappe.db.rollback(save_point=savepoint)
+                result = {"created": 0, "updated": 0, "errors": len(batch)}
+                frappe.log_error(
+                    f"Report batch sync error: {e!s}",
+                    "eTax Batch Sync"
+                )
+            else:
+                frappe.db.release_savepoint(savepoint)
+
+            for key in totals:
+                totals[key] += result[key]
+            self.operations_count += result.get("processed", 0)
+
+        # Single commit for the whole sync
+        frappe.db.commit()
 
-        created = 0
-        updated = 0
-        errors = 0
+        # Upserts bypass the on_update hook that normally invalidates this
+        from etax.api.cache import on_report_sync
+        on_report_sync()
 
-        # Process in batches
-        for i in range(0, len(reports), self.batch_size):
-            batch = reports[i:i + self.batch_size]
-
-            for report in batch:
-                try:
-                    result = self._sync_single_report(report, transformer)
-                    if result == "created":
-                        created += 1
-                    elif result == "updated":
-                        updated += 1
-                except Exception as e:
-                    errors += 1
-                    frappe.log_error(
-                        f"Report sync error: {e!s}\nData: {report}",
-                        "eTax Batch Sync"
-                    )
+        return totals
 
-                self.operations_count += 1
+    def _sync_parallel(self, reports: Iterable[Mapping[str, Any]], transformer) -> dict[str, int]:
+        """Sync batches concurrently; each worker thread commits its own batches"""
+        # Resolve shared lookups once on this thread's connection
+        self._can_upsert()
+        self._get_report_columns()
 
-                # Commit periodically
-                if self.operations_count >= self.commit_interval:
-                    frappe.db.commit()
-                    self.operations_count = 0
+        site = frappe.local.site
+        sites_path = frappe.local.sites_path
+        user = frappe.session.user
 
-        # Final commit
-        frappe.db.commit()
+        totals = {"created": 0, "updated": 0, "errors": 0}
+        batches = _iter_batches(reports, self.batch_size)
 
-        return {"created": created, "updated": updated, "errors": errors}
-
-    def _sync_single_report(self, report_data: dict, transformer) -> str:
-        """Sync a single report and return status"""
-        doc_data = transformer.api_to_report(report_data)
-
-        # Use SQL for faster existence check
-        existing = frappe.db.sql("""
-            SELECT name FROM `tabeTax Report`
-            WHERE report_no = %(report_no)s
-            AND tax_type_code = %(tax_type_code)s
-            AND period_year = %(period_year)s
-            AND period = %(period)s
-            LIMIT 1
-        """, {
-            "report_no": doc_data.get("report_no"),
-            "tax_type_code": doc_data.get("tax_type_code"),
-            "period_year": doc_data.get("period_year"),
-            "period": doc_data.get("period")
-        }, as_dict=True)
-
-        if existing:
+        # Future -> batch size; bounded so only a few batches are in memory
+        pending = {}
+        max_pending = self.parallelism * 2
+
+        with ThreadPoolExecutor(max_workers=self.parallelism) as executor:
+            while True:
+                for batch in islice(batches, max_pending - len(pending)):
+                    future = executor.submit(
+                        self._sync_batch_in_thread, site, sites_path, user, batch, transformer
+                    )
+                    pending[future] = len(batch)
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch_len = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"created": 0, "updated": 0, "errors": batch_len}
+                        frappe.log_error(
+                            f"Report batch sync error: {e!s}",
+                            "eTax Batch Sync"
+                        )
+
+                    for key in totals:
+                        totals[key] += result[key]
+                    self.operations_count += result.get("processed", 0)
+
+        return totals
+
+    def _sync_batch_in_thread(self, site, sites_path, user, batch, transformer) -> dict[str, int]:
+        """Run _sync_batch on a worker thread with its own site connection"""
+        frappe.init(site=site, sites_path=sites_path)
+        frappe.connect()
+        try:
+            frappe.set_user(user)
+            result = self._sync_batch(batch, transformer)
+            frappe.db.commit()
+            return result
+        except Exception:
+            frappe.db.rollback()
+            raise
+        finally:
+            frappe.destroy()
+
+    def _sync_batch(self, batch: list[dict], transformer) -> dict[str, int]:
+        """Sync one batch of API reports and return its counts"""
+        created = 0
+        updated = 0
+        errors = 0
+
+        prepared = []
+        for report in batch:
+            try:
+                prepared.append((report, transformer.api_to_report(report)))
+            except Exception as e:
+                errors += 1
+                frappe.log_error(
+                    f"Report sync error: {e!s}\nData: {report}",
+                    "eTax Batch Sync"
+                )
+
+        # One existence lookup for the whole batch
+        existing = self._get_existing_reports([doc_data for _, doc_data in prepared])
+
+        for report, doc_data in prepared:
+            try:
+                result = self._sync_single_report(doc_data, existing)
+                if result == "created":
+                    created += 1
+                elif result == "updated":
+                    updated += 1
+            except Exception as e:
+                errors += 1
+                frappe.log_error(
+                    f"Report sync error: {e!s}\nData: {report}",
+                    "eTax Batch Sync"
+                )
+
+        # The caller adds "processed" to the progress counter on its own
+        # thread, so worker threads never write to shared state
+        return {"created": created, "updated": updated, "errors": errors, "processed": len(prepared)}
+
+    def _sync_single_report(self, doc_data: dict, existing: dict) -> str:
+        """
+        Sync a single transformed report and return status.
+
+        Args:
+            doc_data: Report fields from transformer.api_to_report
+            existing: Sync key -> report name map from _get_existing_reports
+        """
+        key = _sync_key(doc_data)
+        name = existing.get(key)
+        if name:
             # Update existing
             frappe.db.set_value(
                 "eTax Report",
-                existing[0].name,
+                name,
                 doc_data,
                 update_modified=True
             )
             return "updated"
+        elif self._can_upsert() and doc_data.get("report_no") is not None:
+            # Insert new without DocType hooks
+            existing[key] = self._upsert_report(doc_data)
+            return "created"
         else:
             # Insert new
             doc = frappe.get_doc({
@@ -130,8 +276,71 @@ class BatchProcessor:
             })
             doc.flags.ignore_permissions = True
             doc.insert()
+            # A report repeated later in the batch updates this one
+            existing[key] = doc.name
             return "created"
 
+    def _get_existing_reports(self, docs: list[dict]) -> dict[tuple, str]:
+        """
+        Look up existing reports for a batch in a single query.
+
+        Returns:
+            dict: Sync key tuple -> eTax Report name
+        """
+        keys = {_sync_key(d) for d in docs}
+        if not keys:
+            return {}
+
+        rows = frappe.db.sql(_EXISTING_REPORTS_SQL, {"keys": tuple(keys)}, as_dict=True)
+
+        return {_sync_key(row): row.name for row in rows}
+
+    def _can_upsert(self) -> bool:
+        """Check (once) whether the upsert fast path can be used"""
+        if self._upsert_available is None:
+            from etax.setup.indexes import index_exists
+            self._upsert_available = self.use_upsert and index_exists(
+                "tabeTax Report", UPSERT_KEY_INDEX
+            )
+        return self._upsert_available
+
+    def _get_report_columns(self) -> set[str]:
+        """Get writable eTax Report columns (excludes standard fields)"""
+        if self._report_columns is None:
+            valid_columns = frappe.get_meta("eTax Report").get_valid_columns()
+            self._report_columns = set(valid_columns) - set(default_fields)
+        return self._report_columns
+
+    def _upsert_report(self, doc_data: dict) -> str:
+        """
+        Insert a report in one statement (updating it if a concurrent sync
+        inserted it first) and return its name.
+
+        Callers route reports that already exist through the update path,
+        so the created/updated counts come from the existence lookup, not
+        the statement's affected-row count (which depends on the
+        connection's CLIENT_FOUND_ROWS flag).
+
+        Skips DocType hooks and validation - only used with use_upsert=True.
+        """
+        report_columns = self._get_report_columns()
+        values = {k: v for k, v in doc_data.items() if k in report_columns}
+
+        now = frappe.utils.now()
+        row = {
+            **values,
+            "name": _new_report_name(values),
+            "creation": now,
+            "modified": now,
+            "owner": frappe.session.user,
+            "modified_by": frappe.session.user,
+            "docstatus": 0
+        }
+
+        frappe.db.sql(_get_upsert_sql(tuple(values)), row)
+
+        return row["name"]
+
     def bulk_update_status(self, report_names: list[str], status: str) -> int:
         """
         Bulk update report status.
@@ -146,38 +355,99 @@ class BatchProcessor:
         if not report_names:
             return 0
 
-        # Use SQL for bulk update
-        placeholders = ", ".join(["%s"] * len(report_names))
-        frappe.db.sql(f"""
-            UPDATE `tabeTax Report`
-            SET status = %s, modified = NOW()
-            WHERE name IN ({placeholders})
-        """, [status] + report_names)
+        # Use SQL for bulk update, in fixed-size chunks
+        for i in range(0, len(report_names), STATUS_UPDATE_CHUNK):
+            chunk = report_names[i:i + STATUS_UPDATE_CHUNK]
+            frappe.db.sql(_get_status_update_sql(len(chunk)), [status, *chunk])
 
         frappe.db.commit()
         return len(report_names)
 
-    def cleanup_old_logs(self, days: int = 90) -> int:
+    def cleanup_old_logs(self, days: int = 90, chunk_size: int = 10000) -> int:
         """
         Delete old submission logs.
 
+        Deletes in chunks so no single statement holds locks (or stalls
+        replication) for long.
+
         Args:
             days: Delete logs older than this many days
+            chunk_size: Max rows deleted per statement
 
         Returns:
             int: Number of logs deleted
         """
-        frappe.db.sql("""
-            DELETE FROM `tabeTax Submission Log`
-            WHERE timestamp < DATE_SUB(NOW(), INTERVAL %s DAY)
-        """, (days,))
+        deleted = 0
 
-        frappe.db.commit()
-        result = frappe.db.sql("SELECT ROW_COUNT() as cnt", as_dict=True)
-        return int(result[0].get("cnt", 0)) if result else 0
+        while True:
+            frappe.db.sql(_CLEANUP_LOGS_SQL, (days, chunk_size))
+
+            # Affected rows of the DELETE itself, read from the same cursor
+            rowcount = frappe.db._cursor.rowcount
+            deleted += rowcount
+            frappe.db.commit()
+
+            if rowcount < chunk_size:
+                break
+
+        return deleted
+
+
+def _new_report_name(values: dict) -> str:
+    """Name a new report through the eTax Report autoname (ETAX-RPT-####)"""
+    doc = frappe.new_doc("eTax Report")
+    doc.update(values)
+    set_new_name(doc)
+    return doc.name
+
+
+@lru_cache(maxsize=32)
+def _get_upsert_sql(data_columns: tuple[str, ...]) -> str:
+    """Build (once per column set) the report upsert statement"""
+    columns = [*data_columns, "name", "creation", "modified", "owner", "modified_by", "docstatus"]
+    # report_no is the conflict key; the rest of the row takes the new values
+    update_columns = [c for c in (*data_columns, "modified", "modified_by") if c != "report_no"]
 
+    column_list = ", ".join(f"`{c}`" for c in columns)
+    placeholders = ", ".join(f"%({c})s" for c in columns)
+    updates = ", ".join(f"`{c}` = VALUES(`{c}`)" for c in update_columns)
 
-def sync_reports_batch(reports: list[dict]) -> dict[str, int]:
+    return f"""
+        INSERT INTO `tabeTax Report` ({column_list})
+        VALUES ({placeholders})
+        ON DUPLICATE KEY UPDATE {updates}
+    """
+
+
+@lru_cache(maxsize=8)
+def _get_status_update_sql(count: int) -> str:
+    """Build (once per chunk size) the bulk status UPDATE statement"""
+    placeholders = ", ".join(["%s"] * count)
+    return f"""
+        UPDATE `tabeTax Report`
+        SET status = %s, modified = NOW()
+        WHERE name IN ({placeholders})
+    """
+
+
+def _iter_batches(items: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of up to size items without materializing the iterable"""
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def _sync_key(data: dict) -> tuple:
+    """Normalized (report_no, tax_type_code, period_year, period) tuple"""
+    return (
+        cstr(data.get("report_no")),
+        cstr(data.get("tax_type_code")),
+        cint(data.get("period_year")),
+        cint(data.get("period"))
+    )
+
+
+def sync_reports_batch(reports: Iterable[Mapping[str, Any]]) -> dict[str, int]:
     """
     Convenience function for batch report sync.
 
@@ -191,28 +461,45 @@ def sync_reports_batch(reports: list[dict]) -> dict[str, int]:
     return processor.sync_reports(reports)
 
 
-def bulk_create_reports(reports_data: list[dict]) -> int:
+def bulk_create_reports(reports_data: Iterable[Mapping[str, Any]], chunk_size: int = 500) -> int:
     """
-    Bulk create reports using efficient insert.
+    Bulk create reports with multi-row INSERTs.
+
+    Skips validation and DocType hooks - callers that need those should
+    insert documents individually. Names come from the eTax Report
+    autoname series, as with the upsert path.
 
     Args:
-        reports_data: List of report dicts
+        reports_data: Report dicts (any iterable, consumed chunk by chunk)
+        chunk_size: Rows per INSERT statement
 
     Returns:
         int: Number of reports created
     """
-    if not reports_data:
-        return 0
+    report_columns = set(frappe.get_meta("eTax Report").get_valid_columns()) - set(default_fields)
+    user = frappe.session.user
+    created = 0
+
+    for chunk in _iter_batches(reports_data, chunk_size):
+        data_fields = sorted({k for data in chunk for k in data if k in report_columns})
+        fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus", *data_fields]
 
-    # Create documents individually (Frappe doesn't have bulk_insert for DocTypes)
-    for data in reports_data:
-        doc = frappe.get_doc({
-            "doctype": "eTax Report",
-            **data
-        })
-        doc.flags.ignore_permissions = True
-        doc.insert()
+        now = frappe.utils.now()
+        values = []
+        for data in chunk:
+            row = [data.get(f) for f in data_fields]
+            name = _new_report_name(dict(zip(data_fields, row)))
+            values.append((name, now, now, user, user, 0, *row))
+
+        frappe.db.bulk_insert("eTax Report", fields, values, chunk_size=chunk_size)
+        created += len(chunk)
+
+    if not created:
+        return 0
 
     frappe.db.commit()
 
-    return len(reports_data)
+    from etax.api.cache import on_report_sync
+    on_report_sync()
+
+    return created
@@ -16,15 +16,27 @@ Cache Strategy:
 - Token: Until expiry minus 60 seconds buffer
 - Static data (forms): Long TTL (24h)
 - Dynamic data (reports): Short TTL (5 min)
+
+Values are stored as Python objects - frappe.cache pickles them, which
+is faster than a JSON layer on top. Readers still accept JSON strings
+written by older versions until those entries expire.
 """
 
 import hashlib
 import json
+import os
+import pickle
+import queue
+import threading
+import time
+import zlib
 from collections.abc import Callable
 from functools import wraps
 
 import frappe
 
+from etax.utils import fastjson
+
 # Cache key prefixes
 CACHE_PREFIX = "etax"
 CACHE_KEYS = {
@@ -34,6 +46,8 @@ CACHE_KEYS = {
     "forms": f"{CACHE_PREFIX}:forms",
     "form_detail": f"{CACHE_PREFIX}:form_detail",
     "settings": f"{CACHE_PREFIX}:settings",
+    "settings_version": f"{CACHE_PREFIX}:settings_version",
+    "token_lock": f"{CACHE_PREFIX}:lock:token",
 }
 
 # TTL in seconds
@@ -46,17 +60,223 @@ CACHE_TTL = {
     "settings": 300,      # 5 minutes
 }
 
+# Process-local (L1) form detail cache in front of Redis:
+# (site, form_code) -> (expires_at, detail)
+FORM_DETAIL_LOCAL_TTL = 60
+FORM_DETAIL_LOCAL_MAX = 256
+_FORM_DETAIL_LOCAL: dict[tuple[str, str], tuple[float, dict]] = {}
+
+# Large payloads (form details) are stored zlib-compressed behind this marker
+COMPRESSED_PREFIX = b"Z"
+COMPRESSION_LEVEL = 3
+
+# Deferred (fire-and-forget) writes: flushed in one pipeline every
+# WRITE_FLUSH_INTERVAL seconds or WRITE_BATCH_SIZE writes
+WRITE_FLUSH_INTERVAL = 0.05
+WRITE_BATCH_SIZE = 100
+WRITE_QUEUE_MAX = 10000
+_write_queue = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+# Keys written under these groups are tracked in a Redis SET per group
+# so invalidation deletes exactly those keys instead of scanning the keyspace
+TRACKED_GROUPS = ("token", "orgs", "reports", "forms", "form_detail", "cached")
+KEYSET_TTL = max(CACHE_TTL.values())
+
+# Cached tokens expire from Redis this many seconds before the token itself
+TOKEN_EXPIRY_BUFFER = 60
+
+# Token refresh lock auto-expires so a crashed worker can't hold it forever
+TOKEN_LOCK_TTL_MS = 10000
+
+# Delete the lock only if it is still held by the caller
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+# Argument types whose repr() is a stable cache key
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def _load(cached):
+    """
+    Decode a value read from frappe.cache.
+
+    frappe.cache unpickles values itself, so this is normally a no-op; only
+    JSON strings written by older versions of this module need parsing.
+    """
+    if isinstance(cached, str):
+        return json.loads(cached)
+    return cached
+
+
+def _compress(value) -> bytes:
+    """Pickle and zlib-compress a large cache value"""
+    return COMPRESSED_PREFIX + zlib.compress(
+        pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), COMPRESSION_LEVEL
+    )
+
+
+def _decompress(cached):
+    """Decode a value written by _compress (or an uncompressed legacy value)"""
+    if isinstance(cached, bytes) and cached.startswith(COMPRESSED_PREFIX):
+        return pickle.loads(zlib.decompress(cached[len(COMPRESSED_PREFIX):]))
+    return _load(cached)
+
+
+def _get_keyset_key(group: str) -> str:
+    """Get the Redis key of the SET tracking a group's cache keys"""
+    return frappe.cache.make_key(f"{CACHE_PREFIX}:keyset:{group}")
+
+
+def _track_key(key: str, group: str, pipe=None):
+    """Record a cache key in its group's key set"""
+    target = pipe or frappe.cache.pipeline(transaction=False)
+    keyset_key = _get_keyset_key(group)
+    target.sadd(keyset_key, frappe.cache.make_key(key))
+    target.expire(keyset_key, KEYSET_TTL)
+    if pipe is None:
+        target.execute()
+
+
+def _delete_tracked(*groups: str, extra_keys=()):
+    """
+    Delete every key tracked under the given groups, and the key sets.
+
+    Two round-trips (SMEMBERS, then DEL) regardless of Redis size.
+    """
+    keyset_keys = [_get_keyset_key(group) for group in groups]
+    pipe = frappe.cache.pipeline(transaction=False)
+    for keyset_key in keyset_keys:
+        pipe.smembers(keyset_key)
+    keys = [key for members in pipe.execute() for key in members]
+    keys.extend(keyset_keys)
+    keys.extend(frappe.cache.make_key(key) for key in extra_keys)
+
+    pipe = frappe.cache.pipeline(transaction=False)
+    for i in range(0, len(keys), 500):
+        pipe.delete(*keys[i:i + 500])
+    pipe.execute()
+
+
+def _set_value_deferred(key: str, value, expires_in_sec: int, group: str | None = None):
+    """
+    Queue a cache write for the background writer thread.
+
+    The caller doesn't wait for the Redis round-trip. Values are pickled
+    the same way as frappe.cache.set_value, so get_value reads them
+    normally. Falls back to a direct write if the queue is unavailable.
+    """
+    try:
+        _get_write_queue().put_nowait((
+            frappe.cache.make_key(key),
+            expires_in_sec,
+            pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+            _get_keyset_key(group) if group else None
+        ))
+    except Exception:
+        frappe.cache.set_value(key, value, expires_in_sec=expires_in_sec)
+        if group:
+            _track_key(key, group)
+
+
+def _get_write_queue() -> queue.Queue:
+    """Get the write queue, starting the writer thread once per process"""
+    global _write_queue, _writer_pid
+
+    pid = os.getpid()
+    if _writer_pid != pid:
+        with _writer_lock:
+            # Re-create after fork - threads don't survive into children
+            if _writer_pid != pid:
+                _write_queue = queue.Queue(maxsize=WRITE_QUEUE_MAX)
+                threading.Thread(
+                    target=_drain_writes,
+                    args=(_write_queue, frappe.cache),
+                    name="etax-cache-writer",
+                    daemon=True
+                ).start()
+                _writer_pid = pid
+    return _write_queue
+
+
+def _drain_writes(write_queue: queue.Queue, cache):
+    """Writer thread: flush queued writes to Redis in pipelined batches"""
+    while True:
+        batch = [write_queue.get()]
+        deadline = time.monotonic() + WRITE_FLUSH_INTERVAL
+        while len(batch) < WRITE_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(write_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        try:
+            pipe = cache.pipeline(transaction=False)
+            for redis_key, ttl, blob, keyset_key in batch:
+                pipe.setex(redis_key, ttl, blob)
+                if keyset_key:
+                    pipe.sadd(keyset_key, redis_key)
+                    pipe.expire(keyset_key, KEYSET_TTL)
+            pipe.execute()
+        except Exception:
+            # Best effort - a lost write is just a later cache miss
+            pass
+
 
 def get_cache_key(*args, **kwargs) -> str:
-    """Generate cache key from arguments"""
-    key_data = json.dumps({"args": args, "kwargs": kwargs}, sort_keys=True, default=str)
-    return hashlib.md5(key_data.encode()).hexdigest()[:16]
+    """
+    Generate cache key from arguments.
+
+    Uses an 8-byte BLAKE2b digest (16 hex chars, same length as before);
+    changing the hash invalidates existing entries, which is harmless since
+    all keys carry a TTL.
+    """
+    if all(isinstance(a, _SCALAR_TYPES) for a in args) and all(
+        isinstance(v, _SCALAR_TYPES) for v in kwargs.values()
+    ):
+        # Common case (ent_id, form_no, year...) - no JSON encoding needed
+        key_data = repr((args, sorted(kwargs.items()))).encode()
+    else:
+        key_data = fastjson.dumpb_canonical({"args": args, "kwargs": kwargs}, default=str)
+    return hashlib.blake2b(key_data, digest_size=8).hexdigest()
+
+
+def get_token_key(environment: str, client_id: str, username: str) -> str:
+    """
+    Token cache key for one OAuth2 identity.
+
+    Each (environment, client_id, username) gets its own slot so companies
+    on one site don't overwrite each other's tokens. The username is hashed
+    to keep it out of Redis key names.
+    """
+    user_hash = hashlib.sha256((username or "").encode()).hexdigest()[:16]
+    return f"{CACHE_KEYS['token']}:{environment}:{client_id}:{user_hash}"
+
+
+def _get_token_lock_key(token_key: str | None) -> str:
+    """Refresh lock key matching a token cache key"""
+    if not token_key:
+        return CACHE_KEYS["token_lock"]
+    return CACHE_KEYS["token_lock"] + token_key.removeprefix(CACHE_KEYS["token"])
 
 
 def cached(key_prefix: str, ttl: int | None = None):
     """
     Decorator for caching function results.
 
+    Keys are tracked under their prefix's group (or the catch-all "cached"
+    group for other prefixes), so invalidation clears them without
+    scanning the keyspace.
+
     Usage:
         @cached("reports", ttl=300)
         def get_reports(ent_id):
@@ -89,6 +309,7 @@ def cached(key_prefix: str, ttl: int | None = None):
                     json.dumps(result) if not isinstance(result, str) else result,
                     expires_in_sec=cache_ttl
                 )
+                _track_key(cache_key, key_prefix if key_prefix in TRACKED_GROUPS else "cached")
 
             return result
         return wrapper
@@ -107,21 +328,41 @@ class ETaxCache:
     """
 
     @staticmethod
-    def get_token() -> dict | None:
-        """Get cached token if not expired"""
-        token_data = frappe.cache.get_value(CACHE_KEYS["token"])
-        if token_data:
-            data = json.loads(token_data) if isinstance(token_data, str) else token_data
-            # Check if token is still valid (with 60s buffer)
-            import time
-            if data.get("expires_at", 0) > time.time() + 60:
-                return data
+    def get_token(key: str | None = None) -> dict | None:
+        """
+        Get cached token if not expired.
+
+        Args:
+            key: Token key from get_token_key (defaults to the shared key)
+        """
+        token_data = frappe.cache.get_value(key or CACHE_KEYS["token"])
+        if not token_data:
+            return None
+
+        # set_token's Redis TTL already drops the entry TOKEN_EXPIRY_BUFFER
+        # seconds early, so a hit is valid; only legacy JSON entries need
+        # their expiry checked
+        if isinstance(token_data, dict):
+            return token_data
+
+        data = _load(token_data)
+        if data.get("expires_at", 0) > time.time() + TOKEN_EXPIRY_BUFFER:
+            return data
         return None
 
     @staticmethod
-    def set_token(token: str, expires_in: int, refresh_token: str | None = None):
-        """Cache token with calculated expiry"""
-        import time
+    def set_token(
+        token: str,
+        expires_in: int,
+        refresh_token: str | None = None,
+        key: str | None = None
+    ):
+        """Cache token until TOKEN_EXPIRY_BUFFER seconds before it expires"""
+        ttl = int(expires_in) - TOKEN_EXPIRY_BUFFER
+        if ttl <= 0:
+            # Would already count as expired - not worth sharing
+            return
+
         token_data = {
             "access_token": token,
             "refresh_token": refresh_token,
@@ -129,55 +370,133 @@ class ETaxCache:
             "expires_in": expires_in
         }
         frappe.cache.set_value(
-            CACHE_KEYS["token"],
-            json.dumps(token_data),
-            expires_in_sec=expires_in
+            key or CACHE_KEYS["token"],
+            token_data,
+            expires_in_sec=ttl
         )
+        if key:
+            _track_key(key, "token")
+
+    @staticmethod
+    def acquire_token_lock(key: str | None = None, ttl_ms: int | None = None) -> str | None:
+        """
+        Try to take the cluster-wide token refresh lock (SET NX PX).
+
+        Args:
+            key: Token key the lock guards (defaults to the shared key)
+            ttl_ms: Lock lifetime; should cover the whole token request
+                (defaults to TOKEN_LOCK_TTL_MS)
+
+        Returns:
+            Lock owner token if acquired, None if another worker holds it
+        """
+        owner = frappe.generate_hash(length=16)
+        try:
+            acquired = frappe.cache.set(
+                frappe.cache.make_key(_get_token_lock_key(key)),
+                owner,
+                nx=True,
+                px=ttl_ms or TOKEN_LOCK_TTL_MS
+            )
+        except Exception:
+            # Redis unavailable - refresh without coordination
+            return owner
+        return owner if acquired else None
+
+    @staticmethod
+    def release_token_lock(owner: str, key: str | None = None):
+        """Release the token refresh lock if still held by owner"""
+        try:
+            frappe.cache.eval(
+                _RELEASE_LOCK_SCRIPT,
+                1,
+                frappe.cache.make_key(_get_token_lock_key(key)),
+                owner
+            )
+        except Exception:
+            # Lock expires on its own after its TTL
+            pass
 
     @staticmethod
     def get_settings() -> dict | None:
         """Get cached settings"""
         cached = frappe.cache.get_value(CACHE_KEYS["settings"])
         if cached:
-            return json.loads(cached) if isinstance(cached, str) else cached
+            return _load(cached)
         return None
 
     @staticmethod
     def set_settings(settings_dict: dict):
-        """Cache settings"""
-        frappe.cache.set_value(
+        """Cache settings (written in the background)"""
+        _set_value_deferred(
             CACHE_KEYS["settings"],
-            json.dumps(settings_dict),
+            settings_dict,
             expires_in_sec=CACHE_TTL["settings"]
         )
 
     @staticmethod
-    def invalidate_token():
-        """Invalidate token cache"""
-        frappe.cache.delete_value(CACHE_KEYS["token"])
+    def get_settings_version() -> str | None:
+        """Get settings version token (changes on every settings save)"""
+        return frappe.cache.get_value(CACHE_KEYS["settings_version"])
+
+    @staticmethod
+    def bump_settings_version():
+        """Mark cached settings as stale across all workers"""
+        frappe.cache.set_value(CACHE_KEYS["settings_version"], frappe.generate_hash(length=10))
+
+    @staticmethod
+    def invalidate_token(key: str | None = None):
+        """
+        Invalidate token cache.
+
+        Args:
+            key: Token key to drop; all cached tokens if not given
+        """
+        if key:
+            frappe.cache.delete_value(key)
+        else:
+            _delete_tracked("token", extra_keys=(CACHE_KEYS["token"],))
 
     @staticmethod
     def invalidate_reports():
-        """Invalidate report cache"""
-        # Delete all report-related cache keys
-        frappe.cache.delete_keys(f"{CACHE_KEYS['reports']}:*")
+        """Invalidate report cache (tracked keys only, no keyspace scan)"""
+        _delete_tracked("reports")
 
     @staticmethod
     def invalidate_all():
-        """Invalidate all eTax cache"""
-        for key in CACHE_KEYS.values():
-            frappe.cache.delete_keys(f"{key}*")
+        """Invalidate all eTax cache (tracked keys plus the fixed keys)"""
+        _FORM_DETAIL_LOCAL.clear()
+        _delete_tracked(*TRACKED_GROUPS, extra_keys=CACHE_KEYS.values())
 
     @staticmethod
     def get_stats() -> dict:
-        """Get cache statistics"""
-        stats = {}
-        for name, key in CACHE_KEYS.items():
-            cached = frappe.cache.get_value(key)
-            stats[name] = {
-                "cached": cached is not None,
+        """
+        Get cache statistics (one pipelined MGET/SMEMBERS).
+
+        Tokens live under per-identity keys (see get_token_key), so the
+        "token" entry checks the keys tracked in the token key set.
+        """
+        fixed = {name: key for name, key in CACHE_KEYS.items() if name != "token"}
+        pipe = frappe.cache.pipeline(transaction=False)
+        pipe.mget([frappe.cache.make_key(key) for key in fixed.values()])
+        pipe.smembers(_get_keyset_key("token"))
+        values, token_keys = pipe.execute()
+
+        live_tokens = frappe.cache.exists(*token_keys) if token_keys else 0
+        stats = {
+            "token": {
+                "cached": live_tokens > 0,
+                "key": CACHE_KEYS["token"],
+                "count": live_tokens
+            }
+        }
+        stats.update({
+            name: {
+                "cached": value is not None,
                 "key": key
             }
+            for (name, key), value in zip(fixed.items(), values)
+        })
         return stats
 
 
@@ -187,44 +506,117 @@ def get_cached_orgs(user_key: str) -> list | None:
     cache_key = f"{CACHE_KEYS['orgs']}:{user_key}"
     cached = frappe.cache.get_value(cache_key)
     if cached:
-        return json.loads(cached) if isinstance(cached, str) else cached
+        return _load(cached)
     return None
 
 
 def set_cached_orgs(user_key: str, orgs: list):
-    """Cache organizations"""
+    """Cache organizations (written in the background)"""
     cache_key = f"{CACHE_KEYS['orgs']}:{user_key}"
-    frappe.cache.set_value(
+    _set_value_deferred(
         cache_key,
-        json.dumps(orgs),
-        expires_in_sec=CACHE_TTL["orgs"]
+        orgs,
+        expires_in_sec=CACHE_TTL["orgs"],
+        group="orgs"
     )
 
 
 def get_cached_form_detail(form_code: str) -> dict | None:
-    """Get cached form detail (long TTL)"""
+    """Get cached form detail (process memory first, then Redis)"""
+    local_key = (frappe.local.site, form_code)
+    local = _FORM_DETAIL_LOCAL.get(local_key)
+    if local and local[0] > time.monotonic():
+        return local[1]
+
     cache_key = f"{CACHE_KEYS['form_detail']}:{form_code}"
     cached = frappe.cache.get_value(cache_key)
     if cached:
-        return json.loads(cached) if isinstance(cached, str) else cached
+        detail = _decompress(cached)
+        _set_local_form_detail(local_key, detail)
+        return detail
     return None
 
 
+def get_cached_form_details(form_codes: list[str]) -> dict:
+    """
+    Get several cached form details with one Redis MGET.
+
+    Args:
+        form_codes: Form cache codes
+
+    Returns:
+        dict: form_code -> detail for the codes that were cached
+    """
+    site = frappe.local.site
+    now = time.monotonic()
+    details = {}
+    missing = []
+    for form_code in form_codes:
+        local = _FORM_DETAIL_LOCAL.get((site, form_code))
+        if local and local[0] > now:
+            details[form_code] = local[1]
+        else:
+            missing.append(form_code)
+
+    if not missing:
+        return details
+
+    values = frappe.cache.mget([
+        frappe.cache.make_key(f"{CACHE_KEYS['form_detail']}:{form_code}")
+        for form_code in missing
+    ])
+    for form_code, value in zip(missing, values):
+        if value is None:
+            continue
+        try:
+            detail = _decompress(pickle.loads(value))
+        except Exception:
+            continue
+        if detail:
+            details[form_code] = detail
+            _set_local_form_detail((site, form_code), detail)
+    return details
+
+
 def set_cached_form_detail(form_code: str, detail: dict):
-    """Cache form detail (long TTL)"""
+    """Cache form detail (long TTL, compressed, written in the background)"""
     cache_key = f"{CACHE_KEYS['form_detail']}:{form_code}"
-    frappe.cache.set_value(
+    _set_value_deferred(
         cache_key,
-        json.dumps(detail),
-        expires_in_sec=CACHE_TTL["form_detail"]
+        _compress(detail),
+        expires_in_sec=CACHE_TTL["form_detail"],
+        group="form_detail"
     )
+    _set_local_form_detail((frappe.local.site, form_code), detail)
+
+
+def _set_local_form_detail(local_key: tuple[str, str], detail: dict):
+    """Store form detail in the process-local cache (short TTL)"""
+    if len(_FORM_DETAIL_LOCAL) >= FORM_DETAIL_LOCAL_MAX:
+        _FORM_DETAIL_LOCAL.clear()
+    _FORM_DETAIL_LOCAL[local_key] = (time.monotonic() + FORM_DETAIL_LOCAL_TTL, detail)
+
+
+def get_request_settings():
+    """
+    Get eTax Settings, loaded at most once per request.
+
+    The document is kept on frappe.local, which Frappe resets for every
+    request and job, so it never outlives the request that loaded it.
+    """
+    settings = getattr(frappe.local, "etax_settings", None)
+    if settings is None:
+        settings = frappe.local.etax_settings = frappe.get_single("eTax Settings")
+    return settings
 
 
 # Cache invalidation hooks
 def on_settings_update(doc, method=None):
     """Called when eTax Settings is updated"""
+    frappe.local.etax_settings = None
     ETaxCache.invalidate_token()
     frappe.cache.delete_value(CACHE_KEYS["settings"])
+    ETaxCache.bump_settings_version()
 
 
 def on_report_sync(doc=None, method=None):
@@ -33,17 +33,41 @@ Sheet/Attachment Management:
 14. deleteAllSheetData - Delete all sheet data
 """
 
+import threading
+
 import frappe
 
 from etax.api.auth import ETaxAuth
 from etax.api.cache import (
     get_cached_form_detail,
+    get_cached_form_details,
     get_cached_orgs,
+    get_request_settings,
     set_cached_form_detail,
     set_cached_orgs,
 )
 from etax.api.http_client import ETaxHTTPClient
 
+# Seconds a coalesced caller waits for the in-flight request
+INFLIGHT_WAIT_TIMEOUT = 30
+
+# Full endpoint URLs per environment, resolved once per process
+_ENDPOINT_URLS = {}
+
+# In-flight form detail fetches per worker: (site, cache_key) -> _Flight
+_INFLIGHT = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+
+class _Flight:
+    """A pending fetch that concurrent callers can wait on"""
+
+    __slots__ = ("event", "result")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
 
 class ETaxClient:
     """
@@ -62,6 +86,8 @@ class ETaxClient:
         result = client.submit_report(report_data)
     """
 
+    __slots__ = ("settings", "auth", "_http", "_cached_auth_header", "_force_token_refresh")
+
     # API endpoint paths (relative to base URL)
     ENDPOINTS = {
         # User/Org
@@ -94,15 +120,63 @@ class ETaxClient:
         """
         self.settings = settings or self._get_settings()
         self.auth = ETaxAuth(self.settings)
-        self.http = ETaxHTTPClient(self.settings)
+        self._http = None
+        self._cached_auth_header = None
+        self._force_token_refresh = False
+
+    @property
+    def http(self):
+        """
+        HTTP client, created on first real API call.
+
+        All ETaxHTTPClient instances in a process share one pooled
+        keep-alive requests.Session (etax.api.pool), so TLS connections
+        are reused across clients and calls.
+        """
+        if self._http is None:
+            self._http = ETaxHTTPClient(self.settings)
+            self._http.on_unauthorized = self._reset_auth_header
+        return self._http
+
+    def _url(self, name):
+        """Get the full URL for an endpoint (resolved once per environment)"""
+        http = self.http
+        urls = _ENDPOINT_URLS.get(http.environment)
+        if urls is None:
+            urls = _ENDPOINT_URLS[http.environment] = {
+                key: http._build_url(path) for key, path in self.ENDPOINTS.items()
+            }
+        return urls[name]
 
     def _get_settings(self):
-        """Get eTax Settings singleton"""
-        return frappe.get_single("eTax Settings")
+        """Get eTax Settings singleton (once per request)"""
+        return get_request_settings()
 
     def _get_auth_header(self):
-        """Get authorization header"""
-        return self.auth.get_auth_header()
+        """
+        Get authorization header.
+
+        Built once and reused for every call made through this client
+        while the token stays valid.
+        """
+        if self._force_token_refresh:
+            # After a 401: adopt a token rotated by another worker, or log in
+            self._force_token_refresh = False
+            self.auth.renew_rejected_token()
+            self._cached_auth_header = None
+
+        if (
+            self._cached_auth_header is None
+            or not self.auth._is_token_valid()
+            or self.auth._is_refresh_due()
+        ):
+            self._cached_auth_header = self.auth.get_auth_header()
+        return self._cached_auth_header
+
+    def _reset_auth_header(self):
+        """Drop the memoized header after a 401 so the next call renews the token"""
+        self._cached_auth_header = None
+        self._force_token_refresh = True
 
     def _get_ent_id(self, ent_id=None):
         """Get entity ID from settings or parameter"""
@@ -155,7 +229,7 @@ class ETaxClient:
 
         # Note: getUserOrgs uses different base path (no /beta)
         response = self.http.get(
-            "/user/getUserOrgs",
+            self._url("user_orgs"),
             auth_header=self._get_auth_header()
         )
 
@@ -198,7 +272,7 @@ class ETaxClient:
         ent_id = self._get_ent_id(ent_id)
 
         response = self.http.get(
-            self.ENDPOINTS["report_list"],
+            self._url("report_list"),
             auth_header=self._get_auth_header(),
             params={"entId": ent_id}
         )
@@ -223,7 +297,7 @@ class ETaxClient:
         ent_id = self._get_ent_id(ent_id)
 
         response = self.http.get(
-            self.ENDPOINTS["report_history"],
+            self._url("report_history"),
             auth_header=self._get_auth_header(),
             params={"year": year, "entId": ent_id}
         )
@@ -247,7 +321,7 @@ class ETaxClient:
         ent_id = self._get_ent_id(ent_id)
 
         response = self.http.get(
-            self.ENDPOINTS["late_list"],
+            self._url("late_list"),
             auth_header=self._get_auth_header(),
             params={"entId": ent_id}
         )
@@ -272,7 +346,7 @@ class ETaxClient:
         ent_id = self._get_ent_id(ent_id)
 
         response = self.http.get(
-            self.ENDPOINTS["form_list"],
+            self._url("form_list"),
             auth_header=self._get_auth_header(),
             params={"formNo": form_no, "entId": ent_id}
         )
@@ -315,10 +389,57 @@ class ETaxClient:
             if cached_detail:
                 return cached_detail
 
+        # Single-flight: on a cold cache only one thread calls the API,
+        # concurrent callers for the same form wait for its result
+        flight_key = (frappe.local.site, cache_key)
+        with _INFLIGHT_LOCK:
+            flight = _INFLIGHT.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = _INFLIGHT[flight_key] = _Flight()
+
+        if not leader:
+            if flight.event.wait(INFLIGHT_WAIT_TIMEOUT) and flight.result:
+                return flight.result
+            # Leader failed or timed out - fetch ourselves
+            return self._fetch_form_detail(
+                cache_key, form_no, tax_type_id, branch_id, year, period, ent_id
+            )
+
+        try:
+            flight.result = self._fetch_form_detail(
+                cache_key, form_no, tax_type_id, branch_id, year, period, ent_id
+            )
+            return flight.result
+        finally:
+            with _INFLIGHT_LOCK:
+                _INFLIGHT.pop(flight_key, None)
+            flight.event.set()
+
+    def prefetch_form_details(self, forms):
+        """
+        Load cached form details for several forms in one Redis round-trip.
+
+        Call once before rendering a page with multiple forms - the
+        following get_form_detail calls are then served from memory.
+
+        Args:
+            forms: Iterable of (form_no, tax_type_id, year) tuples
+
+        Returns:
+            dict: "form_no:tax_type_id:year" -> form structure, for cached forms
+        """
+        return get_cached_form_details([
+            f"{form_no}:{tax_type_id}:{year}"
+            for form_no, tax_type_id, year in forms
+        ])
+
+    def _fetch_form_detail(self, cache_key, form_no, tax_type_id, branch_id, year, period, ent_id):
+        """Fetch form detail from the API and cache it"""
         ent_id = self._get_ent_id(ent_id)
 
         response = self.http.get(
-            self.ENDPOINTS["form_detail"],
+            self._url("form_detail"),
             auth_header=self._get_auth_header(),
             params={
                 "formNo": form_no,
@@ -358,7 +479,7 @@ class ETaxClient:
         ent_id = self._get_ent_id(ent_id)
 
         response = self.http.get(
-            self.ENDPOINTS["form_data"],
+            self._url("form_data"),
             auth_header=self._get_auth_header(),
             params={"reportId": report_id, "entId": ent_id}
         )
@@ -399,7 +520,7 @@ class ETaxClient:
         }
 
         response = self.http.post(
-            self.ENDPOINTS["save_form"],
+            self._url("save_form"),
             data=payload,
             auth_header=self._get_auth_header(),
             params={"entId": ent_id}
@@ -440,7 +561,7 @@ class ETaxClient:
             report_data["reportStatusId"] = 3
 
         response = self.http.post(
-            self.ENDPOINTS["submit"],
+            self._url("submit"),
             data=report_data,
             auth_header=self._get_auth_header(),
             params={"entId": ent_id}
@@ -471,7 +592,7 @@ class ETaxClient:
             params["reportNo"] = report_no
 
         response = self.http.get(
-            self.ENDPOINTS["sheet_list"],
+            self._url("sheet_list"),
             auth_header=self._get_auth_header(),
             params=params
         )
@@ -499,7 +620,7 @@ class ETaxClient:
         ent_id = self._get_ent_id(ent_id)
 
         response = self.http.get(
-            self.ENDPOINTS["sheet_detail"],
+            self._url("sheet_detail"),
             auth_header=self._get_auth_header(),
             params={"sheetFormNo": sheet_form_no, "entId": ent_id}
         )
@@ -527,7 +648,7 @@ class ETaxClient:
         ent_id = self._get_ent_id(ent_id)
 
         response = self.http.get(
-            self.ENDPOINTS["sheet_data"],
+            self._url("sheet_data"),
             auth_header=self._get_auth_header(),
             params={
                 "sheetFormNo": sheet_form_no,
@@ -568,7 +689,7 @@ class ETaxClient:
         }
 
         response = self.http.post(
-            self.ENDPOINTS["save_sheet"],
+            self._url("save_sheet"),
             data=payload,
             auth_header=self._get_auth_header(),
             params={"entId": ent_id}
@@ -595,7 +716,7 @@ class ETaxClient:
         ent_id = self._get_ent_id(ent_id)
 
         response = self.http.get(
-            self.ENDPOINTS["delete_sheet"],
+            self._url("delete_sheet"),
             auth_header=self._get_auth_header(),
             params={
                 "sheetFormNo": sheet_form_no,
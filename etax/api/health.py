@@ -9,11 +9,62 @@ Health Check API for eTax
 Provides endpoints for monitoring eTax app health and MTA connectivity.
 """
 
-from datetime import datetime
+import os
+import subprocess
+import threading
+import time
+from datetime import date, datetime
+from functools import lru_cache
 from typing import Any
 
 import frappe
+from dateutil.relativedelta import relativedelta
 from frappe import _
+from frappe.utils import cint, get_datetime
+
+try:
+    from etax.api_client import ETaxClient
+except ImportError:
+    ETaxClient = None
+
+try:
+    from etax.utils.resilience import etax_circuit_breaker
+except ImportError:
+    etax_circuit_breaker = None
+
+# detailed_health() results are reused for this many seconds so
+# monitoring polls don't each re-run every check: site -> (checked_at, result)
+HEALTH_CACHE_TTL = 5.0
+_HEALTH_CACHE: dict[str, tuple[float, dict]] = {}
+
+# One lock per site, so a hung check on one site doesn't hold up others;
+# callers that can't get it within HEALTH_LOCK_TIMEOUT get the last result
+HEALTH_LOCK_TIMEOUT = 2.0
+_HEALTH_LOCKS: dict[str, threading.Lock] = {}
+
+# Readiness probes re-read eTax Settings at most this often:
+# site -> (checked_at, error or None)
+READINESS_SETTINGS_TTL = 30.0
+_READINESS_CACHE: dict[str, tuple[float, str | None]] = {}
+_READINESS_LOCK = threading.Lock()
+
+# eTax Report statuses that still need filing (New, or Returned for corrections)
+PENDING_REPORT_STATUSES = ("New", "Returned")
+
+# Checks that make the app unhealthy (not just degraded) when failing
+CRITICAL_CHECKS = frozenset(("database", "settings"))
+
+# Last formatted timestamp: [epoch second, ISO string]
+_TS_CACHE: list = [0, ""]
+
+
+def _now_iso() -> str:
+    """Current UTC time as ISO 8601, formatted at most once per second"""
+    now = int(time.time())
+    if now != _TS_CACHE[0]:
+        _TS_CACHE[1] = datetime.utcfromtimestamp(now).isoformat() + "Z"
+        _TS_CACHE[0] = now
+    return _TS_CACHE[1]
 
 
 @frappe.whitelist(allow_guest=True)
@@ -27,12 +78,12 @@ def health():
     return {
         "status": "healthy",
         "app": "etax",
-        "timestamp": datetime.utcnow().isoformat() + "Z"
+        "timestamp": _now_iso()
     }
 
 
 @frappe.whitelist()
-def detailed_health():
+def detailed_health(bypass_cache=False):
     """
     Detailed health check with dependency status.
     
@@ -42,45 +93,83 @@ def detailed_health():
     - eTax API settings
     - Digital certificate status
     - Pending reports status
+    
+    Results are cached per site for HEALTH_CACHE_TTL seconds; concurrent
+    callers wait (up to HEALTH_LOCK_TIMEOUT) for the running check instead
+    of starting their own, then fall back to the last result.
+    
+    Args:
+        bypass_cache: Run the checks even if a fresh result is cached
     """
     frappe.only_for(["System Manager", "Administrator"])
     
+    site = frappe.local.site
+    bypass_cache = cint(bypass_cache)
+    
+    cached = _HEALTH_CACHE.get(site)
+    if not bypass_cache and cached and time.monotonic() - cached[0] < HEALTH_CACHE_TTL:
+        return cached[1]
+    
+    lock = _HEALTH_LOCKS.get(site) or _HEALTH_LOCKS.setdefault(site, threading.Lock())
+    if not lock.acquire(timeout=HEALTH_LOCK_TIMEOUT):
+        # A check is still running (e.g. a hung database) - don't queue up
+        cached = _HEALTH_CACHE.get(site)
+        if cached:
+            return cached[1]
+        return {
+            "status": "unknown",
+            "app": "etax",
+            "error": "Health check already in progress",
+            "timestamp": _now_iso()
+        }
+    
+    try:
+        # Another thread may have refreshed it while we waited
+        cached = _HEALTH_CACHE.get(site)
+        if not bypass_cache and cached and time.monotonic() - cached[0] < HEALTH_CACHE_TTL:
+            return cached[1]
+        
+        result = _run_health_checks()
+        _HEALTH_CACHE[site] = (time.monotonic(), result)
+        return result
+    finally:
+        lock.release()
+
+
+def _run_health_checks() -> dict:
+    """Run all health checks and compute the overall status"""
     checks: dict[str, Any] = {
         "status": "healthy",
         "app": "etax",
         "version": get_app_version(),
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "timestamp": _now_iso(),
         "checks": {}
     }
     
-    # Database check
-    checks["checks"]["database"] = check_database()
+    # Load the singleton once for the checks that need it
+    try:
+        settings = frappe.get_single("eTax Settings")
+    except Exception:
+        settings = None  # check_settings reports the error
     
-    # Cache check
+    # All checks run on this request's connection (no extra connections
+    # per probe); the cache check is a single PING
+    checks["checks"]["database"] = check_database()
     checks["checks"]["cache"] = check_cache()
-    
-    # Settings check
-    checks["checks"]["settings"] = check_settings()
-    
-    # Certificate check
-    checks["checks"]["certificate"] = check_certificate()
-    
-    # Pending reports
+    checks["checks"]["settings"] = check_settings(settings)
+    checks["checks"]["certificate"] = check_certificate(settings)
     checks["checks"]["pending_reports"] = check_pending_reports()
-    
-    # Circuit breaker status
     checks["checks"]["circuit_breaker"] = check_circuit_breaker()
     
-    # Overall status
-    critical_checks = ["database", "settings"]
-    critical_healthy = all(
-        checks["checks"].get(c, {}).get("status") == "healthy" 
-        for c in critical_checks
-    )
-    all_healthy = all(
-        c.get("status") in ["healthy", "disabled"] 
-        for c in checks["checks"].values()
-    )
+    # Overall status (single pass over the checks)
+    critical_healthy = True
+    all_healthy = True
+    for name, check in checks["checks"].items():
+        status = check.get("status")
+        if name in CRITICAL_CHECKS and status != "healthy":
+            critical_healthy = False
+        if status not in ("healthy", "disabled"):
+            all_healthy = False
     
     if not critical_healthy:
         checks["status"] = "unhealthy"
@@ -104,12 +193,10 @@ def check_api_connectivity():
         "response_time_ms": None,
         "api_endpoint": None,
         "error": None,
-        "timestamp": datetime.utcnow().isoformat() + "Z"
+        "timestamp": _now_iso()
     }
     
     try:
-        import time
-        
         settings = frappe.get_single("eTax Settings")
         if not getattr(settings, "enabled", False):
             result["status"] = "disabled"
@@ -121,7 +208,8 @@ def check_api_connectivity():
         start_time = time.time()
         
         # Test connection
-        from etax.api_client import ETaxClient
+        if ETaxClient is None:
+            raise ImportError("eTax client not available")
         client = ETaxClient()
         response = client.test_connection()
         
@@ -139,28 +227,59 @@ def check_api_connectivity():
     return result
 
 
+@lru_cache(maxsize=1)
 def get_app_version() -> str:
-    """Get eTax app version"""
+    """Get eTax app version (resolved once per process)"""
     try:
         return frappe.get_attr("etax.__version__")
     except AttributeError:
-        try:
-            import subprocess
-            result = subprocess.run(
-                ["git", "describe", "--tags", "--always"],
-                cwd=frappe.get_app_path("etax"),
-                capture_output=True,
-                text=True
-            )
-            return result.stdout.strip() or "unknown"
-        except Exception:
-            return "unknown"
+        pass
+    
+    # VERSION file kept in sync by the release workflow
+    app_root = os.path.dirname(frappe.get_app_path("etax"))
+    try:
+        with open(os.path.join(app_root, "VERSION")) as f:
+            version = f.read().strip()
+        if version:
+            return version
+    except OSError:
+        pass
+    
+    # Not a git checkout - don't spawn git at all
+    if not os.path.isdir(os.path.join(app_root, ".git")):
+        return "unknown"
+    
+    try:
+        result = subprocess.run(
+            ["git", "describe", "--tags", "--always"],
+            cwd=app_root,
+            capture_output=True,
+            timeout=1.0,
+            check=False
+        )
+        return result.stdout.decode("ascii", "replace").strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def ping_database():
+    """
+    Ping the database with the driver's COM_PING (no query parsing).
+    
+    Falls back to SELECT 1 when the connection has no ping (e.g. Postgres).
+    """
+    conn = getattr(frappe.db, "_conn", None)
+    ping = getattr(conn, "ping", None)
+    if ping is None:
+        frappe.db.sql("SELECT 1")
+        return
+    ping(reconnect=True)
 
 
 def check_database() -> dict:
     """Check database connectivity"""
     try:
-        frappe.db.sql("SELECT 1")
+        ping_database()
         return {"status": "healthy"}
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
@@ -169,20 +288,22 @@ def check_database() -> dict:
 def check_cache() -> dict:
     """Check Redis/cache connectivity"""
     try:
-        test_key = "etax:health_check"
-        frappe.cache().set_value(test_key, "ok", expires_in_sec=60)
-        value = frappe.cache().get_value(test_key)
-        if value == "ok":
-            return {"status": "healthy"}
-        return {"status": "unhealthy", "error": "Cache read/write mismatch"}
+        # Single PING round-trip - no test key written on every poll
+        cache = frappe.cache()
+        if hasattr(cache, "ping"):
+            cache.ping()
+        else:
+            cache.get_value("etax:health_check")
+        return {"status": "healthy"}
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
 
 
-def check_settings() -> dict:
+def check_settings(settings=None) -> dict:
     """Check eTax settings configuration"""
     try:
-        settings = frappe.get_single("eTax Settings")
+        if settings is None:
+            settings = frappe.get_single("eTax Settings")
         
         issues = []
         if not getattr(settings, "enabled", False):
@@ -203,10 +324,11 @@ def check_settings() -> dict:
         return {"status": "unhealthy", "error": str(e)}
 
 
-def check_certificate() -> dict:
+def check_certificate(settings=None) -> dict:
     """Check digital certificate status for MTA submissions"""
     try:
-        settings = frappe.get_single("eTax Settings")
+        if settings is None:
+            settings = frappe.get_single("eTax Settings")
         
         if not getattr(settings, "enabled", False):
             return {"status": "disabled"}
@@ -215,7 +337,6 @@ def check_certificate() -> dict:
         if not certificate_expiry:
             return {"status": "not_configured"}
         
-        from frappe.utils import get_datetime
         expiry_dt = get_datetime(certificate_expiry)
         if expiry_dt is None:
             return {"status": "not_configured"}
@@ -248,20 +369,19 @@ def check_certificate() -> dict:
 def check_pending_reports() -> dict:
     """Check pending tax reports status"""
     try:
-        # Check for pending/failed reports
-        pending_count = frappe.db.count(
-            "eTax Report",
-            {"status": ["in", ["Draft", "Pending", "Failed"]]}
-        ) if frappe.db.table_exists("eTax Report") else 0
-        
-        # Check for overdue reports
-        overdue_count = frappe.db.count(
-            "eTax Report",
-            {
-                "status": "Draft",
-                "due_date": ["<", datetime.now().date()]
-            }
-        ) if frappe.db.table_exists("eTax Report") else 0
+        pending_count = overdue_count = 0
+        if frappe.db.table_exists("eTax Report"):
+            # Reports still to be filed (not yet submitted, or returned
+            # for corrections) and the overdue ones, in one scan
+            counts = frappe.db.sql("""
+                SELECT
+                    COUNT(*) AS pending,
+                    SUM(return_due_date < %(today)s) AS overdue
+                FROM `tabeTax Report`
+                WHERE status IN %(statuses)s
+            """, {"today": datetime.now().date(), "statuses": PENDING_REPORT_STATUSES}, as_dict=True)[0]
+            pending_count = cint(counts.pending)
+            overdue_count = cint(counts.overdue)
         
         status = "healthy"
         if overdue_count > 0:
@@ -279,7 +399,8 @@ def check_pending_reports() -> dict:
 def check_circuit_breaker() -> dict:
     """Check circuit breaker status"""
     try:
-        from etax.utils.resilience import etax_circuit_breaker
+        if etax_circuit_breaker is None:
+            raise ImportError("Resilience module not available")
         
         cb = etax_circuit_breaker
         return {
@@ -295,13 +416,18 @@ def check_circuit_breaker() -> dict:
 
 @frappe.whitelist()
 def readiness():
-    """Kubernetes-style readiness probe"""
+    """
+    Kubernetes-style readiness probe.
+    
+    The database is pinged on every probe; the settings check is cached
+    for READINESS_SETTINGS_TTL seconds.
+    """
     try:
-        frappe.db.sql("SELECT 1")
+        ping_database()
         
-        settings = frappe.get_single("eTax Settings")
-        if getattr(settings, "enabled", False) and not getattr(settings, "api_url", None):
-            frappe.throw("Not ready: API URL not configured")
+        settings_error = _get_readiness_settings_error()
+        if settings_error:
+            frappe.throw(settings_error)
         
         return {"ready": True}
     except Exception as e:
@@ -309,10 +435,31 @@ def readiness():
         return {"ready": False, "error": str(e)}
 
 
+def _get_readiness_settings_error() -> str | None:
+    """Get the settings problem that makes the site not ready, if any"""
+    site = frappe.local.site
+    cached = _READINESS_CACHE.get(site)
+    if cached and time.monotonic() - cached[0] < READINESS_SETTINGS_TTL:
+        return cached[1]
+    
+    with _READINESS_LOCK:
+        cached = _READINESS_CACHE.get(site)
+        if cached and time.monotonic() - cached[0] < READINESS_SETTINGS_TTL:
+            return cached[1]
+        
+        settings = frappe.get_single("eTax Settings")
+        error = None
+        if getattr(settings, "enabled", False) and not getattr(settings, "api_url", None):
+            error = "Not ready: API URL not configured"
+        
+        _READINESS_CACHE[site] = (time.monotonic(), error)
+        return error
+
+
 @frappe.whitelist(allow_guest=True)
 def liveness():
     """Kubernetes-style liveness probe"""
-    return {"alive": True, "timestamp": datetime.utcnow().isoformat() + "Z"}
+    return {"alive": True, "timestamp": _now_iso()}
 
 
 @frappe.whitelist()
@@ -324,34 +471,31 @@ def tax_calendar_status():
     """
     frappe.only_for(["System Manager", "Administrator", "Accountant"])
     
-    today = datetime.now().date()
-    
+    return {
+        "deadlines": list(_compute_deadlines(datetime.now().date())),
+        "timestamp": _now_iso()
+    }
+
+
+# Common Mongolian tax deadlines
+TAX_DEADLINES = (
+    {"name": "VAT Monthly", "day": 25, "type": "monthly"},
+    {"name": "PIT Monthly", "day": 10, "type": "monthly"},
+    {"name": "CIT Quarterly", "day": 20, "type": "quarterly"},
+    {"name": "Social Insurance", "day": 10, "type": "monthly"},
+)
+
+
+@lru_cache(maxsize=4)
+def _compute_deadlines(today: date) -> tuple[dict, ...]:
+    """Upcoming deadlines for a given day, sorted by days remaining (cached per day)"""
     deadlines = []
-    
-    # Common Mongolian tax deadlines
-    tax_deadlines = [
-        {"name": "VAT Monthly", "day": 25, "type": "monthly"},
-        {"name": "PIT Monthly", "day": 10, "type": "monthly"},
-        {"name": "CIT Quarterly", "day": 20, "type": "quarterly"},
-        {"name": "Social Insurance", "day": 10, "type": "monthly"},
-    ]
-    
-    for deadline in tax_deadlines:
-        # Calculate next deadline
-        next_date = today  # Initialize to avoid possibly unbound error
-        if deadline["type"] == "monthly":
-            next_date = today.replace(day=deadline["day"])
-            if today.day > deadline["day"]:
-                if today.month == 12:
-                    next_date = next_date.replace(year=today.year + 1, month=1)
-                else:
-                    next_date = next_date.replace(month=today.month + 1)
-        elif deadline["type"] == "quarterly":
-            # Handle quarterly deadlines
-            next_date = today.replace(day=deadline["day"])
+    for deadline in TAX_DEADLINES:
+        next_date = today.replace(day=deadline["day"])
+        if deadline["type"] == "monthly" and today.day > deadline["day"]:
+            next_date += relativedelta(months=1)
         
         days_until = (next_date - today).days
-        
         deadlines.append({
             "name": deadline["name"],
             "due_date": str(next_date),
@@ -359,7 +503,5 @@ def tax_calendar_status():
             "status": "urgent" if days_until <= 5 else "upcoming" if days_until <= 10 else "normal"
         })
     
-    return {
-        "deadlines": sorted(deadlines, key=lambda x: x["days_until"]),
-        "timestamp": datetime.utcnow().isoformat() + "Z"
-    }
+    deadlines.sort(key=lambda x: x["days_until"])
+    return tuple(deadlines)
@@ -20,21 +20,25 @@ Performance optimizations:
 - Keep-alive connections
 """
 
-import json
 import time
 
 import frappe
+import requests
 
+from etax.api.cache import get_request_settings
 from etax.api.pool import get_session
+from etax.utils import fastjson
 
 
 class ETaxHTTPError(Exception):
     """HTTP error for eTax API"""
 
-    def __init__(self, message, status_code=None, response_data=None):
+    def __init__(self, message, status_code=None, response_data=None, retry_after=None):
         super().__init__(message)
         self.status_code = status_code
         self.response_data = response_data
+        # Seconds the server asked us to wait (Retry-After), if given
+        self.retry_after = retry_after
 
 
 class ETaxHTTPClient:
@@ -55,6 +59,9 @@ class ETaxHTTPClient:
     - 500: Internal server error
     """
 
+    # Seconds to establish a connection (read timeout comes from settings)
+    CONNECT_TIMEOUT = 5
+
     # API Gateway
     GATEWAY_URL = "https://api.frappe.mn"
     GATEWAY_PATHS = {
@@ -62,15 +69,40 @@ class ETaxHTTPClient:
         "Production": "/etax"
     }
 
-    def __init__(self, settings=None):
+    def __init__(self, settings=None, session=None):
         """
         Initialize HTTP client.
 
         Args:
             settings: eTax Settings doc or None
+            session: requests.Session to send through (defaults to the
+                process-wide pooled session)
         """
         self.settings = settings or self._get_settings()
-        self._session = None
+        self._session = session
+        # Called on HTTP 401 so the owner can drop cached credentials
+        self.on_unauthorized = None
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Re-read values derived from settings.
+
+        Environment, base URL, timeout and debug flag are resolved here
+        once instead of per request; NE-KEY is decrypted on first use.
+        Call after eTax Settings change on a long-lived client.
+        """
+        settings = self.settings
+        self._environment = (settings and settings.environment) or "Staging"
+        gateway_path = self.GATEWAY_PATHS.get(self._environment, self.GATEWAY_PATHS["Staging"])
+        self._base_url = f"{self.GATEWAY_URL}{gateway_path}"
+        self._base_url_slash = f"{self._base_url}/"
+        self._user_url_slash = f"{self._base_url}/user/"
+        self._timeout = (settings and settings.timeout) or 30
+        self._debug = bool(settings and settings.debug_mode)
+        self._ne_key = None
+        self._ne_key_loaded = False
+        self._base_headers = None
 
     @property
     def session(self):
@@ -80,42 +112,39 @@ class ETaxHTTPClient:
         return self._session
 
     def _get_settings(self):
-        """Get eTax Settings singleton"""
+        """Get eTax Settings singleton (once per request)"""
         try:
-            return frappe.get_single("eTax Settings")
+            return get_request_settings()
         except Exception:
             return None
 
     @property
     def environment(self):
         """Get current environment"""
-        if self.settings:
-            return self.settings.environment or "Staging"
-        return "Staging"
+        return self._environment
 
     @property
     def base_url(self):
         """Get API base URL via gateway"""
-        gateway_path = self.GATEWAY_PATHS.get(self.environment, self.GATEWAY_PATHS["Staging"])
-        return f"{self.GATEWAY_URL}{gateway_path}"
+        return self._base_url
 
     @property
     def timeout(self):
         """Get request timeout"""
-        if self.settings:
-            return self.settings.timeout or 30
-        return 30
+        return self._timeout
 
     @property
     def debug_mode(self):
-        """Check if debug mode is enabled"""
-        return self.settings and self.settings.debug_mode
+        """Check if debug mode is enabled (read once at init)"""
+        return self._debug
 
     def _get_ne_key(self):
-        """Get NE-KEY from settings"""
-        if self.settings:
-            return self.settings.get_password("ne_key")
-        return None
+        """Get NE-KEY from settings (decrypted once per client)"""
+        if not self._ne_key_loaded:
+            if self.settings:
+                self._ne_key = self.settings.get_password("ne_key")
+            self._ne_key_loaded = True
+        return self._ne_key
 
     def _build_url(self, endpoint):
         """
@@ -132,14 +161,13 @@ class ETaxHTTPClient:
         endpoint = endpoint.lstrip("/")
 
         # Handle /api/user/ endpoints (different path on gateway)
-        if endpoint.startswith("api/user/") or endpoint.startswith("user/"):
+        if endpoint.startswith(("api/user/", "user/")):
             # Use /etax-staging/user/ gateway path
             user_path = endpoint.replace("api/user/", "").replace("user/", "")
-            gateway_path = self.GATEWAY_PATHS.get(self.environment, self.GATEWAY_PATHS["Staging"])
-            return f"{self.GATEWAY_URL}{gateway_path}/user/{user_path}"
+            return self._user_url_slash + user_path
 
         # Standard /api/beta/ endpoints use base gateway path
-        return f"{self.base_url}/{endpoint}"
+        return self._base_url_slash + endpoint
 
     def _get_headers(self, auth_header=None, extra_headers=None, content_type="application/json"):
         """
@@ -153,15 +181,20 @@ class ETaxHTTPClient:
         Returns:
             dict: Complete headers
         """
-        headers = {
-            "Content-Type": content_type,
-            "Accept": "application/json"
-        }
-
-        # Add NE-KEY (required for all eTax API calls)
-        ne_key = self._get_ne_key()
-        if ne_key:
-            headers["NE-KEY"] = ne_key
+        # Static part (incl. NE-KEY, required for all eTax API calls) is built once
+        if self._base_headers is None:
+            base_headers = {
+                "Content-Type": "application/json",
+                "Accept": "application/json"
+            }
+            ne_key = self._get_ne_key()
+            if ne_key:
+                base_headers["NE-KEY"] = ne_key
+            self._base_headers = base_headers
+
+        headers = self._base_headers.copy()
+        if content_type != "application/json":
+            headers["Content-Type"] = content_type
 
         # Add authorization
         if auth_header:
@@ -187,11 +220,11 @@ class ETaxHTTPClient:
 eTax API Request:
 - Method: {method}
 - URL: {url}
-- Headers: {json.dumps(safe_headers, indent=2)}
-- Params: {json.dumps(params, indent=2) if params else None}
-- Body: {json.dumps(data, indent=2, ensure_ascii=False)[:1000] if data else None}
+- Headers: {fastjson.dumps(safe_headers, indent=True)}
+- Params: {fastjson.dumps(params, indent=True) if params else None}
+- Body: {fastjson.dumps(data, indent=True)[:1000] if data else None}
 """
-        frappe.log_error(log_msg, "eTax HTTP Debug - Request")
+        self._write_debug_log(log_msg, "eTax HTTP Debug - Request")
 
     def _log_response(self, response, duration=None):
         """Log response details in debug mode"""
@@ -199,8 +232,8 @@ eTax API Request:
             return
 
         try:
-            response_body = response.json()
-            response_str = json.dumps(response_body, indent=2, ensure_ascii=False)[:2000]
+            response_body = fastjson.loads(response.content)
+            response_str = fastjson.dumps(response_body, indent=True)[:2000]
         except Exception:
             response_str = response.text[:2000]
 
@@ -210,7 +243,21 @@ eTax API Response:
 - Duration: {duration}s
 - Body: {response_str}
 """
-        frappe.log_error(log_msg, "eTax HTTP Debug - Response")
+        self._write_debug_log(log_msg, "eTax HTTP Debug - Response")
+
+    @staticmethod
+    def _write_debug_log(message, title):
+        """Write a debug Error Log in the background, off the request path"""
+        try:
+            frappe.enqueue(
+                "frappe.log_error",
+                queue="short",
+                enqueue_after_commit=False,
+                title=title,
+                message=message
+            )
+        except Exception:
+            frappe.log_error(message, title)
 
     def _handle_response(self, response):
         """
@@ -225,13 +272,17 @@ eTax API Response:
         Raises:
             ETaxHTTPError: On error response
         """
+        if response.status_code == 401 and self.on_unauthorized:
+            self.on_unauthorized()
+
         try:
-            data = response.json()
-        except json.JSONDecodeError:
+            data = fastjson.loads(response.content)
+        except (fastjson.JSONDecodeError, UnicodeDecodeError):
             if response.status_code >= 400:
                 raise ETaxHTTPError(
                     f"HTTP {response.status_code}: {response.text[:200]}",
-                    status_code=response.status_code
+                    status_code=response.status_code,
+                    retry_after=self._get_retry_after(response)
                 )
             return {"raw_response": response.text}
 
@@ -250,10 +301,32 @@ eTax API Response:
             message = data.get("error_description",
                 data.get("error",
                 data.get("message", f"HTTP {response.status_code}")))
-            raise ETaxHTTPError(message, status_code=response.status_code, response_data=data)
+            raise ETaxHTTPError(
+                message,
+                status_code=response.status_code,
+                response_data=data,
+                retry_after=self._get_retry_after(response)
+            )
 
         return data
 
+    @staticmethod
+    def _get_retry_after(response):
+        """
+        Read the Retry-After header of a 429/503 response.
+
+        Only the delay-seconds form is supported; an HTTP-date is ignored.
+
+        Returns:
+            int or None: Seconds to wait
+        """
+        if response.status_code not in (429, 503):
+            return None
+        value = response.headers.get("Retry-After")
+        if value and value.strip().isdigit():
+            return int(value)
+        return None
+
     def get(self, endpoint, auth_header=None, headers=None, params=None):
         """
         Make GET request to eTax API.
@@ -271,26 +344,10 @@ eTax API Response:
         url = self._build_url(endpoint)
         request_headers = self._get_headers(auth_header, headers)
 
-        self._log_request("GET", url, request_headers, params=params)
+        if self._debug:
+            self._log_request("GET", url, request_headers, params=params)
 
-        start_time = time.time()
-        try:
-            response = self.session.get(
-                url,
-                headers=request_headers,
-                params=params,
-                timeout=self.timeout
-            )
-        except Exception as e:
-            if "timeout" in str(e).lower():
-                raise ETaxHTTPError(f"Request timeout after {self.timeout}s", status_code=408)
-            raise ETaxHTTPError(f"Connection error: {e!s}", status_code=503)
-        finally:
-            duration = round(time.time() - start_time, 3)
-
-        self._log_response(response, duration)
-
-        return self._handle_response(response)
+        return self._send("GET", url, request_headers, params=params)
 
     def post(self, endpoint, data=None, auth_header=None, headers=None, params=None):
         """
@@ -310,25 +367,37 @@ eTax API Response:
         url = self._build_url(endpoint)
         request_headers = self._get_headers(auth_header, headers)
 
-        self._log_request("POST", url, request_headers, data=data, params=params)
+        if self._debug:
+            self._log_request("POST", url, request_headers, data=data, params=params)
 
-        start_time = time.time()
+        body = fastjson.dumpb(data) if data is not None else None
+        return self._send("POST", url, request_headers, params=params, body=body)
+
+    def _send(self, method, url, request_headers, params=None, body=None):
+        """
+        Send a request through the pooled session and handle the response.
+
+        Connection failures, and transient 5xx/429 responses to idempotent
+        requests, are retried by the session's urllib3 Retry policy;
+        whatever still fails is translated to ETaxHTTPError here, once.
+        """
+        start_time = time.monotonic()
         try:
-            response = self.session.post(
+            response = self.session.request(
+                method,
                 url,
-                json=data,
+                data=body,
                 headers=request_headers,
                 params=params,
-                timeout=self.timeout
+                timeout=(self.CONNECT_TIMEOUT, self._timeout)
             )
-        except Exception as e:
-            if "timeout" in str(e).lower():
-                raise ETaxHTTPError(f"Request timeout after {self.timeout}s", status_code=408)
+        except requests.exceptions.Timeout:
+            raise ETaxHTTPError(f"Request timeout after {self._timeout}s", status_code=408)
+        except requests.exceptions.RequestException as e:
             raise ETaxHTTPError(f"Connection error: {e!s}", status_code=503)
-        finally:
-            duration = round(time.time() - start_time, 3)
 
-        self._log_response(response, duration)
+        if self._debug:
+            self._log_response(response, round(time.monotonic() - start_time, 3))
 
         return self._handle_response(response)
 
@@ -16,26 +16,59 @@ Features:
 - Keep-alive support
 """
 
+import atexit
+import os
+import socket
 import threading
 
 import requests
 from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
 from urllib3.util.retry import Retry
 
-# Global session pool
-_session_pool = threading.local()
+# One session per process, shared by all threads
+_GLOBAL_SESSION: requests.Session | None = None
+_SESSION_PID: int | None = None
+_SESSION_LOCK = threading.Lock()
+
+# Methods retried after a read error or a retryable status
+IDEMPOTENT_METHODS = frozenset(("HEAD", "GET", "PUT", "DELETE", "OPTIONS"))
+
+# TCP keepalive so idle pooled connections dropped by NAT/firewalls are
+# detected before reuse (per-option guards: not every platform has them)
+KEEPALIVE_SOCKET_OPTIONS = [
+    *HTTPConnection.default_socket_options,
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+    *[
+        (socket.IPPROTO_TCP, getattr(socket, name), value)
+        for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+        if hasattr(socket, name)
+    ],
+]
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled sockets have TCP keepalive enabled"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault("socket_options", KEEPALIVE_SOCKET_OPTIONS)
+        super().init_poolmanager(*args, **kwargs)
 
 
 def get_session(
     pool_connections: int = 10,
-    pool_maxsize: int = 20,
+    pool_maxsize: int = 50,
     max_retries: int = 3,
     backoff_factor: float = 0.3
 ) -> requests.Session:
     """
-    Get or create a pooled HTTP session.
+    Get or create the process-wide pooled HTTP session.
 
-    Uses thread-local storage for thread safety.
+    All threads share one session (requests/urllib3 connection pools are
+    thread-safe), so idle keep-alive connections are reused across
+    threads instead of each thread holding its own pool. Pool arguments
+    only apply when the session is first created. A forked child gets a
+    fresh session rather than sharing the parent's sockets.
 
     Args:
         pool_connections: Number of connection pools
@@ -46,20 +79,32 @@ def get_session(
     Returns:
         requests.Session: Pooled session
     """
-    if not hasattr(_session_pool, 'session') or _session_pool.session is None:
+    global _GLOBAL_SESSION, _SESSION_PID
+
+    pid = os.getpid()
+    if _GLOBAL_SESSION is not None and _SESSION_PID == pid:
+        return _GLOBAL_SESSION
+
+    with _SESSION_LOCK:
+        if _GLOBAL_SESSION is not None and _SESSION_PID == pid:
+            return _GLOBAL_SESSION
+
         session = requests.Session()
 
-        # Configure retry strategy
+        # Configure retry strategy. POST is left out of allowed_methods, so
+        # a report submit is only retried when the connection failed before
+        # the request was sent - never after a read error or 5xx, where the
+        # server may already have processed it
         retry_strategy = Retry(
             total=max_retries,
             backoff_factor=backoff_factor,
             status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["HEAD", "GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            allowed_methods=IDEMPOTENT_METHODS,
             raise_on_status=False
         )
 
-        # Configure adapter with connection pooling
-        adapter = HTTPAdapter(
+        # Configure adapter with connection pooling and TCP keepalive
+        adapter = KeepAliveAdapter(
             pool_connections=pool_connections,
             pool_maxsize=pool_maxsize,
             max_retries=retry_strategy
@@ -76,16 +121,22 @@ def get_session(
             "Connection": "keep-alive"
         })
 
-        _session_pool.session = session
-
-    return _session_pool.session
+        _GLOBAL_SESSION = session
+        _SESSION_PID = pid
+        return session
 
 
+@atexit.register
 def close_session():
-    """Close the current thread's session"""
-    if hasattr(_session_pool, 'session') and _session_pool.session:
-        _session_pool.session.close()
-        _session_pool.session = None
+    """Close the shared session (also run at interpreter exit)"""
+    global _GLOBAL_SESSION, _SESSION_PID
+
+    with _SESSION_LOCK:
+        if _GLOBAL_SESSION is not None:
+            if _SESSION_PID == os.getpid():
+                _GLOBAL_SESSION.close()
+            _GLOBAL_SESSION = None
+            _SESSION_PID = None
 
 
 class PooledHTTPClient:
@@ -129,10 +180,8 @@ class PooledHTTPClient:
         return self.session.delete(url, **kwargs)
 
     def close(self):
-        """Close session"""
-        if self._session:
-            self._session.close()
-            self._session = None
+        """Release the session (the shared pool stays open for other clients)"""
+        self._session = None
 
 
 # Utility for one-off requests with pooling
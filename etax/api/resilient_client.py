@@ -15,13 +15,108 @@ Wraps the existing HTTP client with:
 
 from __future__ import annotations
 
+import itertools
+import os
+import queue
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from datetime import date
+from functools import cache
 from typing import Any
 
 import frappe
 
+from etax.api.cache import get_request_settings
 from etax.api.http_client import ETaxHTTPClient, ETaxHTTPError
 
+_UNSET = object()
+
+# Metric increments are queued and written to Redis by a background thread;
+# INFO call logs are sampled at this rate (errors are always logged)
+INFO_LOG_SAMPLE_RATE = 0.1
+METRIC_BATCH_SIZE = 100
+_metric_queue: queue.SimpleQueue | None = None
+_metric_drainer_pid: int | None = None
+_metric_drainer_lock = threading.Lock()
+
+# Error categories for metrics
+_STATUS_CATEGORIES = {
+    408: "timeout",
+    429: "rate_limited",
+    503: "service_unavailable",
+    401: "auth_error",
+    201: "retry_requested",
+}
+_CERTIFICATE_RE = re.compile("certificate", re.IGNORECASE)
+_SIGNATURE_RE = re.compile("signature", re.IGNORECASE)
+
+# Max concurrent requests in post_many (shares the pooled keep-alive connections)
+DEFAULT_CONCURRENCY = 8
+
+# Seconds between certificate expiry checks on a client
+CERT_CHECK_INTERVAL = 3600
+
+# Server-side throttling/outage: when a 429/503 response carries
+# Retry-After, open the circuit right away for that period instead of
+# hammering the API (connection errors, also reported as 503, and
+# responses without the header count as ordinary failures)
+RETRY_AFTER_STATUSES = (429, 503)
+
+# Correlation IDs: pid prefix + per-process counter (unique per process,
+# no entropy needed); the prefix is refreshed in forked workers
+CORRELATION_HEADER = "X-Correlation-ID"
+_correlation_prefix = f"{os.getpid():x}-"
+_correlation_counter = itertools.count()
+
+
+def _reset_correlation_ids():
+    global _correlation_prefix, _correlation_counter
+    _correlation_prefix = f"{os.getpid():x}-"
+    _correlation_counter = itertools.count()
+
+
+os.register_at_fork(after_in_child=_reset_correlation_ids)
+
+# Per-worker client instances: (site, settings name, settings modified) -> client
+_CLIENT_CACHE: dict[tuple, ResilientETaxClient] = {}
+_CLIENT_CACHE_MAX = 16
+
+
+# Optional monitoring dependencies, imported once per process
+
+@cache
+def _get_circuit_breaker():
+    """Get the shared eTax circuit breaker, or None if unavailable"""
+    try:
+        from etax.utils.resilience import etax_circuit_breaker
+        return etax_circuit_breaker
+    except ImportError:
+        return None
+
+
+@cache
+def _get_logger():
+    """Get the structured logger, or None if unavailable"""
+    try:
+        from etax.utils.logging import get_logger
+        return get_logger()
+    except ImportError:
+        return None
+
+
+@cache
+def _get_metrics():
+    """Get the metrics collector, or None if unavailable"""
+    try:
+        from etax.utils.metrics import metrics
+        return metrics
+    except ImportError:
+        return None
+
 
 class ResilientETaxClient:
     """
@@ -33,6 +128,10 @@ class ResilientETaxClient:
     - Metrics collection for monitoring
     - Certificate expiry warnings
     
+    Requests go through the process-wide keep-alive session from
+    etax.api.pool unless a session is injected, so TCP/TLS connections
+    are reused across calls and clients.
+    
     Usage:
         client = ResilientETaxClient()
         
@@ -44,56 +143,54 @@ class ResilientETaxClient:
             result = ctx.post("/api/beta/submitform", data=report_data)
     """
     
-    def __init__(self, settings=None):
-        self._inner_client = ETaxHTTPClient(settings)
-        self._circuit_breaker = None
-        self._logger = None
-        self._metrics = None
+    def __init__(self, settings=None, session=None):
+        self._inner_client = ETaxHTTPClient(settings, session=session)
+        self._cert_checked_at = 0.0
+        self._cert_expiry_date = _UNSET
+        self._last_days_remaining = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def close(self):
+        """Release the session (the shared pool stays open for other clients)"""
+        self._inner_client._session = None
     
     @property
     def circuit_breaker(self):
-        """Lazy load circuit breaker"""
-        if self._circuit_breaker is None:
-            try:
-                from etax.utils.resilience import etax_circuit_breaker
-                self._circuit_breaker = etax_circuit_breaker
-            except ImportError:
-                self._circuit_breaker = None
-        return self._circuit_breaker
+        """Circuit breaker (imported once per process)"""
+        return _get_circuit_breaker()
     
     @property
     def logger(self):
-        """Lazy load structured logger"""
-        if self._logger is None:
-            try:
-                from etax.utils.logging import get_logger
-                self._logger = get_logger()
-            except ImportError:
-                self._logger = None
-        return self._logger
+        """Structured logger (imported once per process)"""
+        return _get_logger()
     
     @property
     def metrics(self):
-        """Lazy load metrics collector"""
-        if self._metrics is None:
-            try:
-                from etax.utils.metrics import metrics
-                self._metrics = metrics
-            except ImportError:
-                self._metrics = None
-        return self._metrics
+        """Metrics collector (imported once per process)"""
+        return _get_metrics()
     
     def _check_certificate_expiry(self):
-        """Check if certificate is expiring soon"""
+        """Check if certificate is expiring soon (at most once per CERT_CHECK_INTERVAL)"""
+        now = time.monotonic()
+        if now - self._cert_checked_at < CERT_CHECK_INTERVAL:
+            return
+        self._cert_checked_at = now
+        
         try:
-            from datetime import date, timedelta
-            settings = self._inner_client.settings
-            cert_expiry = getattr(settings, "certificate_expiry", None) if settings else None
-            if cert_expiry:
-                expiry = cert_expiry
+            if self._cert_expiry_date is _UNSET:
+                settings = self._inner_client.settings
+                expiry = getattr(settings, "certificate_expiry", None) if settings else None
                 if isinstance(expiry, str):
                     expiry = date.fromisoformat(expiry)
-                
+                self._cert_expiry_date = expiry
+            
+            expiry = self._cert_expiry_date
+            if expiry:
                 days_remaining = (expiry - date.today()).days
                 if days_remaining <= 30:
                     if self.logger:
@@ -101,8 +198,9 @@ class ResilientETaxClient:
                             f"eTax certificate expires in {days_remaining} days",
                             extra={"days_remaining": days_remaining}
                         )
-                    if self.metrics:
+                    if self.metrics and days_remaining != self._last_days_remaining:
                         self.metrics.gauge("etax_certificate_days_remaining", days_remaining)
+                    self._last_days_remaining = days_remaining
         except Exception:
             # Certificate monitoring is non-critical - don't let it affect API calls
             pass
@@ -111,25 +209,19 @@ class ResilientETaxClient:
         """Categorize error for metrics"""
         if isinstance(error, ETaxHTTPError):
             status = error.status_code or 0
-            if status == 408:
-                return "timeout"
-            elif status == 429:
-                return "rate_limited"
-            elif status == 503:
-                return "service_unavailable"
-            elif status == 401:
-                return "auth_error"
-            elif status == 201:
-                return "retry_requested"
-            elif status >= 500:
+            category = _STATUS_CATEGORIES.get(status)
+            if category:
+                return category
+            if status >= 500:
                 return "server_error"
-            elif status >= 400:
+            if status >= 400:
                 return "client_error"
         
-        error_str = str(error).lower()
-        if "certificate" in error_str:
+        # "certificate" wins over "signature", as in the original check order
+        message = str(error)
+        if _CERTIFICATE_RE.search(message):
             return "certificate_error"
-        elif "signature" in error_str:
+        if _SIGNATURE_RE.search(message):
             return "signature_error"
         
         return "unknown"
@@ -140,9 +232,13 @@ class ResilientETaxClient:
         # Check certificate on first call
         self._check_certificate_expiry()
         
-        # Log request
-        if self.logger:
-            self.logger.info(
+        circuit_breaker = _get_circuit_breaker()
+        logger = _get_logger()
+        metrics = _get_metrics()
+        
+        # Log request (sampled - errors below are always logged)
+        if logger and random.random() < INFO_LOG_SAMPLE_RATE:
+            logger.info(
                 f"eTax API call: {operation}",
                 extra={"operation": operation, "endpoint": args[0] if args else None}
             )
@@ -150,32 +246,41 @@ class ResilientETaxClient:
         error_type = None
         
         try:
-            # Execute with circuit breaker if available
-            if self.circuit_breaker:
-                result = self.circuit_breaker.call(func, *args, **kwargs)
+            # Execute with circuit breaker if available (raises
+            # CircuitBreakerOpen without a request while the circuit is open)
+            if circuit_breaker:
+                result = circuit_breaker.call(func, *args, **kwargs)
             else:
                 result = func(*args, **kwargs)
             
-            # Record success metrics
-            if self.metrics:
-                self.metrics.increment("etax_api_requests", tags={"operation": operation, "status": "success"})
+            # Record success metrics (written in the background)
+            if metrics:
+                _emit_metric("etax_api_requests", {"operation": operation, "status": "success"})
             
             return result
             
         except Exception as e:
             error_type = self._categorize_error(e)
             
+            if (
+                circuit_breaker
+                and isinstance(e, ETaxHTTPError)
+                and e.status_code in RETRY_AFTER_STATUSES
+                and e.retry_after is not None
+            ):
+                circuit_breaker.force_open(e.retry_after)
+            
             # Log error
-            if self.logger:
-                self.logger.error(
+            if logger:
+                logger.error(
                     f"eTax API error: {operation}",
                     extra={"operation": operation, "error_type": error_type, "error": str(e)}
                 )
             
-            # Record error metrics
-            if self.metrics:
-                self.metrics.increment("etax_api_requests", tags={"operation": operation, "status": "error"})
-                self.metrics.increment("etax_api_errors", tags={"operation": operation, "error_type": error_type})
+            # Record error metrics (written in the background)
+            if metrics:
+                _emit_metric("etax_api_requests", {"operation": operation, "status": "error"})
+                _emit_metric("etax_api_errors", {"operation": operation, "error_type": error_type})
             
             raise
     
@@ -188,25 +293,30 @@ class ResilientETaxClient:
             with client.traced("submit_report") as ctx:
                 result = ctx.post("/api/beta/submitform", data=report)
         """
-        import time
-        import uuid
-        
-        correlation_id = str(uuid.uuid4())[:8]
+        correlation_id = f"{_correlation_prefix}{next(_correlation_counter):04x}"
         if hasattr(frappe, "local"):
             frappe.local.correlation_id = correlation_id
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
             yield self
         finally:
-            duration = time.time() - start_time
+            duration = time.perf_counter() - start_time
             if self.metrics:
                 self.metrics.timing(f"etax_api_duration_{operation}", duration)
             
             if hasattr(frappe, "local") and hasattr(frappe.local, "correlation_id"):
                 delattr(frappe.local, "correlation_id")
     
+    @staticmethod
+    def _with_correlation_id(headers):
+        """Add the traced() correlation ID, if any, to the request headers"""
+        correlation_id = getattr(frappe.local, "correlation_id", None)
+        if not correlation_id:
+            return headers
+        return {**headers, CORRELATION_HEADER: correlation_id} if headers else {CORRELATION_HEADER: correlation_id}
+    
     def get(self, endpoint: str, auth_header=None, headers=None, params=None) -> Any:
         """Make GET request with resilience"""
         return self._execute_with_resilience(
@@ -214,7 +324,7 @@ class ResilientETaxClient:
             self._inner_client.get,
             endpoint,
             auth_header=auth_header,
-            headers=headers,
+            headers=self._with_correlation_id(headers),
             params=params
         )
     
@@ -226,10 +336,53 @@ class ResilientETaxClient:
             endpoint,
             data=data,
             auth_header=auth_header,
-            headers=headers,
+            headers=self._with_correlation_id(headers),
             params=params
         )
     
+    def post_many(self, calls: list[dict], max_workers: int = DEFAULT_CONCURRENCY) -> list:
+        """
+        Make several POST requests concurrently.
+        
+        Requests run on a thread pool over the shared keep-alive session,
+        so a batch takes roughly the time of its slowest request per
+        window instead of the sum of all round-trips.
+        
+        Args:
+            calls: post() keyword arguments per request, e.g.
+                [{"endpoint": "/return/submit", "data": {...}}, ...]
+            max_workers: Max requests in flight
+        
+        Returns:
+            list: Result per call, in order; a failed call's exception is
+                returned in its place instead of being raised
+        """
+        if not calls:
+            return []
+        
+        # Decrypt NE-KEY here - worker threads have no DB connection
+        self._inner_client._get_ne_key()
+        site = frappe.local.site
+        sites_path = frappe.local.sites_path
+        correlation_id = getattr(frappe.local, "correlation_id", None)
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(calls))) as executor:
+            futures = [
+                executor.submit(self._post_in_thread, site, sites_path, call, correlation_id)
+                for call in calls
+            ]
+            return [future.exception() or future.result() for future in futures]
+    
+    def _post_in_thread(self, site: str, sites_path: str, call: dict, correlation_id: str | None = None) -> Any:
+        """Run post() on a worker thread with the site context initialised"""
+        frappe.init(site=site, sites_path=sites_path)
+        if correlation_id:
+            frappe.local.correlation_id = correlation_id
+        try:
+            return self.post(**call)
+        finally:
+            frappe.destroy()
+    
     # Expose inner client properties
     @property
     def base_url(self):
@@ -244,9 +397,72 @@ class ResilientETaxClient:
         return self._inner_client.environment
 
 
+def _emit_metric(name: str, tags: dict):
+    """Queue a metric increment for the background drainer"""
+    global _metric_queue, _metric_drainer_pid
+
+    pid = os.getpid()
+    if _metric_drainer_pid != pid:
+        with _metric_drainer_lock:
+            # Re-create after fork - threads don't survive into children
+            if _metric_drainer_pid != pid:
+                _metric_queue = queue.SimpleQueue()
+                threading.Thread(
+                    target=_drain_metrics,
+                    args=(_metric_queue,),
+                    name="etax-metrics",
+                    daemon=True
+                ).start()
+                _metric_drainer_pid = pid
+
+    _metric_queue.put((frappe.local.site, frappe.local.sites_path, name, tags))
+
+
+def _drain_metrics(metric_queue: queue.SimpleQueue):
+    """Drainer thread: write queued metrics, one site context per batch"""
+    while True:
+        batch = [metric_queue.get()]
+        while len(batch) < METRIC_BATCH_SIZE:
+            try:
+                batch.append(metric_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        by_site: dict[tuple, list] = {}
+        for site, sites_path, name, tags in batch:
+            by_site.setdefault((site, sites_path), []).append((name, tags))
+
+        for (site, sites_path), events in by_site.items():
+            try:
+                frappe.init(site=site, sites_path=sites_path)
+                metrics = _get_metrics()
+                if metrics:
+                    for name, tags in events:
+                        metrics.increment(name, tags=tags)
+            except Exception:
+                # Metrics are non-critical
+                pass
+            finally:
+                frappe.destroy()
+
+
 def get_resilient_client(settings=None) -> ResilientETaxClient:
-    """Get resilient eTax HTTP client"""
-    return ResilientETaxClient(settings)
+    """
+    Get resilient eTax HTTP client.
+
+    Instances are reused within the worker for as long as the settings
+    document is unchanged (keyed by site, name and modified timestamp).
+    """
+    if settings is None:
+        settings = get_request_settings()
+
+    key = (frappe.local.site, settings.name, str(settings.modified))
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        if len(_CLIENT_CACHE) >= _CLIENT_CACHE_MAX:
+            _CLIENT_CACHE.clear()
+        client = _CLIENT_CACHE[key] = ResilientETaxClient(settings)
+    return client
 
 
 def resilient_request(method: str, endpoint: str, **kwargs) -> Any:
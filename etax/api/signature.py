@@ -23,12 +23,29 @@ Supported signature modes:
 import base64
 import hashlib
 import hmac
-import json
+from operator import itemgetter
 
 import frappe
 from frappe import _
 from frappe.utils import now_datetime
 
+from etax.api.cache import get_request_settings
+from etax.utils import fastjson
+
+
+def _to_bytes(value):
+    """Encode str as UTF-8; pass bytes through unchanged"""
+    return value if isinstance(value, bytes) else value.encode('utf-8')
+
+
+# Keyed HMAC objects are kept for at most this many distinct secrets per signer
+HMAC_PROTO_MAX = 8
+
+_UNSET = object()
+
+# Sort key for (tagKey, value) cells
+_TAG_KEY = itemgetter(0)
+
 
 class DigitalSignatureError(Exception):
     """Exception for digital signature errors"""
@@ -53,10 +70,43 @@ class ETaxDigitalSignature:
         Initialize digital signature handler.
 
         Args:
-            settings: eTax Settings doc (optional)
+            settings: eTax Settings doc (optional, loaded once per request)
         """
-        self.settings = settings or frappe.get_single("eTax Settings")
+        self.settings = settings or get_request_settings()
         self.algorithm = self.ALGORITHM_SHA256
+        # Decrypted credentials, fetched once per signer on first use
+        self._ne_key = _UNSET
+        self._password = _UNSET
+        # secret -> keyed HMAC-SHA256 object, copied per signature
+        self._hmac_protos = {}
+
+    def _get_ne_key(self):
+        """Get decrypted NE-KEY (cached on the signer)"""
+        if self._ne_key is _UNSET:
+            self._ne_key = self.settings.get_password("ne_key") or None
+        return self._ne_key
+
+    def _hmac(self, secret, payload):
+        """
+        HMAC-SHA256 digest of payload, reusing the keyed state per secret.
+
+        The key padding and inner/outer hash setup run once per secret;
+        each signature only copies that state and hashes the payload.
+        """
+        proto = self._hmac_protos.get(secret)
+        if proto is None:
+            if len(self._hmac_protos) >= HMAC_PROTO_MAX:
+                self._hmac_protos.clear()
+            proto = self._hmac_protos[secret] = hmac.new(_to_bytes(secret), None, hashlib.sha256)
+        mac = proto.copy()
+        mac.update(_to_bytes(payload))
+        return mac.digest()
+
+    def _get_password(self):
+        """Get decrypted password (cached on the signer)"""
+        if self._password is _UNSET:
+            self._password = self.settings.get_password("password") or None
+        return self._password
 
     def create_signature_payload(self, report_data, report_detail):
         """
@@ -69,7 +119,10 @@ class ETaxDigitalSignature:
         Returns:
             str: JSON payload for signing
         """
-        # Canonical JSON representation for consistent hashing
+        return self._create_payload_bytes(report_data, report_detail).decode('utf-8')
+
+    def _create_payload_bytes(self, report_data, report_detail, timestamp=None):
+        """Canonical JSON payload as UTF-8 bytes (what actually gets signed)"""
         payload = {
             "reportNo": report_data.get("reportNo"),
             "taxTypeId": report_data.get("taxTypeId"),
@@ -77,11 +130,11 @@ class ETaxDigitalSignature:
             "year": report_data.get("year"),
             "period": report_data.get("period"),
             "formNo": report_data.get("formNo"),
-            "timestamp": now_datetime().isoformat(),
+            "timestamp": timestamp or now_datetime().isoformat(),
             "dataHash": self._hash_report_detail(report_detail)
         }
 
-        return json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        return fastjson.dumpb_canonical(payload)
 
     def _hash_report_detail(self, report_detail):
         """
@@ -93,19 +146,25 @@ class ETaxDigitalSignature:
         Returns:
             str: SHA256 hash of data
         """
-        # Sort by tagKey for consistent ordering
-        sorted_data = sorted(report_detail, key=lambda x: x.get("tagKey", ""))
-
-        # Create canonical string
-        data_str = "|".join([
-            f"{item.get('tagKey', '')}:{item.get('value', '')}"
-            for item in sorted_data
+        # Extract (tagKey, value) once, then sort by tagKey with a C-level
+        # key function (stable, so equal keys keep their input order)
+        cells = [
+            (item.get('tagKey', ''), item['value'])
+            for item in report_detail
             if item.get('value') is not None
+        ]
+        cells.sort(key=_TAG_KEY)
+
+        # One contiguous buffer, hashed in a single call, lets OpenSSL run
+        # many 64-byte blocks per invocation instead of tiny updates
+        data = b"|".join([
+            f"{tag_key}:{value}".encode('utf-8')
+            for tag_key, value in cells
         ])
 
-        return hashlib.sha256(data_str.encode('utf-8')).hexdigest()
+        return hashlib.sha256(data).hexdigest()
 
-    def sign_with_password(self, payload, password=None):
+    def sign_with_password(self, payload, password=None, timestamp=None):
         """
         Sign payload using password-based HMAC.
 
@@ -113,61 +172,55 @@ class ETaxDigitalSignature:
         PKI infrastructure.
 
         Args:
-            payload: Payload string to sign
+            payload: Payload to sign (str or bytes)
             password: Password (uses settings if not provided)
+            timestamp: ISO timestamp of the payload (defaults to now)
 
         Returns:
             dict: Signature result
         """
         if not password:
-            password = self.settings.get_password("password")
+            password = self._get_password()
 
         if not password:
             raise DigitalSignatureError(_("Password required for signing"))
 
         # Create HMAC-SHA256 signature
-        signature = hmac.new(
-            password.encode('utf-8'),
-            payload.encode('utf-8'),
-            hashlib.sha256
-        ).digest()
+        signature = self._hmac(password, payload)
 
         return {
             "signature": base64.b64encode(signature).decode('utf-8'),
             "algorithm": self.ALGORITHM_HMAC_SHA256,
-            "timestamp": now_datetime().isoformat(),
-            "payload_hash": hashlib.sha256(payload.encode('utf-8')).hexdigest()
+            "timestamp": timestamp or now_datetime().isoformat(),
+            "payload_hash": hashlib.sha256(_to_bytes(payload)).hexdigest()
         }
 
-    def sign_with_ne_key(self, payload):
+    def sign_with_ne_key(self, payload, timestamp=None):
         """
         Sign payload using NE-KEY (eTax API key).
 
         Uses the special NE-KEY provided by ITC for API authentication.
 
         Args:
-            payload: Payload string to sign
+            payload: Payload to sign (str or bytes)
+            timestamp: ISO timestamp of the payload (defaults to now)
 
         Returns:
             dict: Signature result with NE-KEY header
         """
-        ne_key = self.settings.get_password("ne_key")
+        ne_key = self._get_ne_key()
 
         if not ne_key:
             raise DigitalSignatureError(_("NE-KEY not configured in eTax Settings"))
 
         # Create signature using NE-KEY
-        signature = hmac.new(
-            ne_key.encode('utf-8'),
-            payload.encode('utf-8'),
-            hashlib.sha256
-        ).digest()
+        signature = self._hmac(ne_key, payload)
 
         return {
             "signature": base64.b64encode(signature).decode('utf-8'),
             "algorithm": self.ALGORITHM_HMAC_SHA256,
             "ne_key_header": ne_key,  # Used in request header
-            "timestamp": now_datetime().isoformat()
+            "timestamp": timestamp or now_datetime().isoformat()
         }
 
     def verify_signature(self, payload, signature, secret):
@@ -175,25 +228,34 @@ class ETaxDigitalSignature:
         Verify a signature.
 
         Args:
-            payload: Original payload
+            payload: Original payload (str or bytes)
             signature: Base64-encoded signature
             secret: Secret key used for signing
 
         Returns:
             bool: True if signature is valid
         """
-        expected = hmac.new(
-            secret.encode('utf-8'),
-            payload.encode('utf-8'),
-            hashlib.sha256
-        ).digest()
-
         try:
             actual = base64.b64decode(signature)
-            return hmac.compare_digest(expected, actual)
         except Exception:
             return False
 
+        return self.verify_signature_bytes(payload, actual, secret)
+
+    def verify_signature_bytes(self, payload, signature, secret):
+        """
+        Verify an already-decoded signature.
+
+        Args:
+            payload: Original payload (str or bytes)
+            signature: Raw signature bytes
+            secret: Secret key used for signing
+
+        Returns:
+            bool: True if signature is valid
+        """
+        return hmac.compare_digest(self._hmac(secret, payload), signature)
+
     def create_submission_signature(self, report_data, report_detail):
         """
         Create complete signature for report submission.
@@ -207,16 +269,18 @@ class ETaxDigitalSignature:
         Returns:
             dict: Complete signature package
         """
-        payload = self.create_signature_payload(report_data, report_detail)
+        # One timestamp for both the signed payload and the result
+        timestamp = now_datetime().isoformat()
+        payload = self._create_payload_bytes(report_data, report_detail, timestamp)
 
         # Use NE-KEY signing if available, otherwise password-based
-        if self.settings.get_password("ne_key"):
-            signature_result = self.sign_with_ne_key(payload)
+        if self._get_ne_key():
+            signature_result = self.sign_with_ne_key(payload, timestamp=timestamp)
         else:
-            signature_result = self.sign_with_password(payload)
+            signature_result = self.sign_with_password(payload, timestamp=timestamp)
 
         return {
-            "payload": payload,
+            "payload": payload.decode('utf-8'),
             "signature": signature_result["signature"],
             "algorithm": signature_result["algorithm"],
             "timestamp": signature_result["timestamp"],
@@ -296,18 +360,22 @@ def verify_report_signature(payload, signature, settings=None):
     Returns:
         bool: True if valid
     """
-    if not settings:
-        settings = frappe.get_single("eTax Settings")
-
     signer = ETaxDigitalSignature(settings)
 
+    # Decode/encode once for both candidate keys
+    try:
+        signature_bytes = base64.b64decode(signature)
+    except Exception:
+        return False
+    payload_bytes = _to_bytes(payload)
+
     # Try NE-KEY first, then password
-    ne_key = settings.get_password("ne_key")
-    if ne_key and signer.verify_signature(payload, signature, ne_key):
+    ne_key = signer._get_ne_key()
+    if ne_key and signer.verify_signature_bytes(payload_bytes, signature_bytes, ne_key):
         return True
 
-    password = settings.get_password("password")
-    if password and signer.verify_signature(payload, signature, password):
+    password = signer._get_password()
+    if password and signer.verify_signature_bytes(payload_bytes, signature_bytes, password):
         return True
 
     return False
@@ -329,25 +397,36 @@ def get_signature_for_report(report_no):
 
     get_client()
 
-    # Get report data
-    report = frappe.get_doc("eTax Report", report_no)
+    # Get report data (only the fields that are signed)
+    report = frappe.db.get_value(
+        "eTax Report",
+        report_no,
+        ["report_no", "tax_type_id", "branch_id", "period_year", "period", "form_no"],
+        as_dict=True
+    )
+    if not report:
+        frappe.throw(_("eTax Report {0} not found").format(report_no), frappe.DoesNotExistError)
 
-    # Build report_data from doc
     report_data = {
-        "reportNo": report.report_no,  # type: ignore
-        "taxTypeId": report.tax_type_id,  # type: ignore
-        "branchId": report.branch_id,  # type: ignore
-        "year": report.period_year,  # type: ignore
-        "period": report.period,  # type: ignore
-        "formNo": report.form_no  # type: ignore
+        "reportNo": report.report_no,
+        "taxTypeId": report.tax_type_id,
+        "branchId": report.branch_id,
+        "year": report.period_year,
+        "period": report.period,
+        "formNo": report.form_no
     }
 
-    # Get report detail from child table
-    data_items = report.get("data_items") or []
-    report_detail = [
-        {"tagKey": item.tag_key, "tagId": item.tag_id, "value": item.value}  # type: ignore
-        for item in data_items
-    ]
+    # Get report detail from child table rows directly, in row order
+    report_detail = frappe.db.sql(
+        """
+        SELECT tag_key AS tagKey, tag_id AS tagId, value
+        FROM `tabeTax Report Data Item`
+        WHERE parent = %s AND parenttype = 'eTax Report' AND parentfield = 'data_items'
+        ORDER BY idx
+        """,
+        report_no,
+        as_dict=True
+    )
 
     # Sign
     signature = sign_report(report_data, report_detail)
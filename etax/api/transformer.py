@@ -11,6 +11,9 @@ Transforms data between eTax API format and Frappe DocType format.
 
 from datetime import datetime
 
+# Formats accepted from the API, in the order they are tried
+DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S")
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
 
 
 class ETaxTransformer:
@@ -34,6 +37,9 @@ class ETaxTransformer:
         11: "Received"      # Хүлээн авсан
     }
 
+    # Status names to eTax codes
+    STATUS_MAP_REVERSE = {v: k for k, v in STATUS_MAP.items()}
+
     STATUS_MAP_MN = {
         2: "Шинэ",
         3: "Илгээсэн",
@@ -42,6 +48,11 @@ class ETaxTransformer:
         11: "Хүлээн авсан"
     }
 
+    def __init__(self):
+        # Last format that parsed, tried first (API rows share one format)
+        self._last_date_fmt = None
+        self._last_dt_fmt = None
+
     # =========================================================================
     # Report List Transformation
     # =========================================================================
@@ -56,31 +67,35 @@ class ETaxTransformer:
         Returns:
             dict: Data for eTax Report DocType
         """
+        # Bound once - this runs per report in bulk syncs
+        g = api_data.get
+        status_code = g("taxReportStatus")
+
         return {
-            "report_id": api_data.get("id"),
-            "report_no": api_data.get("reportNo"),
-            "tax_report_code": api_data.get("taxReportCode"),
-            "tax_type_id": api_data.get("taxTypeId"),
-            "tax_type_code": api_data.get("taxTypeCode"),
-            "tax_type_name": api_data.get("taxTypeName"),
-            "form_no": api_data.get("formNo"),
-            "branch_id": api_data.get("branchId"),
-            "branch_code": api_data.get("branchCode"),
-            "branch_name": api_data.get("branchName"),
-            "period_id": api_data.get("periodId"),
-            "period_year": api_data.get("periodYear"),
-            "period": api_data.get("period"),
-            "period_name": api_data.get("periodName"),
-            "return_begin_date": self._parse_date(api_data.get("returnBeginDate")),
-            "return_due_date": self._parse_date(api_data.get("returnDueDate")),
-            "status": self.STATUS_MAP.get(api_data.get("taxReportStatus"), "Unknown"),
-            "status_code": api_data.get("taxReportStatus"),
-            "status_name": api_data.get("taxReportStatusName"),
-            "license_no": api_data.get("licenseNo"),
-            "revenue_id": api_data.get("revenueId"),
-            "sub_branch_id": api_data.get("subBranchId"),
-            "sub_branch_code": api_data.get("subBranchCode"),
-            "sub_branch_name": api_data.get("subBranchName")
+            "report_id": g("id"),
+            "report_no": g("reportNo"),
+            "tax_report_code": g("taxReportCode"),
+            "tax_type_id": g("taxTypeId"),
+            "tax_type_code": g("taxTypeCode"),
+            "tax_type_name": g("taxTypeName"),
+            "form_no": g("formNo"),
+            "branch_id": g("branchId"),
+            "branch_code": g("branchCode"),
+            "branch_name": g("branchName"),
+            "period_id": g("periodId"),
+            "period_year": g("periodYear"),
+            "period": g("period"),
+            "period_name": g("periodName"),
+            "return_begin_date": self._parse_date(g("returnBeginDate")),
+            "return_due_date": self._parse_date(g("returnDueDate")),
+            "status": self.STATUS_MAP.get(status_code, "Unknown"),
+            "status_code": status_code,
+            "status_name": g("taxReportStatusName"),
+            "license_no": g("licenseNo"),
+            "revenue_id": g("revenueId"),
+            "sub_branch_id": g("subBranchId"),
+            "sub_branch_code": g("subBranchCode"),
+            "sub_branch_name": g("subBranchName")
         }
 
     def report_to_api(self, doc):
@@ -124,39 +139,41 @@ class ETaxTransformer:
         report_data = api_data.get("reportData", {})
         detail = api_data.get("reportDataDetail", [])
 
+        g = report_data.get
         form_data = {
-            "report_no": report_data.get("reportNo"),
-            "report_uuid": report_data.get("reportNoStr"),
-            "tax_type_id": report_data.get("taxTypeId"),
-            "tax_type_code": report_data.get("taxTypeCode"),
-            "tax_type_desc": report_data.get("taxTypeDesc"),
-            "branch_id": report_data.get("branchId"),
-            "branch_code": report_data.get("branchCode"),
-            "branch_name": report_data.get("branchName"),
-            "form_no": report_data.get("formNo"),
-            "ent_id": report_data.get("entId"),
-            "ent_name": report_data.get("entName"),
-            "pin": report_data.get("pin"),
-            "period_year": report_data.get("year"),
-            "period": report_data.get("period"),
-            "is_x_report": report_data.get("isXreport") == 1,
-            "status_code": report_data.get("reportStatusId"),
-            "status_name": report_data.get("reportStatusName"),
-            "received_date": self._parse_datetime(report_data.get("recievedDate")),
-            "received_emp": report_data.get("recievedEmp"),
-            "submitted_date": self._parse_datetime(report_data.get("submittedDate")),
-            "done_date": self._parse_datetime(report_data.get("doneDate"))
+            "report_no": g("reportNo"),
+            "report_uuid": g("reportNoStr"),
+            "tax_type_id": g("taxTypeId"),
+            "tax_type_code": g("taxTypeCode"),
+            "tax_type_desc": g("taxTypeDesc"),
+            "branch_id": g("branchId"),
+            "branch_code": g("branchCode"),
+            "branch_name": g("branchName"),
+            "form_no": g("formNo"),
+            "ent_id": g("entId"),
+            "ent_name": g("entName"),
+            "pin": g("pin"),
+            "period_year": g("year"),
+            "period": g("period"),
+            "is_x_report": g("isXreport") == 1,
+            "status_code": g("reportStatusId"),
+            "status_name": g("reportStatusName"),
+            "received_date": self._parse_datetime(g("recievedDate")),
+            "received_emp": g("recievedEmp"),
+            "submitted_date": self._parse_datetime(g("submittedDate")),
+            "done_date": self._parse_datetime(g("doneDate"))
         }
 
         # Transform detail items
-        detail_items = []
-        for item in detail:
-            detail_items.append({
+        detail_items = [
+            {
                 "tag_id": item.get("tagId"),
                 "tag_key": item.get("tagKey"),
                 "value": item.get("value"),
                 "type": item.get("type")
-            })
+            }
+            for item in detail
+        ]
 
         return {"form_data": form_data, "detail_items": detail_items}
 
@@ -185,9 +202,8 @@ class ETaxTransformer:
             "reportStatusId": None
         }
 
-        report_data_detail = []
-        for item in detail_items:
-            report_data_detail.append({
+        report_data_detail = [
+            {
                 "tagId": item.tag_id,
                 "tagKey": item.tag_key,
                 "value": str(item.value) if item.value else "",
@@ -196,7 +212,9 @@ class ETaxTransformer:
                 "errType": "",
                 "type": item.type or 1,
                 "isValid": True
-            })
+            }
+            for item in detail_items
+        ]
 
         return report_data, report_data_detail
 
@@ -225,54 +243,47 @@ class ETaxTransformer:
             "report_frequency": form_info.get("reportFrequency"),
             "report_statement": form_info.get("reportStatement"),
             "version": form_info.get("version"),
-            "sections": []
-        }
-
-        # Transform sections
-        for section in sections:
-            section_data = {
-                "title": section.get("title"),
-                "key": section.get("key"),
-                "section_no": section.get("sectionNo"),
-                "sequence": section.get("sequence"),
-                "type": section.get("type"),
-                "header_html": section.get("headerHtml"),
-                "headers": section.get("headers", []),
-                "rows": []
-            }
-
-            # Transform rows
-            for row in section.get("rows", []):
-                row_data = {
-                    "row_number": row.get("rowNumber"),
-                    "hidden": row.get("hidden", False),
-                    "cells": []
+            # Sections -> rows -> cells
+            "sections": [
+                {
+                    "title": section.get("title"),
+                    "key": section.get("key"),
+                    "section_no": section.get("sectionNo"),
+                    "sequence": section.get("sequence"),
+                    "type": section.get("type"),
+                    "header_html": section.get("headerHtml"),
+                    "headers": section.get("headers", []),
+                    "rows": [
+                        {
+                            "row_number": row.get("rowNumber"),
+                            "hidden": row.get("hidden", False),
+                            "cells": [
+                                {
+                                    "name": cell.get("name"),
+                                    "column_key": cell.get("columnKey"),
+                                    "column_sequence": cell.get("columnSequence"),
+                                    "tag_id": cell.get("tagId"),
+                                    "default_value": cell.get("defaultValue"),
+                                    "regex": cell.get("regex"),
+                                    "expression": cell.get("expression"),
+                                    "data_type": cell.get("dataType"),
+                                    "draw_type": cell.get("drawType"),
+                                    "is_tag": cell.get("isTag"),
+                                    "is_disable": cell.get("isDisable"),
+                                    "allow_minus": cell.get("allowMinus"),
+                                    "row_span": cell.get("rowSpan"),
+                                    "is_assessment": cell.get("isAssessment"),
+                                    "validations": cell.get("validations", [])
+                                }
+                                for cell in row.get("cells", [])
+                            ]
+                        }
+                        for row in section.get("rows", [])
+                    ]
                 }
-
-                # Transform cells
-                for cell in row.get("cells", []):
-                    cell_data = {
-                        "name": cell.get("name"),
-                        "column_key": cell.get("columnKey"),
-                        "column_sequence": cell.get("columnSequence"),
-                        "tag_id": cell.get("tagId"),
-                        "default_value": cell.get("defaultValue"),
-                        "regex": cell.get("regex"),
-                        "expression": cell.get("expression"),
-                        "data_type": cell.get("dataType"),
-                        "draw_type": cell.get("drawType"),
-                        "is_tag": cell.get("isTag"),
-                        "is_disable": cell.get("isDisable"),
-                        "allow_minus": cell.get("allowMinus"),
-                        "row_span": cell.get("rowSpan"),
-                        "is_assessment": cell.get("isAssessment"),
-                        "validations": cell.get("validations", [])
-                    }
-                    row_data["cells"].append(cell_data)
-
-                section_data["rows"].append(row_data)
-
-            structure["sections"].append(section_data)
+                for section in sections
+            ]
+        }
 
         return structure
 
@@ -290,11 +301,12 @@ class ETaxTransformer:
         Returns:
             dict: Sheet data
         """
+        g = api_data.get
         return {
-            "sheet_form_no": api_data.get("sheetFormNo"),
-            "sheet_code": api_data.get("sheetCode"),
-            "report_no": api_data.get("reportNo"),
-            "map_id": api_data.get("mapId"),
+            "sheet_form_no": g("sheetFormNo"),
+            "sheet_code": g("sheetCode"),
+            "report_no": g("reportNo"),
+            "map_id": g("mapId"),
             "rows": [
                 {
                     "row_number": item.get("rowNumber"),
@@ -302,7 +314,7 @@ class ETaxTransformer:
                     "type": item.get("type"),
                     "cells": item.get("cells", [])
                 }
-                for item in api_data.get("sheetDataDetail", [])
+                for item in g("sheetDataDetail", [])
             ]
         }
 
@@ -319,28 +331,27 @@ class ETaxTransformer:
         Returns:
             dict: API request payload
         """
-        sheet_data_detail = []
-
-        for row in rows:
-            cells = []
-            for cell in row.get("cells", []):
-                cells.append({
-                    "key": cell.get("key"),
-                    "value": str(cell.get("value", "")),
-                    "isValid": True,
-                    "toolTipOpen": False,
-                    "errType": "",
-                    "errMsg": ""
-                })
-
-            sheet_data_detail.append({
+        sheet_data_detail = [
+            {
                 "rowNumber": row.get("row_number"),
                 "isTotal": 1 if row.get("is_total") else 0,
                 "isChecked": True,
                 "isEdit": False,
                 "type": row.get("type"),
-                "cells": cells
-            })
+                "cells": [
+                    {
+                        "key": cell.get("key"),
+                        "value": str(cell.get("value", "")),
+                        "isValid": True,
+                        "toolTipOpen": False,
+                        "errType": "",
+                        "errMsg": ""
+                    }
+                    for cell in row.get("cells", [])
+                ]
+            }
+            for row in rows
+        ]
 
         return {
             "sheetFormNo": sheet_form_no,
@@ -363,27 +374,28 @@ class ETaxTransformer:
         Returns:
             dict: Data for eTax Taxpayer DocType
         """
-        branch_view = api_data.get("taxpayerBranchView", {})
-        ref_ent_type = api_data.get("refEntType", {})
-        ref_status = api_data.get("refEntStatus", {})
+        g = api_data.get
+        branch_view = g("taxpayerBranchView", {})
+        ref_ent_type = g("refEntType", {})
+        ref_status = g("refEntStatus", {})
 
         return {
-            "ent_id": api_data.get("id"),
-            "tin": api_data.get("Tin"),
-            "pin": api_data.get("Pin"),
-            "entity_name": api_data.get("entityName"),
-            "ent_type": api_data.get("entType"),
+            "ent_id": g("id"),
+            "tin": g("Tin"),
+            "pin": g("Pin"),
+            "entity_name": g("entityName"),
+            "ent_type": g("entType"),
             "ent_type_name": ref_ent_type.get("name"),
-            "ent_status": api_data.get("entStatus"),
+            "ent_status": g("entStatus"),
             "ent_status_name": ref_status.get("name"),
-            "parent_id": api_data.get("parentId"),
-            "is_confirmed": api_data.get("isConfirmed") == 1,
+            "parent_id": g("parentId"),
+            "is_confirmed": g("isConfirmed") == 1,
             "branch_code": branch_view.get("branchCode"),
             "branch_name": branch_view.get("branchName"),
             "sub_branch_code": branch_view.get("subBranchCode"),
             "sub_branch_name": branch_view.get("subBranchName"),
-            "agree_general_role_user": api_data.get("agreeGeneralRoleUser"),
-            "ebarimt_login": api_data.get("ebarimtLogin")
+            "agree_general_role_user": g("agreeGeneralRoleUser"),
+            "ebarimt_login": g("ebarimtLogin")
         }
 
     # =========================================================================
@@ -399,12 +411,20 @@ class ETaxTransformer:
             if isinstance(date_str, datetime):
                 return date_str.date()
 
+            if self._last_date_fmt:
+                try:
+                    return datetime.strptime(date_str, self._last_date_fmt).date()
+                except ValueError:
+                    pass
+
             # Try common formats
-            for fmt in ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S"]:
+            for fmt in DATE_FORMATS:
                 try:
-                    return datetime.strptime(date_str, fmt).date()
+                    parsed = datetime.strptime(date_str, fmt).date()
                 except ValueError:
                     continue
+                self._last_date_fmt = fmt
+                return parsed
 
             return None
         except Exception:
@@ -419,12 +439,20 @@ class ETaxTransformer:
             if isinstance(dt_str, datetime):
                 return dt_str
 
+            if self._last_dt_fmt:
+                try:
+                    return datetime.strptime(dt_str, self._last_dt_fmt)
+                except ValueError:
+                    pass
+
             # Try common formats
-            for fmt in ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d"]:
+            for fmt in DATETIME_FORMATS:
                 try:
-                    return datetime.strptime(dt_str, fmt)
+                    parsed = datetime.strptime(dt_str, fmt)
                 except ValueError:
                     continue
+                self._last_dt_fmt = fmt
+                return parsed
 
             return None
         except Exception:
@@ -432,10 +460,17 @@ class ETaxTransformer:
 
     def _get_status_code(self, status_name):
         """Get status code from status name"""
-        reverse_map = {v: k for k, v in self.STATUS_MAP.items()}
-        return reverse_map.get(status_name, 2)  # Default to "New"
+        return self.STATUS_MAP_REVERSE.get(status_name, 2)  # Default to "New"
+
+
+# Shared instance - the transformer only keeps format-hint caches, which
+# are safe to share between requests and threads
+_transformer = None
 
 
 def get_transformer():
-    """Get ETaxTransformer instance"""
-    return ETaxTransformer()
+    """Get the shared ETaxTransformer instance"""
+    global _transformer
+    if _transformer is None:
+        _transformer = ETaxTransformer()
+    return _transformer
@@ -13,6 +13,14 @@ import frappe
 from frappe import utils
 from frappe.model.document import Document
 
+# Approval roles, highest first
+APPROVAL_ROLE_PRIORITY = (
+    "Tax Report Approver",
+    "Tax Report Reviewer",
+    "Accounts Manager",
+    "Accounts User",
+)
+
 
 class eTaxApprovalLog(Document):
     """eTax Approval Log - Audit trail for tax report approvals"""
@@ -31,18 +39,33 @@ class eTaxApprovalLog(Document):
 
     def _get_user_approval_role(self):
         """Get the user's highest approval role"""
-        user_roles = frappe.get_roles(self.action_by)
-
-        if "Tax Report Approver" in user_roles:
-            return "Tax Report Approver"
-        elif "Tax Report Reviewer" in user_roles:
-            return "Tax Report Reviewer"
-        elif "Accounts Manager" in user_roles:
-            return "Accounts Manager"
-        elif "Accounts User" in user_roles:
-            return "Accounts User"
-        else:
-            return "User"
+        return get_user_approval_role(self.action_by)
+
+
+def get_user_approval_role(user):
+    """
+    Get a user's highest approval role, resolved once per request.
+
+    The result is kept on frappe.local, which Frappe resets for every
+    request and job, so role changes apply from the next request.
+
+    Args:
+        user: User name
+
+    Returns:
+        str: Approval role, or "User"
+    """
+    resolved = getattr(frappe.local, "etax_approval_roles", None)
+    if resolved is None:
+        resolved = frappe.local.etax_approval_roles = {}
+
+    role = resolved.get(user)
+    if role is None:
+        user_roles = set(frappe.get_roles(user))
+        role = resolved[user] = next(
+            (r for r in APPROVAL_ROLE_PRIORITY if r in user_roles), "User"
+        )
+    return role
 
 
 def create_approval_log(report, action, from_status=None, to_status=None, comments=None):
@@ -14,6 +14,26 @@ from frappe.model.document import Document
 from frappe.utils import flt, now_datetime
 
 
+def _exists_cached(doctype, name):
+    """
+    frappe.db.exists, remembered for the rest of the request.
+
+    Only hits are kept (on frappe.local, reset per request and job), so
+    a document created later in the same request is still found.
+    """
+    found = getattr(frappe.local, "etax_existing_docs", None)
+    if found is None:
+        found = frappe.local.etax_existing_docs = set()
+
+    key = (doctype, name)
+    if key in found:
+        return True
+    if frappe.db.exists(doctype, name):
+        found.add(key)
+        return True
+    return False
+
+
 class eTaxInvoiceLink(Document):
     """eTax Invoice Link - tracks which invoices are included in tax declarations."""
     
@@ -26,7 +46,7 @@ class eTaxInvoiceLink(Document):
     def validate_reference(self):
         """Validate that the reference document exists."""
         if self.reference_doctype and self.reference_name:
-            if not frappe.db.exists(self.reference_doctype, self.reference_name):
+            if not _exists_cached(self.reference_doctype, self.reference_name):
                 frappe.throw(
                     _("Reference {0} {1} does not exist").format(
                         self.reference_doctype, self.reference_name
@@ -43,23 +63,30 @@ class eTaxInvoiceLink(Document):
         if not self.reference_doctype or not self.reference_name:
             return
         
-        doc = frappe.get_doc(self.reference_doctype, self.reference_name)
-        
+        # Only the party field of the invoice is needed, not the whole doc
         if self.reference_doctype == "Sales Invoice":
+            if self.customer and self.customer_tin:
+                return
+            customer = frappe.db.get_value("Sales Invoice", self.reference_name, "customer")
             if not self.customer:
-                self.customer = doc.customer
+                self.customer = customer
             if not self.customer_tin:
-                self.customer_tin = frappe.db.get_value(
-                    "Customer", doc.customer, "custom_tax_id"
-                ) or frappe.db.get_value("Customer", doc.customer, "tax_id")
+                row = frappe.db.get_value(
+                    "Customer", customer, ["custom_tax_id", "tax_id"], as_dict=True
+                ) or {}
+                self.customer_tin = row.get("custom_tax_id") or row.get("tax_id")
         
         elif self.reference_doctype == "Purchase Invoice":
+            if self.supplier and self.supplier_tin:
+                return
+            supplier = frappe.db.get_value("Purchase Invoice", self.reference_name, "supplier")
             if not self.supplier:
-                self.supplier = doc.supplier
+                self.supplier = supplier
             if not self.supplier_tin:
-                self.supplier_tin = frappe.db.get_value(
-                    "Supplier", doc.supplier, "custom_tax_id"
-                ) or frappe.db.get_value("Supplier", doc.supplier, "tax_id")
+                row = frappe.db.get_value(
+                    "Supplier", supplier, ["custom_tax_id", "tax_id"], as_dict=True
+                ) or {}
+                self.supplier_tin = row.get("custom_tax_id") or row.get("tax_id")
     
     def include_in_declaration(self, declaration_name: str):
         """
@@ -139,17 +166,83 @@ def bulk_include_in_declaration(links: list, declaration_name: str):
         import json
         links = json.loads(links)
     
-    count = 0
-    for link_name in links:
-        doc = frappe.get_doc("eTax Invoice Link", link_name)
-        doc.include_in_declaration(declaration_name)
-        count += 1
+    links = tuple(set(links))
+    if not links:
+        return {"success": True, "count": 0}
+    
+    # The UPDATE bypasses Link validation and the missing-document error
+    # Document.save would raise, so check both up front
+    if not frappe.db.exists("eTax Report", declaration_name):
+        frappe.throw(
+            _("eTax Report {0} not found").format(declaration_name),
+            frappe.DoesNotExistError
+        )
+    
+    rows = frappe.get_all(
+        "eTax Invoice Link",
+        filters={"name": ["in", links]},
+        fields=["name", "status", "etax_declaration", "included_date"]
+    )
+    missing = set(links) - {row.name for row in rows}
+    if missing:
+        frappe.throw(
+            _("eTax Invoice Link {0} not found").format(", ".join(sorted(missing))),
+            frappe.DoesNotExistError
+        )
+    
+    # Only Pending links move, so Included/Submitted ones are never reset
+    pending = [row for row in rows if row.status == "Pending"]
+    if not pending:
+        return {"success": True, "count": 0}
+    
+    # One UPDATE for all links; the status change does not depend on
+    # validate(), which only checks the reference and amounts
+    now = now_datetime()
+    frappe.db.sql("""
+        UPDATE `tabeTax Invoice Link`
+        SET status = 'Included', etax_declaration = %s, included_date = %s,
+            modified = %s, modified_by = %s
+        WHERE name IN %s AND status = 'Pending'
+    """, (declaration_name, now, now, frappe.session.user, tuple(row.name for row in pending)))
+    
+    # Rows actually changed (a link included concurrently isn't counted)
+    count = frappe.db._cursor.rowcount
+    
+    _add_inclusion_versions(pending, declaration_name, now)
     
     frappe.db.commit()
     
     return {"success": True, "count": count}
 
 
+def _add_inclusion_versions(rows, declaration_name, now):
+    """
+    Write the Version entries Document.save would have written
+    (eTax Invoice Link has track_changes) for links moved to Included.
+    """
+    user = frappe.session.user
+    fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus",
+        "ref_doctype", "docname", "data"]
+    values = [
+        (
+            frappe.generate_hash(length=10), now, now, user, user, 0,
+            "eTax Invoice Link", row.name,
+            frappe.as_json({
+                "added": [],
+                "changed": [
+                    ["status", row.status, "Included"],
+                    ["etax_declaration", row.etax_declaration, declaration_name],
+                    ["included_date", row.included_date, now],
+                ],
+                "removed": [],
+                "row_changed": [],
+            }, indent=None)
+        )
+        for row in rows
+    ]
+    frappe.db.bulk_insert("Version", fields, values)
+
+
 @frappe.whitelist()
 def get_vat_totals(company: str, from_date: str, to_date: str):
     """
@@ -163,8 +256,9 @@ def get_vat_totals(company: str, from_date: str, to_date: str):
     Returns:
         dict: Output and Input VAT totals
     """
-    output_vat = frappe.db.sql("""
+    rows = frappe.db.sql("""
         SELECT 
+            vat_type,
             SUM(vat_amount) as vat,
             SUM(taxable_amount) as taxable,
             SUM(total_amount) as total,
@@ -172,22 +266,14 @@ def get_vat_totals(company: str, from_date: str, to_date: str):
         FROM `tabeTax Invoice Link`
         WHERE company = %s
             AND posting_date BETWEEN %s AND %s
-            AND vat_type = 'Output'
+            AND vat_type IN ('Output', 'Input')
             AND status IN ('Pending', 'Included')
-    """, (company, from_date, to_date), as_dict=True)[0]
+        GROUP BY vat_type
+    """, (company, from_date, to_date), as_dict=True)
     
-    input_vat = frappe.db.sql("""
-        SELECT 
-            SUM(vat_amount) as vat,
-            SUM(taxable_amount) as taxable,
-            SUM(total_amount) as total,
-            COUNT(*) as count
-        FROM `tabeTax Invoice Link`
-        WHERE company = %s
-            AND posting_date BETWEEN %s AND %s
-            AND vat_type = 'Input'
-            AND status IN ('Pending', 'Included')
-    """, (company, from_date, to_date), as_dict=True)[0]
+    totals = {row.vat_type: row for row in rows}
+    output_vat = totals.get("Output", {})
+    input_vat = totals.get("Input", {})
     
     return {
         "output_vat": {
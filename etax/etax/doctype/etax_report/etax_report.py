@@ -132,10 +132,10 @@ class eTaxReport(Document):
         """
         try:
             from etax.api.client import ETaxClient
-            from etax.api.transformer import ETaxTransformer
+            from etax.api.transformer import get_transformer
 
             client = ETaxClient()
-            transformer = ETaxTransformer()
+            transformer = get_transformer()
 
             # Transform data
             report_data, report_data_detail = transformer.form_data_to_api(
@@ -169,10 +169,10 @@ class eTaxReport(Document):
 
         try:
             from etax.api.client import ETaxClient
-            from etax.api.transformer import ETaxTransformer
+            from etax.api.transformer import get_transformer
 
             client = ETaxClient()
-            transformer = ETaxTransformer()
+            transformer = get_transformer()
 
             # Transform data
             report_data = transformer.report_to_api(self)
@@ -203,10 +203,10 @@ class eTaxReport(Document):
         """
         try:
             from etax.api.client import ETaxClient
-            from etax.api.transformer import ETaxTransformer
+            from etax.api.transformer import get_transformer
 
             client = ETaxClient()
-            transformer = ETaxTransformer()
+            transformer = get_transformer()
 
             # Get form data
             api_data = client.get_form_data(self.report_no, self.ent_id)
@@ -264,10 +264,10 @@ def sync_reports(ent_id=None):
         dict: Sync result
     """
     from etax.api.client import ETaxClient
-    from etax.api.transformer import ETaxTransformer
+    from etax.api.transformer import get_transformer
 
     client = ETaxClient()
-    transformer = ETaxTransformer()
+    transformer = get_transformer()
 
     reports = client.get_report_list(ent_id)
 
@@ -12,6 +12,7 @@ Manages configuration for eTax (Electronic Tax Report System) API integration.
 import frappe
 from frappe import _
 from frappe.model.document import Document
+from frappe.utils import cint
 
 
 class eTaxSettings(Document):
@@ -159,10 +160,13 @@ class eTaxSettings(Document):
             # Get pending reports
             reports = client.get_report_list()
 
+            # Look up all existing reports in one query instead of one per report
+            existing = self._get_existing_reports(reports)
+
             synced = 0
             for report in reports:
                 # Create or update eTax Report
-                self._sync_report(report)
+                self._sync_report(report, existing)
                 synced += 1
 
             # Update last sync time
@@ -179,20 +183,64 @@ class eTaxSettings(Document):
             frappe.log_error(f"eTax sync failed: {e!s}", "eTax")
             return {"success": False, "message": str(e)}
 
-    def _sync_report(self, report_data):
-        """Sync a single report from API data"""
-        from etax.api.transformer import ETaxTransformer
+    @staticmethod
+    def _report_key(report_no, tax_type_code, period_year, period):
+        """Identity of an eTax Report, normalised for dict lookups"""
+        return (cint(report_no), tax_type_code or "", cint(period_year), cint(period))
+
+    def _get_existing_reports(self, reports):
+        """
+        Map report keys to existing eTax Report names in one query.
+
+        Args:
+            reports: Report list from the API
+
+        Returns:
+            dict: _report_key(...) -> eTax Report name
+        """
+        report_nos = list({r.get("reportNo") for r in reports if r.get("reportNo") is not None})
+        if not report_nos:
+            return {}
+
+        rows = frappe.get_all(
+            "eTax Report",
+            filters={"report_no": ["in", report_nos]},
+            fields=["name", "report_no", "tax_type_code", "period_year", "period"]
+        )
+        return {
+            self._report_key(r.report_no, r.tax_type_code, r.period_year, r.period): r.name
+            for r in rows
+        }
+
+    def _sync_report(self, report_data, existing_reports=None):
+        """
+        Sync a single report from API data.
+
+        Args:
+            report_data: Report from the API
+            existing_reports: Prefetched _get_existing_reports() map (optional)
+        """
+        from etax.api.transformer import get_transformer
 
-        transformer = ETaxTransformer()
+        transformer = get_transformer()
         doc_data = transformer.api_to_report(report_data)
 
         # Check if report exists
-        existing = frappe.db.exists("eTax Report", {
-            "report_no": doc_data.get("report_no"),
-            "tax_type_code": doc_data.get("tax_type_code"),
-            "period_year": doc_data.get("period_year"),
-            "period": doc_data.get("period")
-        })
+        if existing_reports is not None:
+            key = self._report_key(
+                doc_data.get("report_no"),
+                doc_data.get("tax_type_code"),
+                doc_data.get("period_year"),
+                doc_data.get("period")
+            )
+            existing = existing_reports.get(key)
+        else:
+            existing = frappe.db.exists("eTax Report", {
+                "report_no": doc_data.get("report_no"),
+                "tax_type_code": doc_data.get("tax_type_code"),
+                "period_year": doc_data.get("period_year"),
+                "period": doc_data.get("period")
+            })
 
         if existing:
             doc = frappe.get_doc("eTax Report", existing)
@@ -204,6 +252,9 @@ class eTaxSettings(Document):
                 **doc_data
             })
             doc.insert()
+            if existing_reports is not None:
+                # A report repeated in the same list updates this one
+                existing_reports[key] = doc.name
 
         return doc
 
@@ -26,7 +26,7 @@ app_description = (
 )
 app_email = "dev@frappe.mn"
 app_license = "gpl-3.0"
-app_version = "1.3.0"
+app_version = "1.5.0"
 
 # Required Apps - ERPNext required for accounting data
 required_apps = ["frappe", "erpnext"]
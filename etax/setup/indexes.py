@@ -20,7 +20,8 @@ import frappe
 
 # Index definitions: (table, fields, name, unique)
 INDEXES = [
-    # eTax Report - Primary lookups
+    # eTax Report - Primary lookups (also the conflict key for
+    # BatchProcessor upserts: INSERT ... ON DUPLICATE KEY UPDATE)
     {
         "table": "tabeTax Report",
         "fields": ["report_no"],
@@ -124,7 +125,8 @@ def setup_indexes():
 
 def create_index_safe(table, fields, name, unique=False):
     """Create index if it doesn't exist"""
-    if not frappe.db.table_exists(table):
+    # table_exists() expects the DocType name, not the table name
+    if not frappe.db.table_exists(table.removeprefix("tab")):
         return False
 
     # Check if index exists
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Digital Consulting Service LLC (Mongolia)
+# License: GNU General Public License v3
+
+"""
+Tests for eTax OAuth2 token handling
+"""
+
+import time
+from unittest.mock import MagicMock, patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from etax.api.auth import (
+    MAX_RETRY_SLEEP,
+    TOKEN_WAIT_TIMEOUT,
+    ETaxAuth,
+    ETaxAuthError,
+    _JitteredRetry,
+    _token_request_budget,
+)
+
+
+def _make_auth():
+    """ETaxAuth on mock settings (no eTax Settings or version lookups)"""
+    settings = MagicMock()
+    settings.timeout = 30
+    settings.environment = "Staging"
+    settings.username = "test_user"
+    return ETaxAuth(settings)
+
+
+def _cached_token(access_token, expires_in=300):
+    """Token dict as stored in Redis by ETaxCache.set_token"""
+    return {
+        "access_token": access_token,
+        "expires_in": expires_in,
+        "expires_at": int(time.time()) + expires_in
+    }
+
+
+class TestTokenRefreshLock(FrappeTestCase):
+    """Tests for the single-worker token refresh"""
+
+    @patch("etax.api.auth.ETaxCache")
+    def test_leader_fetches_and_releases(self, mock_cache):
+        """Test the lock holder logs in once and releases the lock"""
+        mock_cache.acquire_token_lock.return_value = "owner-1"
+        auth = _make_auth()
+
+        with patch.object(ETaxAuth, "_fetch_new_token", return_value="new_token") as mock_fetch:
+            self.assertEqual(auth._request_new_token(), "new_token")
+
+        mock_fetch.assert_called_once()
+        mock_cache.release_token_lock.assert_called_once_with("owner-1", auth.token_cache_key)
+
+    @patch("etax.api.auth.ETaxCache")
+    def test_lock_released_on_failure(self, mock_cache):
+        """Test a failed login still releases the lock"""
+        mock_cache.acquire_token_lock.return_value = "owner-1"
+        auth = _make_auth()
+
+        with patch.object(ETaxAuth, "_fetch_new_token", side_effect=ETaxAuthError("denied")):
+            with self.assertRaises(ETaxAuthError):
+                auth._request_new_token()
+
+        mock_cache.release_token_lock.assert_called_once()
+
+    @patch("etax.api.auth.ETaxCache")
+    def test_lock_ttl_covers_request_budget(self, mock_cache):
+        """Test the lock outlives the worst-case token request"""
+        mock_cache.acquire_token_lock.return_value = "owner-1"
+        auth = _make_auth()
+
+        with patch.object(ETaxAuth, "_fetch_new_token", return_value="new_token"):
+            auth._request_new_token()
+
+        ttl_ms = mock_cache.acquire_token_lock.call_args[1]["ttl_ms"]
+        self.assertEqual(ttl_ms, int(_token_request_budget(30) * 1000))
+        self.assertGreater(ttl_ms, 30 * 1000)
+
+    @patch("etax.api.auth.time.sleep")
+    @patch("etax.api.auth.ETaxCache")
+    def test_waiter_adopts_leader_token(self, mock_cache, mock_sleep):
+        """Test a worker that loses the race picks up the published token"""
+        mock_cache.acquire_token_lock.return_value = None
+        mock_cache.get_token.side_effect = [_cached_token("stale"), _cached_token("fresh")]
+        auth = _make_auth()
+        auth._token = "stale"
+
+        with patch.object(ETaxAuth, "_fetch_new_token") as mock_fetch:
+            self.assertEqual(auth._request_new_token(), "fresh")
+
+        mock_fetch.assert_not_called()
+        mock_cache.release_token_lock.assert_not_called()
+        self.assertIsNotNone(auth._refresh_at)
+
+    @patch("etax.api.auth.time.sleep")
+    @patch("etax.api.auth.ETaxCache")
+    def test_waiter_deadline(self, mock_cache, mock_sleep):
+        """Test waiters give up after TOKEN_WAIT_TIMEOUT, not the lock TTL"""
+        mock_cache.acquire_token_lock.return_value = None
+        mock_cache.get_token.return_value = None
+        auth = _make_auth()
+        clock = iter(range(0, 1000))
+
+        with patch("etax.api.auth.time.monotonic", side_effect=lambda: next(clock)):
+            with self.assertRaises(ETaxAuthError):
+                auth._request_new_token()
+
+        self.assertLessEqual(mock_cache.acquire_token_lock.call_count, TOKEN_WAIT_TIMEOUT + 1)
+        self.assertLess(TOKEN_WAIT_TIMEOUT, _token_request_budget(30))
+
+    def test_retry_after_is_capped(self):
+        """Test a long Retry-After can't outlive the refresh lock"""
+        retry = _JitteredRetry(total=3, respect_retry_after_header=True)
+        response = MagicMock()
+        response.headers = {"Retry-After": "600"}
+        response.getheader = MagicMock(return_value="600")
+
+        self.assertEqual(retry.get_retry_after(response), MAX_RETRY_SLEEP)
+
+    def test_backoff_is_capped(self):
+        """Test jittered backoff never exceeds MAX_RETRY_SLEEP"""
+        retry = _JitteredRetry(total=10, backoff_factor=60)
+        for _ in range(5):
+            retry = retry.increment(method="POST", url="/token")
+
+        self.assertLessEqual(retry.get_backoff_time(), MAX_RETRY_SLEEP)
+
+
+class TestBackgroundTokenRefresh(FrappeTestCase):
+    """Tests for proactive token refresh and 401 handling"""
+
+    def setUp(self):
+        """Set up an auth handler with an in-memory token due for refresh"""
+        super().setUp()
+        self.auth = _make_auth()
+        self.auth._token = "old_token"
+        self.auth._token_expiry = int(time.time()) + 300
+        self.auth._refresh_at = time.time() - 1
+
+    @patch("frappe.enqueue")
+    @patch("etax.api.auth.ETaxCache")
+    def test_valid_token_served_in_process(self, mock_cache, mock_enqueue):
+        """Test a token not yet due for refresh doesn't touch Redis"""
+        self.auth._refresh_at = time.time() + 60
+
+        self.assertEqual(self.auth.get_token(), "old_token")
+        mock_cache.get_token.assert_not_called()
+        mock_enqueue.assert_not_called()
+
+    @patch("frappe.enqueue")
+    @patch("etax.api.auth.ETaxCache")
+    def test_adopts_rotated_token(self, mock_cache, mock_enqueue):
+        """Test a token rotated by another worker is picked up in-process"""
+        mock_cache.get_token.return_value = _cached_token("rotated_token")
+
+        self.assertEqual(self.auth.get_token(), "rotated_token")
+        mock_enqueue.assert_not_called()
+
+    @patch("frappe.enqueue")
+    @patch("etax.api.auth.ETaxCache")
+    def test_schedules_refresh(self, mock_cache, mock_enqueue):
+        """Test a due refresh is queued immediately and rechecked later"""
+        mock_cache.get_token.return_value = _cached_token("old_token")
+
+        self.assertEqual(self.auth.get_token(), "old_token")
+
+        mock_enqueue.assert_called_once()
+        self.assertFalse(mock_enqueue.call_args[1]["enqueue_after_commit"])
+        self.assertEqual(mock_enqueue.call_args[1]["job_id"], "etax_token_refresh")
+        self.assertGreater(self.auth._refresh_at, time.time())
+
+    @patch("frappe.enqueue", side_effect=Exception("queue down"))
+    @patch("etax.api.auth.ETaxCache")
+    def test_refresh_rechecked_when_queue_fails(self, mock_cache, mock_enqueue):
+        """Test a failed enqueue keeps the refresh pending"""
+        mock_cache.get_token.return_value = _cached_token("old_token")
+
+        self.assertEqual(self.auth.get_token(), "old_token")
+        self.assertIsNotNone(self.auth._refresh_at)
+
+    @patch("etax.api.auth.ETaxCache")
+    def test_rejected_token_adopts_newer(self, mock_cache):
+        """Test a 401 adopts a newer shared token without logging in"""
+        mock_cache.get_token.return_value = _cached_token("rotated_token")
+
+        with patch.object(ETaxAuth, "_request_new_token") as mock_request:
+            self.assertEqual(self.auth.renew_rejected_token(), "rotated_token")
+
+        mock_request.assert_not_called()
+
+    @patch("etax.api.auth.ETaxCache")
+    def test_rejected_token_logs_in(self, mock_cache):
+        """Test a 401 logs in again when Redis holds the rejected token"""
+        mock_cache.get_token.return_value = _cached_token("old_token")
+
+        with patch.object(ETaxAuth, "_request_new_token", return_value="new_token") as mock_request:
+            self.assertEqual(self.auth.renew_rejected_token(), "new_token")
+
+        mock_request.assert_called_once()
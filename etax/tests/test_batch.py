@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Digital Consulting Service LLC (Mongolia)
+# License: GNU General Public License v3
+
+"""
+Tests for eTax batch report sync
+"""
+
+from unittest.mock import MagicMock, patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from etax.api.batch import BatchProcessor, _get_upsert_sql
+
+
+class TestBatchUpsert(FrappeTestCase):
+    """Tests for the opt-in upsert fast path"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        super().setUp()
+        self.doc_data = {
+            "report_no": "RPT-001",
+            "tax_type_code": "VAT",
+            "period_year": 2024,
+            "period": 1
+        }
+
+    def test_upsert_is_opt_in(self):
+        """Test the hook-skipping upsert path is off by default"""
+        processor = BatchProcessor()
+
+        self.assertFalse(processor.use_upsert)
+        self.assertFalse(processor._can_upsert())
+
+    @patch("etax.setup.indexes.index_exists", return_value=False)
+    def test_upsert_needs_index(self, mock_index_exists):
+        """Test upserts fall back to insert without the report_no index"""
+        processor = BatchProcessor(use_upsert=True)
+
+        self.assertFalse(processor._can_upsert())
+        mock_index_exists.assert_called_once_with("tabeTax Report", "idx_etax_report_no")
+
+    @patch("frappe.db.set_value")
+    def test_upsert_path_records_name(self, mock_set_value):
+        """Test upserted reports are updated when repeated in the batch"""
+        processor = BatchProcessor(use_upsert=True)
+        processor._upsert_available = True
+        existing = {}
+
+        with patch.object(BatchProcessor, "_upsert_report", return_value="ETAX-RPT-0003") as mock_upsert:
+            self.assertEqual(processor._sync_single_report(self.doc_data, existing), "created")
+            self.assertEqual(processor._sync_single_report(self.doc_data, existing), "updated")
+
+        mock_upsert.assert_called_once()
+        self.assertEqual(mock_set_value.call_args[0][1], "ETAX-RPT-0003")
+
+    @patch("frappe.db.sql")
+    @patch("etax.api.batch._new_report_name", return_value="ETAX-RPT-0004")
+    def test_upsert_uses_autoname(self, mock_new_name, mock_sql):
+        """Test upserted reports are named through the autoname series"""
+        processor = BatchProcessor(use_upsert=True)
+        processor._report_columns = set(self.doc_data)
+
+        self.assertEqual(processor._upsert_report(self.doc_data), "ETAX-RPT-0004")
+        self.assertEqual(mock_sql.call_args[0][1]["name"], "ETAX-RPT-0004")
+
+    def test_upsert_keeps_conflict_key(self):
+        """Test the upsert updates every column except report_no"""
+        sql = _get_upsert_sql(("report_no", "tax_type_code", "period"))
+        updates = sql.split("ON DUPLICATE KEY UPDATE")[1]
+
+        self.assertNotIn("`report_no`", updates)
+        self.assertIn("`tax_type_code` = VALUES(`tax_type_code`)", updates)
+        self.assertIn("`modified` = VALUES(`modified`)", updates)
+
+
+class TestBatchSync(FrappeTestCase):
+    """Tests for syncing a batch against the prefetched reports"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        super().setUp()
+        self.doc_data = {
+            "report_no": "RPT-001",
+            "tax_type_code": "VAT",
+            "period_year": 2024,
+            "period": 1
+        }
+
+    @patch("frappe.db.set_value")
+    def test_existing_report_updated(self, mock_set_value):
+        """Test a prefetched report is updated in place"""
+        processor = BatchProcessor()
+        existing = {("RPT-001", "VAT", 2024, 1): "ETAX-RPT-0001"}
+
+        self.assertEqual(processor._sync_single_report(self.doc_data, existing), "updated")
+        self.assertEqual(mock_set_value.call_args[0][1], "ETAX-RPT-0001")
+
+    @patch("frappe.db.set_value")
+    @patch("frappe.get_doc")
+    def test_repeated_report_in_batch(self, mock_get_doc, mock_set_value):
+        """Test a report repeated in one batch is inserted once, then updated"""
+        mock_get_doc.return_value.name = "ETAX-RPT-0002"
+        processor = BatchProcessor()
+        existing = {}
+
+        self.assertEqual(processor._sync_single_report(self.doc_data, existing), "created")
+        self.assertEqual(processor._sync_single_report(dict(self.doc_data), existing), "updated")
+
+        mock_get_doc.return_value.insert.assert_called_once()
+        self.assertEqual(mock_set_value.call_args[0][1], "ETAX-RPT-0002")
+
+    @patch("frappe.db.sql")
+    def test_existing_lookup_keys(self, mock_sql):
+        """Test the prefetch maps normalized sync keys to report names"""
+        import frappe
+
+        mock_sql.return_value = [frappe._dict(
+            name="ETAX-RPT-0001", report_no="RPT-001", tax_type_code="VAT", period_year="2024", period="1"
+        )]
+
+        existing = BatchProcessor()._get_existing_reports([self.doc_data, dict(self.doc_data)])
+
+        self.assertEqual(existing, {("RPT-001", "VAT", 2024, 1): "ETAX-RPT-0001"})
+        self.assertEqual(len(mock_sql.call_args[0][1]["keys"]), 1)
+
+    def test_empty_batch_skips_lookup(self):
+        """Test no query is made for an empty batch"""
+        with patch("frappe.db.sql") as mock_sql:
+            self.assertEqual(BatchProcessor()._get_existing_reports([]), {})
+
+        mock_sql.assert_not_called()
+
+
+class TestBulkCreateReports(FrappeTestCase):
+    """Tests for multi-row report inserts"""
+
+    @patch("etax.api.cache.on_report_sync")
+    @patch("frappe.db.commit")
+    @patch("frappe.db.bulk_insert")
+    @patch("etax.api.batch._new_report_name", side_effect=["ETAX-RPT-0010", "ETAX-RPT-0011"])
+    def test_rows_use_autoname(self, mock_new_name, mock_bulk_insert, mock_commit, mock_on_sync):
+        """Test bulk-created reports are named through the autoname series"""
+        from etax.api.batch import bulk_create_reports
+
+        created = bulk_create_reports([
+            {"report_no": "RPT-010", "not_a_column": "x"},
+            {"report_no": "RPT-011"}
+        ])
+
+        self.assertEqual(created, 2)
+        doctype, fields, values = mock_bulk_insert.call_args[0]
+        self.assertEqual(doctype, "eTax Report")
+        self.assertNotIn("not_a_column", fields)
+        self.assertEqual([row[0] for row in values], ["ETAX-RPT-0010", "ETAX-RPT-0011"])
+        mock_new_name.assert_any_call({"report_no": "RPT-010"})
+
+    @patch("frappe.db.bulk_insert")
+    def test_empty_input(self, mock_bulk_insert):
+        """Test nothing is written for no reports"""
+        from etax.api.batch import bulk_create_reports
+
+        self.assertEqual(bulk_create_reports([]), 0)
+        mock_bulk_insert.assert_not_called()
+
+
+class TestParallelSync(FrappeTestCase):
+    """Tests for syncing batches on worker threads"""
+
+    @patch("etax.api.cache.on_report_sync")
+    @patch.object(BatchProcessor, "_get_report_columns")
+    @patch.object(BatchProcessor, "_can_upsert", return_value=False)
+    def test_counts_summed_on_caller(self, mock_can_upsert, mock_columns, mock_on_sync):
+        """Test batch results and progress are summed on the calling thread"""
+        def sync_batch(site, sites_path, user, batch, transformer):
+            if batch[0] == "bad":
+                raise RuntimeError("batch failed")
+            return {"created": len(batch), "updated": 0, "errors": 0, "processed": len(batch)}
+
+        processor = BatchProcessor(batch_size=2, parallelism=2)
+
+        with patch.object(processor, "_sync_batch_in_thread", side_effect=sync_batch), \
+                patch("frappe.log_error"):
+            totals = processor.sync_reports(["a", "b", "c", "d", "bad", "e"], transformer=MagicMock())
+
+        self.assertEqual(totals, {"created": 4, "updated": 0, "errors": 2})
+        self.assertEqual(processor.operations_count, 4)
+        mock_on_sync.assert_called_once()
@@ -3,6 +3,9 @@ Battle Tests for eTax Utility Infrastructure
 Run with: bench run-tests --app etax --module etax.tests.test_battle_utilities
 """
 
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
 from frappe.tests.utils import FrappeTestCase
 
 
@@ -87,6 +90,68 @@ class TestResilienceModule(FrappeTestCase):
         self.assertEqual(attempts, 2)
 
 
+class TestCircuitBreakerFastPath(FrappeTestCase):
+    """Test the circuit breaker's lock-free closed path."""
+
+    def _breaker(self, name, **kwargs):
+        from etax.utils.resilience import CircuitBreaker
+
+        cb = CircuitBreaker(name=name, **kwargs)
+        # Keep state out of the shared cache between tests
+        cb._save_state = MagicMock()
+        return cb
+
+    def test_closed_success_skips_lock(self):
+        """Successful calls while closed shouldn't take the lock."""
+        cb = self._breaker("test_fast_path_etax")
+        cb.reset()
+        cb._lock = MagicMock()
+        
+        self.assertEqual(cb.call(lambda x: x * 2, 21), 42)
+        cb._lock.__enter__.assert_not_called()
+    
+    def test_success_clears_failure_count(self):
+        """A success while closed should reset the failure count."""
+        cb = self._breaker("test_clear_failures_etax", failure_threshold=3)
+        cb.reset()
+        
+        with self.assertRaises(ValueError):
+            cb.call(MagicMock(side_effect=ValueError("fail")))
+        self.assertEqual(cb._failure_count, 1)
+        
+        cb.call(lambda: "ok")
+        self.assertEqual(cb._failure_count, 0)
+    
+    def test_open_circuit_fails_fast(self):
+        """An open circuit shouldn't call the function."""
+        from etax.utils.resilience import CircuitBreakerOpen
+        
+        cb = self._breaker("test_fail_fast_etax", failure_threshold=1, recovery_timeout=60)
+        cb.reset()
+        func = MagicMock(side_effect=ValueError("fail"))
+        
+        with self.assertRaises(ValueError):
+            cb.call(func)
+        with self.assertRaises(CircuitBreakerOpen):
+            cb.call(func)
+        
+        self.assertEqual(func.call_count, 1)
+    
+    def test_half_open_recovery(self):
+        """After the recovery timeout a successful probe closes the circuit."""
+        from etax.utils.resilience import CircuitState
+        
+        cb = self._breaker("test_half_open_etax", failure_threshold=1, recovery_timeout=60)
+        cb.reset()
+        
+        with self.assertRaises(ValueError):
+            cb.call(MagicMock(side_effect=ValueError("fail")))
+        cb._last_failure_time = datetime.now() - timedelta(seconds=61)
+        
+        self.assertEqual(cb.call(lambda: "ok"), "ok")
+        self.assertEqual(cb.state, CircuitState.CLOSED)
+
+
 class TestValidatorsModule(FrappeTestCase):
     """Test validators."""
 
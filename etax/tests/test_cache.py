@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Digital Consulting Service LLC (Mongolia)
+# License: GNU General Public License v3
+
+"""
+Tests for the eTax cache layer
+"""
+
+import json
+import pickle
+import queue
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from etax.api import cache as etax_cache
+from etax.api.cache import (
+    CACHE_KEYS,
+    ETaxCache,
+    cached,
+    get_cache_key,
+    get_cached_form_detail,
+    get_token_key,
+)
+
+
+class TestCacheKeys(FrappeTestCase):
+    """Tests for get_cache_key"""
+
+    def test_key_format(self):
+        """Test keys are 16 hex chars and stable"""
+        key = get_cache_key("ENT-1", 2024, period=1)
+
+        self.assertEqual(len(key), 16)
+        int(key, 16)
+        self.assertEqual(key, get_cache_key("ENT-1", 2024, period=1))
+
+    def test_keys_distinguish_args(self):
+        """Test different arguments give different keys"""
+        self.assertNotEqual(get_cache_key("ENT-1", 2024), get_cache_key("ENT-1", 2025))
+        self.assertNotEqual(get_cache_key(1), get_cache_key("1"))
+        self.assertNotEqual(get_cache_key("a", "b"), get_cache_key("a", b="b"))
+
+    def test_kwargs_order_ignored(self):
+        """Test keyword order doesn't change the key"""
+        self.assertEqual(get_cache_key(a=1, b=2), get_cache_key(b=2, a=1))
+
+    def test_non_scalar_args(self):
+        """Test dict/list arguments are keyed canonically"""
+        self.assertEqual(
+            get_cache_key({"b": 2, "a": [1, 2]}),
+            get_cache_key({"a": [1, 2], "b": 2})
+        )
+        self.assertNotEqual(get_cache_key({"a": [1, 2]}), get_cache_key({"a": [2, 1]}))
+
+
+class TestCachedDecorator(FrappeTestCase):
+    """Tests for the cached() decorator"""
+
+    def setUp(self):
+        """Set up a mocked frappe.cache"""
+        super().setUp()
+        self.cache = MagicMock()
+        self.cache.get_value.return_value = None
+        patcher = patch.object(frappe, "cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("etax.api.cache._track_key")
+    def test_miss_stores_and_tracks(self, mock_track):
+        """Test a miss calls the function, stores the result and tracks the key"""
+        func = MagicMock(return_value={"rows": [1, 2]})
+        wrapped = cached("reports", ttl=60)(func)
+
+        self.assertEqual(wrapped("ENT-1"), {"rows": [1, 2]})
+
+        cache_key = self.cache.set_value.call_args[0][0]
+        self.assertTrue(cache_key.startswith("etax:reports:"))
+        self.assertEqual(self.cache.set_value.call_args[1]["expires_in_sec"], 60)
+        mock_track.assert_called_once_with(cache_key, "reports")
+
+    @patch("etax.api.cache._track_key")
+    def test_other_prefix_tracked_for_invalidate_all(self, mock_track):
+        """Test prefixes outside the tracked groups still get invalidated"""
+        wrapped = cached("taxpayer")(MagicMock(return_value=[1]))
+
+        wrapped("ENT-1")
+
+        self.assertEqual(mock_track.call_args[0][1], "cached")
+
+    def test_hit_skips_function(self):
+        """Test a hit returns the decoded cached value"""
+        self.cache.get_value.return_value = json.dumps({"rows": [1]})
+        func = MagicMock()
+
+        self.assertEqual(cached("reports")(func)("ENT-1"), {"rows": [1]})
+        func.assert_not_called()
+
+    def test_skip_cache(self):
+        """Test skip_cache bypasses the cache and isn't passed on"""
+        func = MagicMock(return_value=[1])
+
+        self.assertEqual(cached("reports")(func)("ENT-1", skip_cache=True), [1])
+        func.assert_called_once_with("ENT-1")
+        self.cache.get_value.assert_not_called()
+
+
+class TestTokenKeys(FrappeTestCase):
+    """Tests for per-identity token keys"""
+
+    def test_token_key_partitioned(self):
+        """Test environments, clients and users get separate token slots"""
+        key = get_token_key("Staging", "client", "user@example.com")
+
+        self.assertTrue(key.startswith(CACHE_KEYS["token"] + ":Staging:client:"))
+        self.assertNotIn("user@example.com", key)
+        self.assertNotEqual(key, get_token_key("Production", "client", "user@example.com"))
+        self.assertNotEqual(key, get_token_key("Staging", "client", "other@example.com"))
+
+    def test_stats_count_tracked_tokens(self):
+        """Test get_stats reports tokens from the tracked per-identity keys"""
+        cache = MagicMock()
+        cache.make_key.side_effect = lambda key: f"site|{key}"
+        pipe = cache.pipeline.return_value
+        pipe.execute.return_value = [
+            [None] * (len(CACHE_KEYS) - 1),
+            {b"site|etax:token:Staging:client:abc"}
+        ]
+        cache.exists.return_value = 1
+
+        with patch.object(frappe, "cache", cache):
+            stats = ETaxCache.get_stats()
+
+        self.assertTrue(stats["token"]["cached"])
+        self.assertEqual(stats["token"]["count"], 1)
+        self.assertFalse(stats["settings"]["cached"])
+        self.assertEqual(set(stats), set(CACHE_KEYS))
+
+    def test_stats_without_tokens(self):
+        """Test no EXISTS call is made when no token keys are tracked"""
+        cache = MagicMock()
+        cache.pipeline.return_value.execute.return_value = [[None] * (len(CACHE_KEYS) - 1), set()]
+
+        with patch.object(frappe, "cache", cache):
+            stats = ETaxCache.get_stats()
+
+        self.assertFalse(stats["token"]["cached"])
+        cache.exists.assert_not_called()
+
+
+class TestFormDetailLocalCache(FrappeTestCase):
+    """Tests for the process-local (L1) form detail cache"""
+
+    def setUp(self):
+        """Start each test with an empty L1 cache and a mocked Redis"""
+        super().setUp()
+        etax_cache._FORM_DETAIL_LOCAL.clear()
+        self.addCleanup(etax_cache._FORM_DETAIL_LOCAL.clear)
+        self.cache = MagicMock()
+        self.cache.get_value.return_value = {"reportFormInfo": {"formNo": "F001"}}
+        patcher = patch.object(frappe, "cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_second_read_served_locally(self):
+        """Test a Redis hit is kept in process memory"""
+        first = get_cached_form_detail("F001:1:2024")
+        second = get_cached_form_detail("F001:1:2024")
+
+        self.assertEqual(first, second)
+        self.cache.get_value.assert_called_once()
+
+    def test_expired_entry_rereads_redis(self):
+        """Test L1 entries expire after FORM_DETAIL_LOCAL_TTL"""
+        get_cached_form_detail("F001:1:2024")
+        key = (frappe.local.site, "F001:1:2024")
+        etax_cache._FORM_DETAIL_LOCAL[key] = (time.monotonic() - 1, {"stale": True})
+
+        self.assertEqual(get_cached_form_detail("F001:1:2024"), {"reportFormInfo": {"formNo": "F001"}})
+        self.assertEqual(self.cache.get_value.call_count, 2)
+
+    def test_miss_not_cached_locally(self):
+        """Test Redis misses aren't remembered"""
+        self.cache.get_value.return_value = None
+
+        self.assertIsNone(get_cached_form_detail("F404:1:2024"))
+        self.assertEqual(etax_cache._FORM_DETAIL_LOCAL, {})
+
+    def test_size_bounded(self):
+        """Test the L1 cache never grows past FORM_DETAIL_LOCAL_MAX"""
+        for i in range(etax_cache.FORM_DETAIL_LOCAL_MAX + 5):
+            etax_cache._set_local_form_detail(("site", str(i)), {})
+
+        self.assertLessEqual(len(etax_cache._FORM_DETAIL_LOCAL), etax_cache.FORM_DETAIL_LOCAL_MAX)
+
+    @patch("etax.api.cache._delete_tracked")
+    def test_invalidate_all_clears_local(self, mock_delete):
+        """Test invalidate_all drops process-local entries too"""
+        get_cached_form_detail("F001:1:2024")
+
+        ETaxCache.invalidate_all()
+
+        self.assertEqual(etax_cache._FORM_DETAIL_LOCAL, {})
+
+
+class TestCompression(FrappeTestCase):
+    """Tests for compressed form detail payloads"""
+
+    def setUp(self):
+        """Set up a large, repetitive form structure"""
+        super().setUp()
+        self.detail = {
+            "sections": [
+                {"tagKey": f"cell_{i}", "label": "Борлуулалтын орлого", "value": None}
+                for i in range(500)
+            ]
+        }
+
+    def test_round_trip(self):
+        """Test compressed values decode to the original object"""
+        blob = etax_cache._compress(self.detail)
+
+        self.assertTrue(blob.startswith(etax_cache.COMPRESSED_PREFIX))
+        self.assertEqual(etax_cache._decompress(blob), self.detail)
+
+    def test_smaller_than_pickle(self):
+        """Test compression actually shrinks large payloads"""
+        self.assertLess(len(etax_cache._compress(self.detail)), len(pickle.dumps(self.detail)))
+
+    def test_legacy_values(self):
+        """Test uncompressed and JSON values written earlier still decode"""
+        self.assertEqual(etax_cache._decompress({"a": 1}), {"a": 1})
+        self.assertEqual(etax_cache._decompress(json.dumps({"a": 1})), {"a": 1})
+
+    def test_set_cached_form_detail_compresses(self):
+        """Test form details are queued compressed, in the form_detail group"""
+        with patch("etax.api.cache._set_value_deferred") as mock_deferred:
+            etax_cache.set_cached_form_detail("F001:1:2024", self.detail)
+        etax_cache._FORM_DETAIL_LOCAL.clear()
+
+        key, blob = mock_deferred.call_args[0]
+        self.assertEqual(key, f"{CACHE_KEYS['form_detail']}:F001:1:2024")
+        self.assertEqual(etax_cache._decompress(blob), self.detail)
+        self.assertEqual(mock_deferred.call_args[1]["group"], "form_detail")
+
+
+class TestDeferredCacheWriter(FrappeTestCase):
+    """Tests for the background cache writer"""
+
+    def test_drain_pipelines_writes(self):
+        """Test queued writes are flushed with SETEX and key set tracking"""
+        written = threading.Event()
+        cache = MagicMock()
+        pipe = cache.pipeline.return_value
+        pipe.execute.side_effect = lambda: written.set()
+
+        write_queue = queue.Queue()
+        blob = pickle.dumps({"a": 1})
+        write_queue.put(("site|etax:orgs:u1", 60, blob, "site|etax:keyset:orgs"))
+        write_queue.put(("site|etax:settings", 300, blob, None))
+
+        threading.Thread(target=etax_cache._drain_writes, args=(write_queue, cache), daemon=True).start()
+
+        self.assertTrue(written.wait(5))
+        pipe.setex.assert_any_call("site|etax:orgs:u1", 60, blob)
+        pipe.setex.assert_any_call("site|etax:settings", 300, blob)
+        pipe.sadd.assert_called_once_with("site|etax:keyset:orgs", "site|etax:orgs:u1")
+
+    def test_queued_value_readable(self):
+        """Test queued blobs are pickled the way frappe.cache reads them"""
+        write_queue = queue.Queue()
+        cache = MagicMock()
+        cache.make_key.side_effect = lambda key: f"site|{key}"
+
+        with patch("etax.api.cache._get_write_queue", return_value=write_queue), \
+                patch.object(frappe, "cache", cache):
+            etax_cache._set_value_deferred("etax:orgs:u1", [{"id": 1}], 60, group="orgs")
+
+        redis_key, ttl, blob, keyset_key = write_queue.get_nowait()
+        self.assertEqual(redis_key, "site|etax:orgs:u1")
+        self.assertEqual(ttl, 60)
+        self.assertEqual(pickle.loads(blob), [{"id": 1}])
+        self.assertEqual(keyset_key, "site|etax:keyset:orgs")
+
+    @patch("etax.api.cache._track_key")
+    @patch("etax.api.cache._get_write_queue", side_effect=RuntimeError("no queue"))
+    def test_falls_back_to_direct_write(self, mock_queue, mock_track):
+        """Test writes go straight to Redis when the queue is unavailable"""
+        with patch.object(frappe, "cache") as mock_cache:
+            etax_cache._set_value_deferred("etax:orgs:u1", {"a": 1}, 60, group="orgs")
+
+        mock_cache.set_value.assert_called_once_with("etax:orgs:u1", {"a": 1}, expires_in_sec=60)
+        mock_track.assert_called_once_with("etax:orgs:u1", "orgs")
+
+
+class TestFormDetailPrefetch(FrappeTestCase):
+    """Tests for batched form detail lookups"""
+
+    def setUp(self):
+        """Start with an empty L1 cache"""
+        super().setUp()
+        etax_cache._FORM_DETAIL_LOCAL.clear()
+        self.addCleanup(etax_cache._FORM_DETAIL_LOCAL.clear)
+
+    def test_single_mget_for_missing(self):
+        """Test locally cached forms are skipped and the rest use one MGET"""
+        etax_cache._set_local_form_detail((frappe.local.site, "F001:1:2024"), {"form": 1})
+        cache = MagicMock()
+        cache.make_key.side_effect = lambda key: f"site|{key}"
+        cache.mget.return_value = [pickle.dumps(etax_cache._compress({"form": 2})), None]
+
+        with patch.object(frappe, "cache", cache):
+            details = etax_cache.get_cached_form_details(["F001:1:2024", "F002:1:2024", "F003:1:2024"])
+
+        self.assertEqual(details, {"F001:1:2024": {"form": 1}, "F002:1:2024": {"form": 2}})
+        cache.mget.assert_called_once_with([
+            f"site|{CACHE_KEYS['form_detail']}:F002:1:2024",
+            f"site|{CACHE_KEYS['form_detail']}:F003:1:2024"
+        ])
+        # Redis hits are kept locally for the get_form_detail calls that follow
+        self.assertIn((frappe.local.site, "F002:1:2024"), etax_cache._FORM_DETAIL_LOCAL)
+
+    def test_all_local_skips_redis(self):
+        """Test no Redis call is made when every form is cached locally"""
+        etax_cache._set_local_form_detail((frappe.local.site, "F001:1:2024"), {"form": 1})
+
+        with patch.object(frappe, "cache") as cache:
+            self.assertEqual(etax_cache.get_cached_form_details(["F001:1:2024"]), {"F001:1:2024": {"form": 1}})
+
+        cache.mget.assert_not_called()
+
+    def test_undecodable_value_skipped(self):
+        """Test a corrupt entry is treated as a miss"""
+        cache = MagicMock()
+        cache.mget.return_value = [b"not a pickle"]
+
+        with patch.object(frappe, "cache", cache):
+            self.assertEqual(etax_cache.get_cached_form_details(["F001:1:2024"]), {})
+
+
+class TestTrackedKeySets(FrappeTestCase):
+    """Tests for invalidation through tracked key sets"""
+
+    def setUp(self):
+        """Set up a mocked frappe.cache with site-prefixed keys"""
+        super().setUp()
+        self.cache = MagicMock()
+        self.cache.make_key.side_effect = lambda key: f"site|{key}"
+        self.pipe = self.cache.pipeline.return_value
+        patcher = patch.object(frappe, "cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_track_key(self):
+        """Test a key is added to its group's set and the set's TTL refreshed"""
+        etax_cache._track_key("etax:reports:abc", "reports")
+
+        self.pipe.sadd.assert_called_once_with("site|etax:keyset:reports", "site|etax:reports:abc")
+        self.pipe.expire.assert_called_once_with("site|etax:keyset:reports", etax_cache.KEYSET_TTL)
+        self.pipe.execute.assert_called_once()
+
+    def test_delete_tracked(self):
+        """Test tracked members, the key sets and extra keys are deleted"""
+        self.pipe.execute.side_effect = [[{b"site|etax:reports:abc"}], None]
+
+        etax_cache._delete_tracked("reports", extra_keys=("etax:settings",))
+
+        self.pipe.smembers.assert_called_once_with("site|etax:keyset:reports")
+        self.pipe.delete.assert_called_once_with(
+            b"site|etax:reports:abc", "site|etax:keyset:reports", "site|etax:settings"
+        )
+
+    def test_delete_tracked_chunks(self):
+        """Test large key sets are deleted in bounded DEL commands"""
+        members = {f"site|etax:forms:{i}".encode() for i in range(1200)}
+        self.pipe.execute.side_effect = [[members], None]
+
+        etax_cache._delete_tracked("forms")
+
+        self.assertEqual(self.pipe.delete.call_count, 3)
+        self.assertTrue(all(len(call[0]) <= 500 for call in self.pipe.delete.call_args_list))
+
+    @patch("etax.api.cache._delete_tracked")
+    def test_invalidate_all_covers_groups(self, mock_delete):
+        """Test invalidate_all clears every tracked group and fixed key"""
+        ETaxCache.invalidate_all()
+
+        groups = mock_delete.call_args[0]
+        self.assertEqual(set(groups), set(etax_cache.TRACKED_GROUPS))
+        self.assertIn("cached", groups)
+        self.assertEqual(set(mock_delete.call_args[1]["extra_keys"]), set(CACHE_KEYS.values()))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Digital Consulting Service LLC (Mongolia)
+# License: GNU General Public License v3
+
+"""
+Tests for the eTax API client
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from etax.api.client import ETaxClient
+
+
+def _bare_client():
+    """ETaxClient without settings, auth or HTTP setup"""
+    return ETaxClient.__new__(ETaxClient)
+
+
+class TestFormDetailSingleFlight(FrappeTestCase):
+    """Tests for single-flight form detail fetches"""
+
+    @patch("etax.api.client.get_cached_form_detail", return_value=None)
+    def test_concurrent_fetches_share_result(self, mock_cached):
+        """Test concurrent cold-cache callers trigger one API call"""
+        calls = []
+        release = threading.Event()
+
+        def fetch(client, cache_key, *args):
+            calls.append(cache_key)
+            release.wait(5)
+            return {"reportFormInfo": {"formNo": "F001"}}
+
+        client = _bare_client()
+        site = frappe.local.site
+        results = []
+
+        def worker():
+            frappe.local.site = site
+            results.append(client.get_form_detail("F001", 1, 1, 2024, 1))
+
+        with patch.object(ETaxClient, "_fetch_form_detail", fetch):
+            threads = [threading.Thread(target=worker) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            # Let every worker reach the flight before the leader returns
+            time.sleep(0.2)
+            release.set()
+            for thread in threads:
+                thread.join(10)
+
+        self.assertEqual(calls, ["F001:1:2024"])
+        self.assertEqual(results, [{"reportFormInfo": {"formNo": "F001"}}] * 4)
+
+    @patch("etax.api.client.get_cached_form_detail", return_value=None)
+    def test_failed_leader_lets_waiters_fetch(self, mock_cached):
+        """Test waiters fetch themselves when the leader fails"""
+        client = _bare_client()
+
+        with patch.object(ETaxClient, "_fetch_form_detail", side_effect=[RuntimeError("boom"), {"ok": True}]):
+            with self.assertRaises(RuntimeError):
+                client.get_form_detail("F001", 1, 1, 2024, 1)
+            # The failed flight is gone; the next caller leads a new one
+            self.assertEqual(client.get_form_detail("F001", 1, 1, 2024, 1), {"ok": True})
+
+    @patch("etax.api.client.get_cached_form_detail", return_value={"cached": True})
+    def test_cache_hit_skips_fetch(self, mock_cached):
+        """Test a cached form detail is returned without a fetch"""
+        client = _bare_client()
+
+        with patch.object(ETaxClient, "_fetch_form_detail") as mock_fetch:
+            self.assertEqual(client.get_form_detail("F001", 1, 1, 2024, 1), {"cached": True})
+
+        mock_fetch.assert_not_called()
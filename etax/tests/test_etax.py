@@ -14,6 +14,7 @@ Comprehensive tests for eTax app covering:
 """
 
 import unittest
+from unittest.mock import patch
 
 import frappe
 from frappe.tests.utils import FrappeTestCase
@@ -423,6 +424,41 @@ class TestDocTypeNaming(FrappeTestCase):
         self.assertEqual(doctype.autoname, "field:tin")
 
 
+class TestApprovalRole(FrappeTestCase):
+    """Test approval role resolution"""
+
+    def setUp(self):
+        super().setUp()
+        frappe.local.etax_approval_roles = None
+        self.addCleanup(setattr, frappe.local, "etax_approval_roles", None)
+
+    @patch("frappe.get_roles")
+    def test_highest_role(self, mock_get_roles):
+        """Highest-priority approval role should win"""
+        from etax.etax.doctype.etax_approval_log.etax_approval_log import get_user_approval_role
+
+        mock_get_roles.return_value = ["Accounts User", "Tax Report Reviewer", "Employee"]
+        self.assertEqual(get_user_approval_role("reviewer@example.com"), "Tax Report Reviewer")
+
+        mock_get_roles.return_value = ["Employee"]
+        self.assertEqual(get_user_approval_role("employee@example.com"), "User")
+
+    @patch("frappe.get_roles", return_value=["Tax Report Approver"])
+    def test_resolved_once_per_request(self, mock_get_roles):
+        """Roles should be looked up once per user per request"""
+        from etax.etax.doctype.etax_approval_log.etax_approval_log import get_user_approval_role
+
+        for _ in range(3):
+            self.assertEqual(get_user_approval_role("approver@example.com"), "Tax Report Approver")
+
+        mock_get_roles.assert_called_once_with("approver@example.com")
+
+        # A new request starts with an empty frappe.local
+        frappe.local.etax_approval_roles = None
+        get_user_approval_role("approver@example.com")
+        self.assertEqual(mock_get_roles.call_count, 2)
+
+
 def run_tests():
     """Run all eTax tests"""
     # This function is called by frappe test runner
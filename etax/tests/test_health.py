@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Digital Consulting Service LLC (Mongolia)
+# License: GNU General Public License v3
+
+"""
+Tests for the eTax health check API
+"""
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from etax.api import health
+
+
+def _patch_checks(**statuses):
+    """Patch every sub-check of _run_health_checks with a fixed status"""
+    names = ("database", "cache", "settings", "certificate", "pending_reports", "circuit_breaker")
+    return [
+        patch.object(health, f"check_{name}", return_value={"status": statuses.get(name, "healthy")})
+        for name in names
+    ]
+
+
+class TestRunHealthChecks(FrappeTestCase):
+    """Tests for the detailed health check run"""
+
+    def setUp(self):
+        """Patch the settings load and app version"""
+        super().setUp()
+        for patcher in (
+            patch("frappe.get_single", return_value=MagicMock()),
+            patch.object(health, "get_app_version", return_value="1.0.0"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _run(self, **statuses):
+        patchers = _patch_checks(**statuses)
+        for patcher in patchers:
+            patcher.start()
+        try:
+            return health._run_health_checks()
+        finally:
+            for patcher in patchers:
+                patcher.stop()
+
+    def test_check_order(self):
+        """Test checks are reported in their documented order"""
+        result = self._run()
+
+        self.assertEqual(list(result["checks"]), [
+            "database", "cache", "settings", "certificate", "pending_reports", "circuit_breaker"
+        ])
+        self.assertEqual(result["status"], "healthy")
+
+    def test_critical_failure_unhealthy(self):
+        """Test a failing critical check makes the app unhealthy"""
+        self.assertEqual(self._run(database="unhealthy")["status"], "unhealthy")
+        self.assertEqual(self._run(settings="disabled")["status"], "unhealthy")
+
+    def test_non_critical_failure_degraded(self):
+        """Test a failing non-critical check only degrades the app"""
+        self.assertEqual(self._run(cache="unhealthy")["status"], "degraded")
+        self.assertEqual(self._run(certificate="disabled")["status"], "healthy")
+
+    def test_checks_run_inline(self):
+        """Test no helper threads are started for the checks"""
+        with patch("threading.Thread.start") as mock_start:
+            self._run()
+
+        mock_start.assert_not_called()
+
+
+class TestCheckCache(FrappeTestCase):
+    """Tests for the cache check"""
+
+    def test_ping(self):
+        """Test the check is a single PING"""
+        cache = MagicMock()
+
+        with patch("frappe.cache", return_value=cache):
+            self.assertEqual(health.check_cache(), {"status": "healthy"})
+
+        cache.ping.assert_called_once()
+        cache.set_value.assert_not_called()
+
+    def test_ping_failure(self):
+        """Test an unreachable Redis is reported unhealthy"""
+        cache = MagicMock()
+        cache.ping.side_effect = ConnectionError("refused")
+
+        with patch("frappe.cache", return_value=cache):
+            self.assertEqual(health.check_cache()["status"], "unhealthy")
+
+
+@patch("frappe.only_for")
+class TestDetailedHealthCache(FrappeTestCase):
+    """Tests for the per-site detailed_health cache and lock"""
+
+    def setUp(self):
+        """Start each test with no cached results or locks"""
+        super().setUp()
+        for store in (health._HEALTH_CACHE, health._HEALTH_LOCKS):
+            store.clear()
+            self.addCleanup(store.clear)
+
+    def test_result_reused(self, mock_only_for):
+        """Test polls within HEALTH_CACHE_TTL reuse the last result"""
+        with patch.object(health, "_run_health_checks", return_value={"status": "healthy"}) as mock_run:
+            health.detailed_health()
+            health.detailed_health()
+
+        mock_run.assert_called_once()
+
+    def test_bypass_cache(self, mock_only_for):
+        """Test bypass_cache re-runs the checks"""
+        with patch.object(health, "_run_health_checks", return_value={"status": "healthy"}) as mock_run:
+            health.detailed_health()
+            health.detailed_health(bypass_cache=1)
+
+        self.assertEqual(mock_run.call_count, 2)
+
+    def test_busy_lock_returns_last_result(self, mock_only_for):
+        """Test callers don't queue behind a running check"""
+        site = frappe.local.site
+        health._HEALTH_CACHE[site] = (0, {"status": "degraded"})
+        lock = health._HEALTH_LOCKS.setdefault(site, MagicMock())
+        lock.acquire.return_value = False
+
+        with patch.object(health, "_run_health_checks") as mock_run:
+            self.assertEqual(health.detailed_health(), {"status": "degraded"})
+
+        mock_run.assert_not_called()
+        self.assertEqual(lock.acquire.call_args[1]["timeout"], health.HEALTH_LOCK_TIMEOUT)
+
+    def test_busy_lock_without_result(self, mock_only_for):
+        """Test a busy lock with nothing cached reports unknown"""
+        lock = health._HEALTH_LOCKS.setdefault(frappe.local.site, MagicMock())
+        lock.acquire.return_value = False
+
+        self.assertEqual(health.detailed_health()["status"], "unknown")
+
+    def test_lock_per_site(self, mock_only_for):
+        """Test a lock held for another site doesn't block this one"""
+        busy = health._HEALTH_LOCKS.setdefault("other.site", MagicMock())
+        busy.acquire.return_value = False
+
+        with patch.object(health, "_run_health_checks", return_value={"status": "healthy"}):
+            self.assertEqual(health.detailed_health(), {"status": "healthy"})
+
+        busy.acquire.assert_not_called()
+        self.assertFalse(health._HEALTH_LOCKS[frappe.local.site].locked())
+
+
+class TestCheckPendingReports(FrappeTestCase):
+    """Tests for the pending reports check"""
+
+    def test_query_runs(self):
+        """Test the count query matches the eTax Report schema"""
+        result = health.check_pending_reports()
+
+        self.assertNotEqual(result["status"], "unknown", result.get("error"))
+        self.assertIn("pending_count", result)
+
+    def test_status_values_exist(self):
+        """Test the pending statuses are real eTax Report status options"""
+        options = frappe.get_meta("eTax Report").get_field("status").options.split("\n")
+
+        self.assertTrue(set(health.PENDING_REPORT_STATUSES) <= set(options))
+
+    @patch("frappe.db.sql")
+    def test_overdue_is_warning(self, mock_sql):
+        """Test overdue reports turn the check into a warning"""
+        mock_sql.return_value = [frappe._dict(pending=3, overdue=1)]
+
+        result = health.check_pending_reports()
+
+        self.assertEqual(result, {"status": "warning", "pending_count": 3, "overdue_count": 1})
+        self.assertIn("return_due_date", mock_sql.call_args[0][0])
+
+    @patch("frappe.db.sql")
+    def test_nothing_pending(self, mock_sql):
+        """Test SUM over no rows (NULL) counts as zero"""
+        mock_sql.return_value = [frappe._dict(pending=0, overdue=None)]
+
+        self.assertEqual(health.check_pending_reports()["status"], "healthy")
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Digital Consulting Service LLC (Mongolia)
+# License: GNU General Public License v3
+
+"""
+Tests for the eTax HTTP client and connection pool
+"""
+
+import json
+import socket
+from unittest.mock import MagicMock, patch
+
+import requests
+from frappe.tests.utils import FrappeTestCase
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, ProtocolError
+
+from etax.api import pool
+from etax.api.http_client import ETaxHTTPClient, ETaxHTTPError
+
+
+class TestPooledSession(FrappeTestCase):
+    """Tests for the process-wide pooled session"""
+
+    def setUp(self):
+        """Start each test with a fresh session"""
+        super().setUp()
+        pool.close_session()
+        self.addCleanup(pool.close_session)
+
+    def _retry(self):
+        return pool.get_session().get_adapter("https://api.frappe.mn").max_retries
+
+    def test_session_shared(self):
+        """Test every caller in the process gets the same session"""
+        self.assertIs(pool.get_session(), pool.get_session())
+
+    def test_retry_budget(self):
+        """Test retries are capped by one total budget"""
+        retry = self._retry()
+
+        self.assertEqual(retry.total, 3)
+        self.assertNotIn("POST", retry.allowed_methods)
+
+    def test_post_not_retried_after_send(self):
+        """Test a POST whose response was lost is not sent again"""
+        retry = self._retry()
+
+        self.assertFalse(retry.is_retry("POST", 503))
+        with self.assertRaises(ProtocolError):
+            retry.increment(method="POST", url="/submitform", error=ProtocolError("connection reset"))
+
+    def test_post_retried_on_connect_error(self):
+        """Test a POST that never reached the server is retried"""
+        retry = self._retry().increment(method="POST", url="/submitform", error=ConnectTimeoutError())
+
+        self.assertEqual(retry.total, 2)
+
+    def test_get_retried(self):
+        """Test idempotent requests are retried on 5xx within the budget"""
+        retry = self._retry()
+
+        self.assertTrue(retry.is_retry("GET", 503))
+        for _ in range(3):
+            retry = retry.increment(method="GET", url="/forms", error=ProtocolError("reset"))
+        with self.assertRaises(MaxRetryError):
+            retry.increment(method="GET", url="/forms", error=ProtocolError("reset"))
+
+    def test_keepalive_socket_options(self):
+        """Test pooled sockets enable TCP keepalive"""
+        self.assertIn((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1), pool.KEEPALIVE_SOCKET_OPTIONS)
+        adapter = pool.get_session().get_adapter("https://api.frappe.mn")
+        self.assertEqual(
+            adapter.poolmanager.connection_pool_kw["socket_options"],
+            pool.KEEPALIVE_SOCKET_OPTIONS
+        )
+
+
+def _settings(**values):
+    """Mock eTax Settings with a counting get_password"""
+    settings = MagicMock()
+    settings.environment = values.get("environment", "Staging")
+    settings.timeout = values.get("timeout", 30)
+    settings.debug_mode = values.get("debug_mode", 0)
+    settings.get_password.return_value = values.get("ne_key", "test-ne-key")
+    return settings
+
+
+def _response(status_code, content=b"{}", headers=None):
+    """Mock requests.Response"""
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = content
+    response.text = content.decode()
+    response.headers = headers or {}
+    return response
+
+
+class TestClientSettings(FrappeTestCase):
+    """Tests for values precomputed from eTax Settings"""
+
+    def test_base_url_per_environment(self):
+        """Test the gateway base URL follows the environment"""
+        self.assertEqual(ETaxHTTPClient(_settings()).base_url, "https://api.frappe.mn/etax-staging")
+        self.assertEqual(
+            ETaxHTTPClient(_settings(environment="Production")).base_url,
+            "https://api.frappe.mn/etax"
+        )
+
+    def test_ne_key_decrypted_once(self):
+        """Test NE-KEY is decrypted on first use only"""
+        settings = _settings()
+        client = ETaxHTTPClient(settings)
+        client._get_ne_key()
+        client._get_ne_key()
+
+        settings.get_password.assert_called_once_with("ne_key")
+
+    def test_invalidate_rereads_settings(self):
+        """Test invalidate() picks up changed settings"""
+        settings = _settings()
+        client = ETaxHTTPClient(settings)
+        client._get_ne_key()
+        settings.environment = "Production"
+        settings.timeout = 60
+
+        client.invalidate()
+
+        self.assertEqual(client.base_url, "https://api.frappe.mn/etax")
+        self.assertEqual(client.timeout, 60)
+        client._get_ne_key()
+        self.assertEqual(settings.get_password.call_count, 2)
+
+
+class TestRequestHeaders(FrappeTestCase):
+    """Tests for request header building"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        super().setUp()
+        self.settings = _settings()
+        self.client = ETaxHTTPClient(self.settings)
+
+    def test_ne_key_header(self):
+        """Test NE-KEY is sent on every request"""
+        headers = self.client._get_headers()
+
+        self.assertEqual(headers["NE-KEY"], "test-ne-key")
+        self.assertEqual(headers["Content-Type"], "application/json")
+
+    def test_static_headers_built_once(self):
+        """Test the static headers are not rebuilt per request"""
+        for _ in range(3):
+            self.client._get_headers({"Authorization": "Bearer t"})
+
+        self.settings.get_password.assert_called_once_with("ne_key")
+
+    def test_per_request_headers_not_shared(self):
+        """Test per-request headers never leak into later requests"""
+        first = self.client._get_headers(
+            {"Authorization": "Bearer t"}, {"X-Trace": "1"}, content_type="text/plain"
+        )
+        second = self.client._get_headers()
+
+        self.assertEqual(first["Content-Type"], "text/plain")
+        self.assertEqual(first["X-Trace"], "1")
+        self.assertEqual(second["Content-Type"], "application/json")
+        self.assertNotIn("Authorization", second)
+        self.assertNotIn("X-Trace", second)
+
+
+class TestSend(FrappeTestCase):
+    """Tests for sending requests and translating failures"""
+
+    def setUp(self):
+        """Set up a client over a mock session"""
+        super().setUp()
+        self.session = MagicMock()
+        self.client = ETaxHTTPClient(_settings(timeout=45), session=self.session)
+
+    def test_split_timeout(self):
+        """Test connect and read timeouts are passed separately"""
+        self.session.request.return_value = _response(200, b'{"code": 0}')
+
+        self.client.get("forms")
+
+        timeout = self.session.request.call_args[1]["timeout"]
+        self.assertEqual(timeout, (self.client.CONNECT_TIMEOUT, 45))
+
+    def test_timeout_translated(self):
+        """Test a timeout becomes ETaxHTTPError 408"""
+        self.session.request.side_effect = requests.exceptions.ReadTimeout()
+
+        with self.assertRaises(ETaxHTTPError) as ctx:
+            self.client.get("forms")
+        self.assertEqual(ctx.exception.status_code, 408)
+
+    def test_connection_error_translated(self):
+        """Test a connection failure becomes ETaxHTTPError 503 without Retry-After"""
+        self.session.request.side_effect = requests.exceptions.ConnectionError("refused")
+
+        with self.assertRaises(ETaxHTTPError) as ctx:
+            self.client.post("submitform", data={"a": 1})
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertIsNone(ctx.exception.retry_after)
+
+    def test_retry_after_header(self):
+        """Test Retry-After seconds are read from 429/503 responses only"""
+        get_retry_after = ETaxHTTPClient._get_retry_after
+        self.assertEqual(get_retry_after(_response(429, headers={"Retry-After": "7"})), 7)
+        self.assertEqual(get_retry_after(_response(503, headers={"Retry-After": " 3 "})), 3)
+        self.assertIsNone(get_retry_after(
+            _response(503, headers={"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"})
+        ))
+        self.assertIsNone(get_retry_after(_response(500, headers={"Retry-After": "7"})))
+
+
+class TestBuildUrl(FrappeTestCase):
+    """Tests for gateway URL building"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        super().setUp()
+        self.client = ETaxHTTPClient(_settings())
+
+    def test_beta_endpoint(self):
+        """Test standard endpoints go under the base gateway path"""
+        self.assertEqual(self.client._build_url("/forms"), "https://api.frappe.mn/etax-staging/forms")
+        self.assertEqual(self.client._build_url("forms"), "https://api.frappe.mn/etax-staging/forms")
+
+    def test_user_endpoint(self):
+        """Test user endpoints go under the /user/ gateway path"""
+        expected = "https://api.frappe.mn/etax-staging/user/orgs"
+
+        self.assertEqual(self.client._build_url("/api/user/orgs"), expected)
+        self.assertEqual(self.client._build_url("user/orgs"), expected)
+
+    def test_absolute_url(self):
+        """Test absolute URLs pass through unchanged"""
+        url = "https://example.mn/api/forms"
+        self.assertEqual(self.client._build_url(url), url)
+
+    def test_production_prefix(self):
+        """Test prefixes follow the environment"""
+        client = ETaxHTTPClient(_settings(environment="Production"))
+
+        self.assertEqual(client._build_url("user/orgs"), "https://api.frappe.mn/etax/user/orgs")
+        self.assertEqual(client._build_url("forms"), "https://api.frappe.mn/etax/forms")
+
+
+class TestResponseHandling(FrappeTestCase):
+    """Tests for parsing eTax responses"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        super().setUp()
+        self.session = MagicMock()
+        self.client = ETaxHTTPClient(_settings(), session=self.session)
+
+    def test_list_response(self):
+        """Test list bodies (e.g. user orgs) are returned as-is"""
+        data = self.client._handle_response(_response(200, '[{"orgName": "ХХК"}]'.encode()))
+        self.assertEqual(data, [{"orgName": "ХХК"}])
+
+    def test_api_error_code(self):
+        """Test a non-zero eTax code raises with the server message"""
+        with self.assertRaises(ETaxHTTPError) as ctx:
+            self.client._handle_response(_response(200, b'{"code": 400, "message": "Invalid"}'))
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertEqual(str(ctx.exception), "Invalid")
+
+    def test_non_json_error(self):
+        """Test a non-JSON error body raises with the HTTP status"""
+        with self.assertRaises(ETaxHTTPError) as ctx:
+            self.client._handle_response(_response(503, b"<html>busy</html>", {"Retry-After": "5"}))
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(ctx.exception.retry_after, 5)
+
+    def test_non_json_success(self):
+        """Test a non-JSON success body is returned raw"""
+        data = self.client._handle_response(_response(200, b"OK"))
+        self.assertEqual(data, {"raw_response": "OK"})
+
+    def test_post_body_encoded_once(self):
+        """Test POST data is sent as compact UTF-8 JSON bytes"""
+        self.session.request.return_value = _response(200, b'{"code": 0}')
+
+        self.client.post("submitform", data={"name": "Татвар"})
+
+        body = self.session.request.call_args[1]["data"]
+        self.assertIsInstance(body, bytes)
+        self.assertEqual(json.loads(body), {"name": "Татвар"})
+
+
+class TestDebugLogging(FrappeTestCase):
+    """Tests for debug-mode request logging"""
+
+    def _client(self, debug_mode):
+        session = MagicMock()
+        session.request.return_value = _response(200, b'{"code": 0}')
+        return ETaxHTTPClient(_settings(debug_mode=debug_mode), session=session)
+
+    def test_no_logging_when_off(self):
+        """Test the log helpers are not even called with debug off"""
+        client = self._client(0)
+        with patch.object(client, "_log_request") as log_request, \
+                patch.object(client, "_log_response") as log_response:
+            client.get("forms")
+            client.post("submitform", data={"a": 1})
+
+        log_request.assert_not_called()
+        log_response.assert_not_called()
+
+    def test_logging_when_on(self):
+        """Test request and response are logged with debug on"""
+        client = self._client(1)
+        with patch.object(client, "_log_request") as log_request, \
+                patch.object(client, "_log_response") as log_response:
+            client.get("forms")
+
+        log_request.assert_called_once()
+        log_response.assert_called_once()
+
+    @patch("frappe.enqueue")
+    def test_log_written_in_background(self, mock_enqueue):
+        """Test debug logs are enqueued with credentials masked"""
+        client = self._client(1)
+
+        client._log_request("GET", "https://api.frappe.mn/etax-staging/forms", client._get_headers(
+            {"Authorization": "Bearer secret-token"}
+        ))
+
+        mock_enqueue.assert_called_once()
+        self.assertEqual(mock_enqueue.call_args[0][0], "frappe.log_error")
+        message = mock_enqueue.call_args[1]["message"]
+        self.assertNotIn("secret-token", message)
+        self.assertNotIn("test-ne-key", message)
@@ -205,6 +205,72 @@ class TestETaxInvoiceLink(FrappeTestCase):
         self.assertEqual(vat_types["Purchase Invoice"], "Input")
 
 
+class TestBulkIncludeInDeclaration(FrappeTestCase):
+    """Test suite for bulk_include_in_declaration."""
+
+    def setUp(self):
+        super().setUp()
+        self.rows = [
+            frappe._dict(name="LNK-1", status="Pending", etax_declaration=None, included_date=None),
+            frappe._dict(name="LNK-2", status="Included", etax_declaration="ETAX-RPT-0001", included_date=None)
+        ]
+
+    @patch("frappe.db.exists", return_value=None)
+    def test_unknown_declaration(self, mock_exists):
+        """Test the declaration is validated like a Link field."""
+        from etax.etax.doctype.etax_invoice_link.etax_invoice_link import bulk_include_in_declaration
+
+        with self.assertRaises(frappe.DoesNotExistError):
+            bulk_include_in_declaration(["LNK-1"], "NOT-A-REPORT")
+
+    @patch("frappe.get_all")
+    @patch("frappe.db.exists", return_value=True)
+    def test_unknown_link(self, mock_exists, mock_get_all):
+        """Test unknown link names raise instead of being skipped."""
+        from etax.etax.doctype.etax_invoice_link.etax_invoice_link import bulk_include_in_declaration
+
+        mock_get_all.return_value = self.rows[:1]
+
+        with self.assertRaises(frappe.DoesNotExistError):
+            bulk_include_in_declaration(["LNK-1", "LNK-404"], "ETAX-RPT-0002")
+
+    @patch("frappe.db.commit")
+    @patch("frappe.db.bulk_insert")
+    @patch("frappe.db.sql")
+    @patch("frappe.get_all")
+    @patch("frappe.db.exists", return_value=True)
+    def test_includes_pending_only(self, mock_exists, mock_get_all, mock_sql, mock_bulk_insert, mock_commit):
+        """Test only Pending links are updated, counted and versioned."""
+        from etax.etax.doctype.etax_invoice_link.etax_invoice_link import bulk_include_in_declaration
+
+        mock_get_all.return_value = self.rows
+
+        with patch.object(frappe.db, "_cursor", MagicMock(rowcount=1)):
+            result = bulk_include_in_declaration(["LNK-1", "LNK-2", "LNK-1"], "ETAX-RPT-0002")
+
+        self.assertEqual(result, {"success": True, "count": 1})
+        self.assertEqual(mock_sql.call_args[0][1][-1], ("LNK-1",))
+
+        doctype, fields, values = mock_bulk_insert.call_args[0]
+        self.assertEqual(doctype, "Version")
+        self.assertEqual(len(values), 1)
+        row = dict(zip(fields, values[0]))
+        self.assertEqual(row["docname"], "LNK-1")
+        self.assertIn(["status", "Pending", "Included"], frappe.parse_json(row["data"])["changed"])
+
+    @patch("frappe.db.sql")
+    @patch("frappe.get_all")
+    @patch("frappe.db.exists", return_value=True)
+    def test_nothing_pending(self, mock_exists, mock_get_all, mock_sql):
+        """Test already included links are left alone."""
+        from etax.etax.doctype.etax_invoice_link.etax_invoice_link import bulk_include_in_declaration
+
+        mock_get_all.return_value = self.rows[1:]
+
+        self.assertEqual(bulk_include_in_declaration(["LNK-2"], "ETAX-RPT-0002")["count"], 0)
+        mock_sql.assert_not_called()
+
+
 class TestVATSummary(FrappeTestCase):
     """Test suite for VAT summary functions."""
 
@@ -278,3 +344,144 @@ class TestVATAdjustments(FrappeTestCase):
         self.assertEqual(result["count"], 2)
         self.assertEqual(result["summary"]["output_vat"]["increases"], 5000)
         self.assertEqual(result["summary"]["input_vat"]["decreases"], 2000)
+
+
+class TestVATTotals(FrappeTestCase):
+    """Test suite for get_vat_totals."""
+
+    @patch("frappe.db.sql")
+    def test_grouped_totals(self, mock_sql):
+        """Test output and input totals come from one grouped query."""
+        from etax.etax.doctype.etax_invoice_link.etax_invoice_link import get_vat_totals
+
+        mock_sql.return_value = [
+            frappe._dict(vat_type="Output", vat=50000, taxable=500000, total=550000, count=10),
+            frappe._dict(vat_type="Input", vat=20000, taxable=200000, total=220000, count=4)
+        ]
+
+        result = get_vat_totals("_Test Company", "2024-01-01", "2024-01-31")
+
+        mock_sql.assert_called_once()
+        self.assertEqual(result["output_vat"]["vat_amount"], 50000)
+        self.assertEqual(result["output_vat"]["count"], 10)
+        self.assertEqual(result["input_vat"]["taxable_amount"], 200000)
+        self.assertEqual(result["net_vat"], 30000)
+
+    @patch("frappe.db.sql", return_value=[])
+    def test_missing_vat_type(self, mock_sql):
+        """Test a VAT type with no links gives zero totals."""
+        from etax.etax.doctype.etax_invoice_link.etax_invoice_link import get_vat_totals
+
+        result = get_vat_totals("_Test Company", "2024-01-01", "2024-01-31")
+
+        self.assertEqual(result["input_vat"], {
+            "vat_amount": 0, "taxable_amount": 0, "total_amount": 0, "count": 0
+        })
+        self.assertEqual(result["net_vat"], 0)
+
+
+class TestInvoiceLinkPartyDetails(FrappeTestCase):
+    """Test suite for eTaxInvoiceLink.set_party_details."""
+
+    def _link(self, **values):
+        return frappe._dict(
+            reference_doctype="Sales Invoice", reference_name="SINV-0001",
+            customer=None, customer_tin=None, supplier=None, supplier_tin=None,
+            **values
+        )
+
+    @staticmethod
+    def _get_value(doctype, name, fields, as_dict=False):
+        if doctype == "Sales Invoice":
+            return "_Test Customer"
+        if doctype == "Purchase Invoice":
+            return "_Test Supplier"
+        return frappe._dict(custom_tax_id=None, tax_id="1234567")
+
+    @patch("frappe.db.get_value")
+    def test_tin_columns_in_one_read(self, mock_get_value):
+        """Test both TIN columns are fetched together, tax_id as fallback."""
+        from etax.etax.doctype.etax_invoice_link.etax_invoice_link import eTaxInvoiceLink
+
+        mock_get_value.side_effect = self._get_value
+        link = self._link()
+
+        eTaxInvoiceLink.set_party_details(link)
+
+        self.assertEqual(link.customer, "_Test Customer")
+        self.assertEqual(link.customer_tin, "1234567")
+        mock_get_value.assert_any_call(
+            "Customer", "_Test Customer", ["custom_tax_id", "tax_id"], as_dict=True
+        )
+        self.assertEqual(mock_get_value.call_count, 2)
+
+    @patch("frappe.db.get_value")
+    def test_custom_tax_id_preferred(self, mock_get_value):
+        """Test custom_tax_id wins over tax_id for suppliers."""
+        from etax.etax.doctype.etax_invoice_link.etax_invoice_link import eTaxInvoiceLink
+
+        mock_get_value.side_effect = lambda doctype, name, fields, as_dict=False: (
+            "_Test Supplier" if doctype == "Purchase Invoice"
+            else frappe._dict(custom_tax_id="7654321", tax_id="1234567")
+        )
+        link = self._link(reference_doctype="Purchase Invoice", reference_name="PINV-0001")
+
+        eTaxInvoiceLink.set_party_details(link)
+
+        self.assertEqual(link.supplier, "_Test Supplier")
+        self.assertEqual(link.supplier_tin, "7654321")
+
+    @patch("frappe.db.get_value")
+    def test_reads_only_invoice_party(self, mock_get_value):
+        """Test only the party field of the invoice is read, not the whole doc."""
+        from etax.etax.doctype.etax_invoice_link.etax_invoice_link import eTaxInvoiceLink
+
+        mock_get_value.side_effect = self._get_value
+        link = self._link()
+
+        with patch("frappe.get_doc") as mock_get_doc:
+            eTaxInvoiceLink.set_party_details(link)
+
+        mock_get_doc.assert_not_called()
+        mock_get_value.assert_any_call("Sales Invoice", "SINV-0001", "customer")
+
+    @patch("frappe.db.get_value")
+    def test_party_already_set(self, mock_get_value):
+        """Test nothing is read when party and TIN are already set."""
+        from etax.etax.doctype.etax_invoice_link.etax_invoice_link import eTaxInvoiceLink
+
+        link = self._link(customer="_Test Customer", customer_tin="1234567")
+
+        eTaxInvoiceLink.set_party_details(link)
+
+        mock_get_value.assert_not_called()
+
+
+class TestReferenceExistsCache(FrappeTestCase):
+    """Test suite for the per-request reference existence cache."""
+
+    def setUp(self):
+        super().setUp()
+        frappe.local.etax_existing_docs = None
+        self.addCleanup(setattr, frappe.local, "etax_existing_docs", None)
+
+    @patch("frappe.db.exists", return_value="SINV-0001")
+    def test_hit_remembered(self, mock_exists):
+        """Test an existing reference is only checked once per request."""
+        from etax.etax.doctype.etax_invoice_link.etax_invoice_link import _exists_cached
+
+        self.assertTrue(_exists_cached("Sales Invoice", "SINV-0001"))
+        self.assertTrue(_exists_cached("Sales Invoice", "SINV-0001"))
+
+        mock_exists.assert_called_once_with("Sales Invoice", "SINV-0001")
+
+    @patch("frappe.db.exists")
+    def test_miss_not_remembered(self, mock_exists):
+        """Test a missing reference is checked again, so it can be created later."""
+        from etax.etax.doctype.etax_invoice_link.etax_invoice_link import _exists_cached
+
+        mock_exists.side_effect = [None, "SINV-0002"]
+
+        self.assertFalse(_exists_cached("Sales Invoice", "SINV-0002"))
+        self.assertTrue(_exists_cached("Sales Invoice", "SINV-0002"))
+        self.assertEqual(mock_exists.call_count, 2)
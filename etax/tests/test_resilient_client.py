@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Digital Consulting Service LLC (Mongolia)
+# License: GNU General Public License v3
+
+"""
+Tests for the resilient eTax client wrapper
+"""
+
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from etax.api.http_client import ETaxHTTPError
+from etax.api.resilient_client import ResilientETaxClient
+from etax.utils.resilience import CircuitBreaker, CircuitBreakerOpen, CircuitState
+
+
+@patch.object(CircuitBreaker, "_save_state")
+@patch.object(CircuitBreaker, "_load_state")
+class TestRetryAfterCircuit(FrappeTestCase):
+    """Tests for opening the circuit on server Retry-After"""
+
+    def setUp(self):
+        """Set up a client with its own breaker and no logging/metrics"""
+        super().setUp()
+        self.client = ResilientETaxClient(settings=MagicMock())
+        # Skip the certificate check
+        self.client._cert_checked_at = time.monotonic()
+        for name in ("_get_logger", "_get_metrics"):
+            patcher = patch(f"etax.api.resilient_client.{name}", return_value=None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _call(self, breaker, error):
+        with patch("etax.api.resilient_client._get_circuit_breaker", return_value=breaker):
+            with self.assertRaises(type(error)):
+                self.client._execute_with_resilience("get", MagicMock(side_effect=error))
+
+    def test_retry_after_opens_circuit(self, mock_load, mock_save):
+        """Test a 429 with Retry-After opens the circuit for that long"""
+        breaker = CircuitBreaker(name="test_retry_after")
+
+        self._call(breaker, ETaxHTTPError("Too many requests", status_code=429, retry_after=30))
+
+        self.assertEqual(breaker.state, CircuitState.OPEN)
+        self.assertGreater(breaker._open_until, datetime.now() + timedelta(seconds=25))
+        with patch("etax.api.resilient_client._get_circuit_breaker", return_value=breaker):
+            with self.assertRaises(CircuitBreakerOpen):
+                self.client._execute_with_resilience("get", MagicMock())
+
+    def test_connection_error_counts_as_failure(self, mock_load, mock_save):
+        """Test a dropped connection (mapped to 503) doesn't force the circuit open"""
+        breaker = CircuitBreaker(name="test_connection_error", failure_threshold=3)
+
+        self._call(breaker, ETaxHTTPError("Connection error: reset", status_code=503))
+
+        self.assertEqual(breaker.state, CircuitState.CLOSED)
+        self.assertEqual(breaker._failure_count, 1)
+
+    def test_503_without_header_counts_as_failure(self, mock_load, mock_save):
+        """Test a 503 without Retry-After goes through failure_threshold"""
+        breaker = CircuitBreaker(name="test_503", failure_threshold=2)
+
+        for _ in range(2):
+            self._call(breaker, ETaxHTTPError("Service unavailable", status_code=503))
+
+        self.assertEqual(breaker.state, CircuitState.OPEN)
+        self.assertIsNone(breaker._open_until)
+
+    def test_forced_deadline_overrides_recovery_timeout(self, mock_load, mock_save):
+        """Test a forced open fails fast until its deadline, then lets a probe through"""
+        breaker = CircuitBreaker(name="test_force_open", recovery_timeout=1)
+        func = MagicMock(return_value="ok")
+
+        breaker.force_open(120)
+
+        # The forced deadline wins over the shorter recovery_timeout
+        breaker._last_failure_time = datetime.now() - timedelta(seconds=10)
+        with self.assertRaises(CircuitBreakerOpen):
+            breaker.call(func)
+        func.assert_not_called()
+
+        breaker._open_until = datetime.now() - timedelta(seconds=1)
+        self.assertEqual(breaker.call(func), "ok")
+        self.assertEqual(breaker.state, CircuitState.CLOSED)
+        self.assertIsNone(breaker._open_until)
@@ -13,7 +13,7 @@ import base64
 import hashlib
 import hmac
 import json
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from frappe.tests.utils import FrappeTestCase
 
@@ -21,7 +21,9 @@ from etax.api.signature import (
     DigitalSignatureError,
     ETaxDigitalSignature,
     sign_report,
+    verify_report_signature,
 )
+from etax.utils import fastjson
 
 
 class TestETaxDigitalSignature(FrappeTestCase):
@@ -332,3 +334,113 @@ class TestPayloadConsistency(FrappeTestCase):
 
         # All signatures should be identical
         self.assertEqual(len(signatures), 1)
+
+
+class TestCanonicalPayload(FrappeTestCase):
+    """Tests for the canonical bytes that get signed"""
+
+    VECTOR = {
+        "reportNo": "RPT-2024-монгол",
+        "taxTypeId": "НӨТ",
+        "amount": 1e16,
+        "rate": 0.1,
+        "year": 2024
+    }
+    EXPECTED = (
+        b'{"amount":1e+16,"rate":0.1,'
+        b'"reportNo":"RPT-2024-\\u043c\\u043e\\u043d\\u0433\\u043e\\u043b",'
+        b'"taxTypeId":"\\u041d\\u04e8\\u0422","year":2024}'
+    )
+
+    def test_fixed_vector(self):
+        """Test canonical bytes match the fixed vector"""
+        self.assertEqual(fastjson.dumpb_canonical(self.VECTOR), self.EXPECTED)
+
+    def test_fixed_vector_without_orjson(self):
+        """Test the stdlib fallback produces the same bytes"""
+        with patch.object(fastjson, "orjson", None):
+            self.assertEqual(fastjson.dumpb_canonical(self.VECTOR), self.EXPECTED)
+
+    def test_matches_legacy_format(self):
+        """Test signed bytes match the json.dumps format of older signatures"""
+        signer = ETaxDigitalSignature(MagicMock())
+        report_data = {"reportNo": "RPT-2024-монгол", "taxTypeId": "НӨТ", "year": 2024}
+        report_detail = [{"tagKey": "борлуулалт", "value": "1000000₮"}]
+        timestamp = "2024-01-01T00:00:00"
+
+        payload = signer._create_payload_bytes(report_data, report_detail, timestamp)
+
+        legacy = json.dumps({
+            "reportNo": "RPT-2024-монгол",
+            "taxTypeId": "НӨТ",
+            "branchId": None,
+            "year": 2024,
+            "period": None,
+            "formNo": None,
+            "timestamp": timestamp,
+            "dataHash": signer._hash_report_detail(report_detail)
+        }, sort_keys=True, separators=(',', ':'))
+        self.assertEqual(payload, legacy.encode('utf-8'))
+        self.assertTrue(payload.isascii())
+
+
+class TestSignatureVerification(FrappeTestCase):
+    """Tests for signature verification with the configured keys"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        super().setUp()
+        self.mock_settings = MagicMock()
+        self.mock_settings.get_password = MagicMock(side_effect=lambda key: {
+            "password": "test_password_123",
+            "ne_key": "test_ne_key_456"
+        }.get(key))
+
+        self.signer = ETaxDigitalSignature(self.mock_settings)
+        self.payload = '{"reportNo": "RPT-2024-001"}'
+
+    def test_verify_signature_bytes(self):
+        """Test verification against raw signature bytes"""
+        digest = hmac.new(b"secret", self.payload.encode('utf-8'), hashlib.sha256).digest()
+
+        self.assertTrue(self.signer.verify_signature_bytes(self.payload, digest, "secret"))
+        self.assertTrue(self.signer.verify_signature_bytes(self.payload.encode('utf-8'), digest, "secret"))
+        self.assertFalse(self.signer.verify_signature_bytes(self.payload, digest, "other"))
+        self.assertFalse(self.signer.verify_signature_bytes("tampered", digest, "secret"))
+
+    def test_verify_report_signature_ne_key(self):
+        """Test a signature made with the NE-KEY verifies"""
+        signature = self.signer.sign_with_ne_key(self.payload)["signature"]
+        self.assertTrue(verify_report_signature(self.payload, signature, self.mock_settings))
+
+    def test_verify_report_signature_password(self):
+        """Test a signature made with the password verifies"""
+        signature = self.signer.sign_with_password(self.payload)["signature"]
+        self.assertTrue(verify_report_signature(self.payload, signature, self.mock_settings))
+
+    def test_verify_report_signature_rejects(self):
+        """Test wrong keys and malformed signatures are rejected"""
+        signature = self.signer.sign_with_password(self.payload, "wrong_password")["signature"]
+        self.assertFalse(verify_report_signature(self.payload, signature, self.mock_settings))
+        self.assertFalse(verify_report_signature(self.payload, "not-base64!", self.mock_settings))
+
+    def test_submission_timestamp_matches_payload(self):
+        """Test the returned timestamp is the one that was signed"""
+        result = self.signer.create_submission_signature(
+            {"reportNo": "RPT-2024-001", "taxTypeId": "VAT"},
+            [{"tagKey": "a", "value": "1"}]
+        )
+
+        self.assertEqual(result["timestamp"], json.loads(result["payload"])["timestamp"])
+        self.assertTrue(verify_report_signature(result["payload"], result["signature"], self.mock_settings))
+
+    def test_hash_report_detail_keeps_input(self):
+        """Test hashing does not reorder the caller's cells"""
+        report_detail = [
+            {"tagKey": "b", "value": "2"},
+            {"tagKey": "a", "value": "1"}
+        ]
+
+        self.signer._hash_report_detail(report_detail)
+
+        self.assertEqual([cell["tagKey"] for cell in report_detail], ["b", "a"])
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Digital Consulting Service LLC (Mongolia)
+# License: GNU General Public License v3
+
+"""
+Tests for the eTax data transformer
+"""
+
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from frappe.tests.utils import FrappeTestCase
+
+from etax.api import transformer as transformer_module
+from etax.api.transformer import ETaxTransformer, get_transformer
+
+
+class TestDetailTransforms(FrappeTestCase):
+    """Tests for detail list transforms"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        super().setUp()
+        self.transformer = ETaxTransformer()
+
+    def test_api_to_form_data(self):
+        """Test form data and detail items map to DocType fields"""
+        result = self.transformer.api_to_form_data({
+            "reportData": {"reportNo": 101, "isXreport": 1, "submittedDate": "2024-02-10 09:30:00"},
+            "reportDataDetail": [
+                {"tagId": 1, "tagKey": "A1", "value": "100", "type": 1},
+                {"tagId": 2, "tagKey": "A2", "value": None, "type": 2}
+            ]
+        })
+
+        self.assertEqual(result["form_data"]["report_no"], 101)
+        self.assertTrue(result["form_data"]["is_x_report"])
+        self.assertEqual(result["form_data"]["submitted_date"], datetime(2024, 2, 10, 9, 30))
+        self.assertEqual(result["detail_items"], [
+            {"tag_id": 1, "tag_key": "A1", "value": "100", "type": 1},
+            {"tag_id": 2, "tag_key": "A2", "value": None, "type": 2}
+        ])
+
+    def test_api_to_form_data_empty(self):
+        """Test missing sections give empty results"""
+        result = self.transformer.api_to_form_data({})
+
+        self.assertIsNone(result["form_data"]["report_no"])
+        self.assertEqual(result["detail_items"], [])
+
+    def test_form_data_to_api(self):
+        """Test detail items are stringified with API defaults"""
+        doc = SimpleNamespace(
+            report_no=101, tax_type_id=5, branch_id=7, period_year=2024,
+            period=1, is_x_report=0, form_no="TT-02"
+        )
+        items = [
+            SimpleNamespace(tag_id=1, tag_key="A1", value=100, type=None),
+            SimpleNamespace(tag_id=2, tag_key="A2", value=None, type=2)
+        ]
+
+        report_data, detail = self.transformer.form_data_to_api(doc, items)
+
+        self.assertEqual(report_data["taxTypeId"], "5")
+        self.assertEqual([(d["tagKey"], d["value"], d["type"]) for d in detail], [
+            ("A1", "100", 1),
+            ("A2", "", 2)
+        ])
+
+    def test_sheet_data_round_trip(self):
+        """Test sheet rows map to and from the API format"""
+        rows = self.transformer.api_to_sheet_data({
+            "sheetFormNo": "S1",
+            "sheetDataDetail": [{"rowNumber": 1, "isTotal": 1, "type": 1, "cells": [{"key": "c1", "value": 5}]}]
+        })["rows"]
+
+        self.assertEqual(rows[0]["row_number"], 1)
+        self.assertTrue(rows[0]["is_total"])
+
+        payload = self.transformer.sheet_data_to_api("S1", "SC", 101, rows)
+        row = payload["sheetDataDetail"][0]
+        self.assertEqual(row["isTotal"], 1)
+        self.assertEqual(row["cells"][0]["key"], "c1")
+        self.assertEqual(row["cells"][0]["value"], "5")
+
+
+class TestStatusMap(FrappeTestCase):
+    """Tests for report status mapping"""
+
+    def test_reverse_map(self):
+        """Test the reverse map inverts STATUS_MAP"""
+        self.assertEqual(
+            ETaxTransformer.STATUS_MAP_REVERSE,
+            {name: code for code, name in ETaxTransformer.STATUS_MAP.items()}
+        )
+
+    def test_get_status_code(self):
+        """Test names map to codes, unknown names default to New"""
+        transformer = ETaxTransformer()
+
+        self.assertEqual(transformer._get_status_code("Returned"), 8)
+        self.assertEqual(transformer._get_status_code("Received"), 11)
+        self.assertEqual(transformer._get_status_code("Bogus"), 2)
+
+
+class TestDateParsing(FrappeTestCase):
+    """Tests for date parsing with the last-format hint"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        super().setUp()
+        self.transformer = ETaxTransformer()
+
+    def test_parse_date_formats(self):
+        """Test both accepted formats parse, in any order"""
+        parse = self.transformer._parse_date
+
+        self.assertEqual(parse("2024-03-15"), date(2024, 3, 15))
+        self.assertEqual(parse("2024-03-16 10:00:00"), date(2024, 3, 16))
+        self.assertEqual(parse("2024-03-17"), date(2024, 3, 17))
+        self.assertEqual(parse(datetime(2024, 3, 18, 8, 0)), date(2024, 3, 18))
+
+    def test_parse_date_remembers_format(self):
+        """Test the format that parsed is tried first next time"""
+        self.transformer._parse_date("2024-03-16 10:00:00")
+        self.assertEqual(self.transformer._last_date_fmt, "%Y-%m-%d %H:%M:%S")
+
+        self.transformer._parse_date("2024-03-17")
+        self.assertEqual(self.transformer._last_date_fmt, "%Y-%m-%d")
+
+    def test_parse_date_invalid(self):
+        """Test empty and unparseable values give None"""
+        self.assertIsNone(self.transformer._parse_date(None))
+        self.assertIsNone(self.transformer._parse_date("15/03/2024"))
+        self.assertIsNone(self.transformer._parse_date(20240315))
+
+    def test_parse_datetime_formats(self):
+        """Test datetimes parse with and without a time part"""
+        parse = self.transformer._parse_datetime
+
+        self.assertEqual(parse("2024-03-15 10:20:30"), datetime(2024, 3, 15, 10, 20, 30))
+        self.assertEqual(parse("2024-03-16"), datetime(2024, 3, 16))
+        self.assertEqual(parse("2024-03-17 01:02:03"), datetime(2024, 3, 17, 1, 2, 3))
+        self.assertIsNone(parse("not a date"))
+
+
+class TestSharedTransformer(FrappeTestCase):
+    """Tests for the shared transformer instance"""
+
+    def test_get_transformer_shared(self):
+        """Test get_transformer returns one instance"""
+        transformer = get_transformer()
+
+        self.assertIsInstance(transformer, ETaxTransformer)
+        self.assertIs(get_transformer(), transformer)
+
+    def test_shared_instance_created_lazily(self):
+        """Test the instance is created on first use"""
+        original = transformer_module._transformer
+        self.addCleanup(setattr, transformer_module, "_transformer", original)
+        transformer_module._transformer = None
+
+        transformer = get_transformer()
+
+        self.assertIs(transformer_module._transformer, transformer)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024, Digital Consulting Service LLC (Mongolia)
+# License: GNU General Public License v3
+# pyright: reportMissingImports=false
+
+"""
+Fast JSON helpers for eTax
+
+Uses orjson when it is installed (it ships with recent Frappe versions)
+and falls back to the standard library json module otherwise.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can
+# catch this regardless of which backend parsed the data
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data):
+    """
+    Parse JSON from bytes or str.
+
+    Args:
+        data: JSON document (e.g. response.content)
+
+    Returns:
+        Parsed Python object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, indent: bool = False) -> str:
+    """
+    Serialize to a JSON string (non-ASCII kept as-is).
+
+    Args:
+        obj: Object to serialize
+        indent: Pretty-print with 2-space indentation
+
+    Returns:
+        JSON string
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, option=option, default=str).decode()
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False, default=str)
+
+
+def dumpb(obj) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON bytes, ready to send as a request body.
+
+    Args:
+        obj: Object to serialize
+
+    Returns:
+        JSON bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def dumpb_canonical(obj, default=None) -> bytes:
+    """
+    Serialize to canonical JSON bytes: sorted keys, compact separators,
+    non-ASCII escaped as \\uXXXX.
+
+    Always uses the standard library, whichever backend is installed:
+    orjson writes raw UTF-8, formats some floats differently (1e+16 vs
+    1e16) and rejects non-str keys, so its output cannot be hashed or
+    signed interchangeably. These bytes match
+    json.dumps(obj, sort_keys=True, separators=(",", ":")), the format
+    existing report signatures were made over.
+
+    Args:
+        obj: Object to serialize
+        default: Fallback for unsupported types (e.g. str)
+
+    Returns:
+        ASCII JSON bytes
+    """
+    return json.dumps(
+        obj, sort_keys=True, ensure_ascii=True, separators=(",", ":"), default=default
+    ).encode()
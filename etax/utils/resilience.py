@@ -44,6 +44,7 @@ class CircuitBreaker:
     _failure_count: int = field(default=0, init=False)
     _last_failure_time: datetime | None = field(default=None, init=False)
     _half_open_calls: int = field(default=0, init=False)
+    _open_until: datetime | None = field(default=None, init=False)
     _lock: Lock = field(default_factory=Lock, init=False)
     
     def __post_init__(self):
@@ -62,6 +63,9 @@ class CircuitBreaker:
                 last_failure = cached.get("last_failure_time")
                 if last_failure and isinstance(last_failure, str):
                     self._last_failure_time = datetime.fromisoformat(last_failure)
+                open_until = cached.get("open_until")
+                if open_until and isinstance(open_until, str):
+                    self._open_until = datetime.fromisoformat(open_until)
         except Exception:
             # In test environments, cache may be mocked - use defaults
             pass
@@ -73,7 +77,8 @@ class CircuitBreaker:
             frappe.cache().set_value(cache_key, {
                 "state": self._state.value,
                 "failure_count": self._failure_count,
-                "last_failure_time": self._last_failure_time.isoformat() if self._last_failure_time else None
+                "last_failure_time": self._last_failure_time.isoformat() if self._last_failure_time else None,
+                "open_until": self._open_until.isoformat() if self._open_until else None
             }, expires_in_sec=3600)
         except Exception:
             # In test environments, cache may be mocked
@@ -90,13 +95,16 @@ class CircuitBreaker:
                 return True
             
             if self._state == CircuitState.OPEN:
-                if self._last_failure_time:
-                    time_since_failure = datetime.now() - self._last_failure_time
-                    if time_since_failure > timedelta(seconds=self.recovery_timeout):
-                        self._state = CircuitState.HALF_OPEN
-                        self._half_open_calls = 0
-                        self._save_state()
-                        return True
+                # A forced open (e.g. Retry-After) sets its own recovery time
+                retry_at = self._open_until
+                if retry_at is None and self._last_failure_time:
+                    retry_at = self._last_failure_time + timedelta(seconds=self.recovery_timeout)
+                if retry_at and datetime.now() > retry_at:
+                    self._state = CircuitState.HALF_OPEN
+                    self._half_open_calls = 0
+                    self._open_until = None
+                    self._save_state()
+                    return True
                 return False
             
             if self._state == CircuitState.HALF_OPEN:
@@ -144,21 +152,55 @@ class CircuitBreaker:
         """Decorator to wrap function with circuit breaker"""
         @functools.wraps(func)
         def wrapper(*args, **kwargs) -> T:
-            if not self._should_allow_request():
-                raise CircuitBreakerOpen(
-                    f"Circuit breaker '{self.name}' is open. "
-                    f"Service unavailable, retry after {self.recovery_timeout}s"
-                )
-            
+            return self.call(func, *args, **kwargs)
+        
+        return wrapper
+    
+    def call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Call func through the circuit breaker (fails fast while open)"""
+        # Fast path: while closed, skip the lock on the way in and only
+        # take it on failure or to clear a pending failure count
+        if self._state is CircuitState.CLOSED:
             try:
                 result = func(*args, **kwargs)
-                self._on_success()
-                return result
             except Exception as e:
                 self._on_failure(e)
                 raise
+            if self._failure_count:
+                self._on_success()
+            return result
         
-        return wrapper
+        if not self._should_allow_request():
+            raise CircuitBreakerOpen(
+                f"Circuit breaker '{self.name}' is open. "
+                f"Service unavailable, retry after {self.recovery_timeout}s"
+            )
+        
+        try:
+            result = func(*args, **kwargs)
+            self._on_success()
+            return result
+        except Exception as e:
+            self._on_failure(e)
+            raise
+    
+    def force_open(self, seconds: int):
+        """
+        Open the circuit immediately for the given number of seconds.
+        
+        Used when the server asks clients to back off (429/503 with
+        Retry-After); after that a half-open probe decides recovery.
+        """
+        with self._lock:
+            now = datetime.now()
+            self._state = CircuitState.OPEN
+            self._last_failure_time = now
+            self._open_until = now + timedelta(seconds=seconds)
+            self._half_open_calls = 0
+            self._save_state()
+        frappe.logger("etax").warning(
+            f"Circuit breaker '{self.name}' forced open for {seconds}s"
+        )
     
     def reset(self):
         """Manually reset the circuit breaker"""
@@ -167,6 +209,7 @@ class CircuitBreaker:
             self._failure_count = 0
             self._last_failure_time = None
             self._half_open_calls = 0
+            self._open_until = None
             self._save_state()
 
 